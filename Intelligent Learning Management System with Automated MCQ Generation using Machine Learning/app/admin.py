@@ -1,88 +1,171 @@
-from django.contrib import admin
-from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
-from .models import (
-    User, Subject, Topic, Course,
-    Enrollment, PythonQuestion,
-    Test, TestAttempt, TestResult,
-    Evaluation
-)
-@admin.register(User)
-class UserAdmin(BaseUserAdmin):
-    list_display = ('username', 'email', 'user_type', 'is_staff', 'is_active')
-    list_filter = ('user_type', 'is_staff', 'is_superuser', 'is_active')
-    search_fields = ('username', 'email')
-    ordering = ('date_joined',)
-
-    fieldsets = (
-        (None, {'fields': ('username', 'password')}),
-        ('Personal info', {'fields': ('email', 'user_type')}),
-        ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions')}),
-        ('Important dates', {'fields': ('last_login', 'date_joined')}),
-    )
-
-    add_fieldsets = (
-        (None, {
-            'classes': ('wide',),
-            'fields': ('username', 'email', 'user_type', 'password1', 'password2'),
-        }),
-    )
-
-@admin.register(Subject)
-class SubjectAdmin(admin.ModelAdmin):
-    list_display = ('name', 'created_at')
-    search_fields = ('name',)
-
-
-@admin.register(Topic)
-class TopicAdmin(admin.ModelAdmin):
-    list_display = ('name', 'subject')
-    search_fields = ('name', 'subject__name')
-
-
-@admin.register(Course)
-class CourseAdmin(admin.ModelAdmin):
-    list_display = ('code', 'name', 'instructor', 'start_date', 'end_date', 'is_active')
-    search_fields = ('name', 'code')
-    list_filter = ('is_active', 'start_date', 'end_date')
-    filter_horizontal = ('subjects',)
-
-
-@admin.register(Enrollment)
-class EnrollmentAdmin(admin.ModelAdmin):
-    list_display = ('student', 'course', 'enrollment_date', 'is_active')
-    list_filter = ('is_active', 'course')
-    search_fields = ('student__username', 'course__name')
-
-
-@admin.register(PythonQuestion)
-class PythonQuestionAdmin(admin.ModelAdmin):
-    list_display = ('question_text', 'difficulty', 'question_type', 'subject', 'topic', 'created_by')
-    search_fields = ('question_text',)
-    list_filter = ('difficulty', 'question_type', 'subject')
-
-
-@admin.register(Test)
-class TestAdmin(admin.ModelAdmin):
-    list_display = ('title', 'course', 'created_by', 'available_from', 'available_to', 'is_published')
-    list_filter = ('is_published', 'course')
-    filter_horizontal = ('questions',)
-
-
-@admin.register(TestAttempt)
-class TestAttemptAdmin(admin.ModelAdmin):
-    list_display = ('student', 'test', 'started_at', 'completed_at', 'score', 'correct_answers')
-
-
-@admin.register(TestResult)
-class TestResultAdmin(admin.ModelAdmin):
-    list_display = ('attempt', 'question', 'selected_option', 'is_correct', 'answered_at')
-    list_filter = ('is_correct',)
-
-
-@admin.register(Evaluation)
-class EvaluationAdmin(admin.ModelAdmin):
-    list_display = ('test_attempt', 'evaluated_by', 'score_adjustment', 'evaluated_at')
-    search_fields = ('test_attempt__student__username', 'evaluated_by__username')
-
-
-
+from django.contrib import admin
+from django.contrib.auth.admin import UserAdmin as BaseUserAdmin
+from django.core.exceptions import PermissionDenied
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.html import format_html
+from . import item_analysis, question_search
+from .models import (
+    User, Subject, Topic, Course,
+    Enrollment, PythonQuestion,
+    Test, TestAttempt, TestResult,
+    Evaluation, MCQGenerationJob, DistractorTerm,
+    GeneratedBatch, GeneratedItem,
+    StudentCourseStats, TestStats, MCQCacheCounter
+)
+@admin.register(User)
+class UserAdmin(BaseUserAdmin):
+    list_display = ('username', 'email', 'user_type', 'is_staff', 'is_active')
+    list_filter = ('user_type', 'is_staff', 'is_superuser', 'is_active')
+    search_fields = ('username', 'email')
+    ordering = ('date_joined',)
+
+    fieldsets = (
+        (None, {'fields': ('username', 'password')}),
+        ('Personal info', {'fields': ('email', 'user_type')}),
+        ('Permissions', {'fields': ('is_active', 'is_staff', 'is_superuser', 'groups', 'user_permissions')}),
+        ('Important dates', {'fields': ('last_login', 'date_joined')}),
+    )
+
+    add_fieldsets = (
+        (None, {
+            'classes': ('wide',),
+            'fields': ('username', 'email', 'user_type', 'password1', 'password2'),
+        }),
+    )
+
+@admin.register(Subject)
+class SubjectAdmin(admin.ModelAdmin):
+    list_display = ('name', 'created_at')
+    search_fields = ('name',)
+
+
+@admin.register(Topic)
+class TopicAdmin(admin.ModelAdmin):
+    list_display = ('name', 'subject')
+    search_fields = ('name', 'subject__name')
+
+
+@admin.register(Course)
+class CourseAdmin(admin.ModelAdmin):
+    list_display = ('code', 'name', 'instructor', 'start_date', 'end_date', 'is_active')
+    search_fields = ('name', 'code')
+    list_filter = ('is_active', 'start_date', 'end_date')
+    filter_horizontal = ('subjects',)
+
+
+@admin.register(Enrollment)
+class EnrollmentAdmin(admin.ModelAdmin):
+    list_display = ('student', 'course', 'enrollment_date', 'is_active')
+    list_filter = ('is_active', 'course')
+    search_fields = ('student__username', 'course__name')
+
+
+@admin.register(PythonQuestion)
+class PythonQuestionAdmin(admin.ModelAdmin):
+    list_display = ('question_text', 'difficulty', 'question_type', 'subject', 'topic', 'created_by')
+    search_fields = ('question_text',)
+    list_filter = ('difficulty', 'question_type', 'subject')
+
+    def get_search_results(self, request, queryset, search_term):
+        if not search_term.strip() or not question_search.fts_enabled():
+            return super().get_search_results(request, queryset, search_term)
+        return question_search.search(queryset, search_term), False
+
+
+@admin.register(Test)
+class TestAdmin(admin.ModelAdmin):
+    list_display = ('title', 'course', 'created_by', 'available_from', 'available_to', 'is_published', 'item_analysis_link')
+    list_filter = ('is_published', 'course')
+    filter_horizontal = ('questions',)
+
+    def get_urls(self):
+        return [
+            path(
+                '<int:test_id>/item-analysis/',
+                self.admin_site.admin_view(self.item_analysis_view),
+                name='app_test_item_analysis',
+            ),
+        ] + super().get_urls()
+
+    @admin.display(description='Item analysis')
+    def item_analysis_link(self, obj):
+        return format_html('<a href="{}">View</a>', reverse('admin:app_test_item_analysis', args=[obj.pk]))
+
+    def item_analysis_view(self, request, test_id):
+        test = get_object_or_404(Test, pk=test_id)
+        if not self.has_view_permission(request, test):
+            raise PermissionDenied
+        analysis = item_analysis.analyze_test(test)
+        return TemplateResponse(request, 'admin/app/test/item_analysis.html', {
+            **self.admin_site.each_context(request),
+            'opts': self.model._meta,
+            'title': f"Item analysis: {test.title}",
+            'test': test,
+            'analysis': analysis,
+            'items': list(analysis.items()),
+        })
+
+
+@admin.register(TestAttempt)
+class TestAttemptAdmin(admin.ModelAdmin):
+    list_display = ('student', 'test', 'started_at', 'completed_at', 'score', 'correct_answers')
+
+
+@admin.register(TestResult)
+class TestResultAdmin(admin.ModelAdmin):
+    list_display = ('attempt', 'question', 'selected_option', 'is_correct', 'answered_at')
+    list_filter = ('is_correct',)
+
+
+@admin.register(Evaluation)
+class EvaluationAdmin(admin.ModelAdmin):
+    list_display = ('test_attempt', 'evaluated_by', 'score_adjustment', 'evaluated_at')
+    search_fields = ('test_attempt__student__username', 'evaluated_by__username')
+
+
+class GeneratedItemInline(admin.TabularInline):
+    model = GeneratedItem
+    extra = 0
+
+
+@admin.register(GeneratedBatch)
+class GeneratedBatchAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created_by', 'subject', 'difficulty', 'created_at', 'expires_at')
+    list_filter = ('subject',)
+    inlines = [GeneratedItemInline]
+
+
+@admin.register(MCQGenerationJob)
+class MCQGenerationJobAdmin(admin.ModelAdmin):
+    list_display = ('id', 'created_by', 'subject', 'status', 'progress', 'created_at', 'finished_at')
+    list_filter = ('status',)
+    readonly_fields = ('started_at', 'heartbeat_at', 'finished_at')
+
+
+@admin.register(DistractorTerm)
+class DistractorTermAdmin(admin.ModelAdmin):
+    list_display = ('term', 'pos_tag', 'subject', 'created_at')
+    list_filter = ('pos_tag', 'subject')
+    search_fields = ('term',)
+
+
+@admin.register(StudentCourseStats)
+class StudentCourseStatsAdmin(admin.ModelAdmin):
+    list_display = ('student', 'course', 'attempts_count', 'passed_count', 'average_score', 'updated_at')
+    list_filter = ('course',)
+    search_fields = ('student__username',)
+    readonly_fields = ('attempts_count', 'passed_count', 'score_sum', 'updated_at')
+
+
+@admin.register(TestStats)
+class TestStatsAdmin(admin.ModelAdmin):
+    list_display = ('test', 'attempts_count', 'mean_score', 'pass_rate', 'updated_at')
+    readonly_fields = ('attempts_count', 'passed_count', 'score_sum', 'histogram', 'updated_at')
+
+
+@admin.register(MCQCacheCounter)
+class MCQCacheCounterAdmin(admin.ModelAdmin):
+    list_display = ('name', 'value')
+    readonly_fields = ('name', 'value')
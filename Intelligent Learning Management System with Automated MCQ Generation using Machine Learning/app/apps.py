@@ -1,6 +1,27 @@
-from django.apps import AppConfig
-
-
-class AppConfig(AppConfig):
-    default_auto_field = 'django.db.models.BigAutoField'
-    name = 'app'
+import logging
+
+from django.apps import AppConfig
+from django.conf import settings
+
+logger = logging.getLogger(__name__)
+
+
+class AppConfig(AppConfig):
+    default_auto_field = 'django.db.models.BigAutoField'
+    name = 'app'
+
+    def ready(self):
+        from . import signals  # noqa: F401
+        from . import nltk_resources
+        nltk_resources.configure_data_path(getattr(settings, 'NLTK_DATA_DIR', None))
+        if getattr(settings, 'MCQ_PRELOAD_GENERATOR', True):
+            self.preload_generator()
+
+    def preload_generator(self):
+        # Build the shared NLP engine once per worker instead of on the first generate request.
+        # Only local files are checked, so a missing download never blocks startup.
+        from .mcq_generator import get_generator
+        try:
+            get_generator()
+        except LookupError as exc:
+            logger.warning("MCQ generator not preloaded: %s", exc)
@@ -0,0 +1,42 @@
+"""Cache backends referenced from ``CACHES`` in settings."""
+import os
+
+from django.core.cache.backends.filebased import FileBasedCache
+
+
+class LRUFileBasedCache(FileBasedCache):
+    """File-based cache that evicts the least recently used entries.
+
+    Django's ``FileBasedCache`` deletes a random sample of files once
+    ``MAX_ENTRIES`` is reached.  Here every hit refreshes the file's
+    modification time, and culling deletes the ``1 / CULL_FREQUENCY`` of
+    files that were written or read the longest time ago.
+    """
+
+    def get(self, key, default=None, version=None):
+        missing = object()
+        value = super().get(key, missing, version)
+        if value is missing:
+            return default
+        try:
+            os.utime(self._key_to_file(key, version))
+        except FileNotFoundError:
+            pass  # culled by another process meanwhile
+        return value
+
+    def _cull(self):
+        filelist = self._list_cache_files()
+        num_entries = len(filelist)
+        if num_entries < self._max_entries:
+            return
+        if self._cull_frequency == 0:
+            return self.clear()
+        for fname in sorted(filelist, key=_last_used)[:num_entries // self._cull_frequency]:
+            self._delete(fname)
+
+
+def _last_used(fname):
+    try:
+        return os.stat(fname).st_mtime
+    except FileNotFoundError:
+        return 0
@@ -0,0 +1,104 @@
+"""Cached, keyset-paginated course catalog for the enrollment page.
+
+Every student sees the same catalog, so each page is built once and cached
+as plain rows (course fields, instructor name, subject names, active
+enrollment count); only the "already enrolled" marks are looked up per
+request.  Pages are cut on the unique course ``code``: the cursor is the
+last code shown, so every page is one index range scan.
+
+Pages and their version token live in the ``PAGE_CACHE_ALIAS`` cache, shared
+by all workers.  Cache keys carry a version token that ``signals.py``
+replaces when a course or its subjects change.  Enrollments do not replace it, since at
+registration opening that would empty the cache on every click; enrollment
+counts may instead lag by up to ``COURSE_CATALOG_CACHE_TIMEOUT`` seconds.
+"""
+import hashlib
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Count, IntegerField, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce
+
+from .models import Course, Enrollment
+
+TOKEN_KEY = 'course-catalog-version'
+PAGE_SIZE = 25
+
+
+def _cache():
+    return caches[getattr(settings, 'PAGE_CACHE_ALIAS', 'default')]
+
+
+def _token():
+    token = _cache().get(TOKEN_KEY)
+    if token is None:
+        token = uuid.uuid4().hex
+        # add() so concurrent first requests agree on one token
+        if not _cache().add(TOKEN_KEY, token):
+            token = _cache().get(TOKEN_KEY, token)
+    return token
+
+
+def invalidate():
+    # After commit, so a concurrent request can't cache pre-commit data under the new token
+    transaction.on_commit(lambda: _cache().set(TOKEN_KEY, uuid.uuid4().hex))
+
+
+def _build_page(after, size):
+    # A correlated count rather than a join: without GROUP BY the scan follows the code
+    # index and stops after size + 1 courses instead of grouping every later course
+    active_students = (
+        Enrollment.objects.filter(course=OuterRef('pk'), is_active=True)
+        .order_by().values('course').annotate(count=Count('*')).values('count')
+    )
+    courses = (
+        Course.objects.filter(is_active=True)
+        .select_related('instructor')
+        .prefetch_related('subjects')
+        .annotate(student_count=Coalesce(Subquery(active_students, output_field=IntegerField()), Value(0)))
+        .order_by('code')
+    )
+    if after:
+        courses = courses.filter(code__gt=after)
+    courses = list(courses[:size + 1])
+    rows = [
+        {
+            'id': course.id,
+            'code': course.code,
+            'name': course.name,
+            'description': course.description,
+            'instructor': course.instructor.get_full_name() or course.instructor.username,
+            'subjects': sorted(subject.name for subject in course.subjects.all()),
+            'start_date': course.start_date,
+            'end_date': course.end_date,
+            'student_count': course.student_count,
+        }
+        for course in courses[:size]
+    ]
+    next_cursor = rows[-1]['code'] if len(courses) > size else None
+    return rows, next_cursor
+
+
+def catalog_page(after=None, size=PAGE_SIZE):
+    """Rows of the catalog page following course code ``after``, and the next page's cursor."""
+    # The cursor comes from the query string; hashed so any value makes a valid cache key
+    cursor = hashlib.md5((after or '').encode()).hexdigest()
+    key = f'course-catalog:{_token()}:{size}:{cursor}'
+    page = _cache().get(key)
+    if page is None:
+        page = _build_page(after, size)
+        _cache().set(key, page, getattr(settings, 'COURSE_CATALOG_CACHE_TIMEOUT', 60))
+    return page
+
+
+def page_for_student(student, after=None, size=PAGE_SIZE):
+    """Like :func:`catalog_page`, with ``enrolled`` set on the rows of ``student``'s courses."""
+    rows, next_cursor = catalog_page(after, size)
+    enrolled = set(
+        Enrollment.objects.filter(student=student, course_id__in=[row['id'] for row in rows])
+        .values_list('course_id', flat=True)
+    ) if rows else set()
+    # Copies, so the cached rows are never modified
+    return [{**row, 'enrolled': row['id'] in enrolled} for row in rows], next_cursor
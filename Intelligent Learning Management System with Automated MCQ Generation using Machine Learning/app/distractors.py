@@ -0,0 +1,90 @@
+"""Persistent distractor index backed by the ``DistractorTerm`` table.
+
+Terms come from the options of the question bank (``build_distractor_index``)
+and from the answers of generated questions.  Each process keeps the pools it
+has loaded for ``MCQ_DISTRACTOR_CACHE_TTL`` seconds, so generation only pays
+for one query per subject now and then.
+"""
+import threading
+import time
+
+from django.conf import settings
+from django.db.models import Q
+
+from .mcq_generator import DistractorPool, get_generator
+from .models import DistractorTerm, PythonQuestion
+
+_pools = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(subject_id):
+    """Return the distractor pool for a subject, including subject-less terms."""
+    ttl = getattr(settings, 'MCQ_DISTRACTOR_CACHE_TTL', 300)
+    cached = _pools.get(subject_id)
+    if cached and time.monotonic() - cached[0] < ttl:
+        return cached[1]
+
+    terms = DistractorTerm.objects.filter(Q(subject_id=subject_id) | Q(subject__isnull=True))
+    pool = DistractorPool(terms.values_list('term', 'pos_tag').iterator())
+    with _pools_lock:
+        _pools[subject_id] = (time.monotonic(), pool)
+    return pool
+
+
+def clear_pools():
+    with _pools_lock:
+        _pools.clear()
+
+
+def record_terms(subject_id, tagged_terms):
+    _save_terms((subject_id, term, tag) for term, tag in tagged_terms)
+
+
+def _save_terms(entries, batch_size=1000):
+    terms = [
+        DistractorTerm(subject_id=subject_id, term=term[:200], pos_tag=tag)
+        for subject_id, term, tag in dict.fromkeys(entries)
+    ]
+    DistractorTerm.objects.bulk_create(terms, batch_size=batch_size, ignore_conflicts=True)
+
+
+def index_questions(questions, batch_size=500):
+    """Add the option keywords of ``questions`` to the index, returning the number of questions read."""
+    generator = get_generator()
+    count = 0
+    batch = []
+    for question in questions:
+        batch.append(question)
+        if len(batch) >= batch_size:
+            _index_batch(generator, batch)
+            count += len(batch)
+            batch = []
+    if batch:
+        _index_batch(generator, batch)
+        count += len(batch)
+    return count
+
+
+def _index_batch(generator, questions):
+    options = [
+        option
+        for question in questions
+        for option in (question.option_a, question.option_b, question.option_c, question.option_d)
+    ]
+    keyword_lists = generator.extract_keywords_batch(options)
+    _save_terms(
+        (question.subject_id, term, tag)
+        for i, question in enumerate(questions)
+        for keywords in keyword_lists[i * 4:i * 4 + 4]
+        for term, tag in keywords
+    )
+
+
+def rebuild_index(subject_id=None):
+    questions = PythonQuestion.objects.only('subject', 'option_a', 'option_b', 'option_c', 'option_d')
+    if subject_id is not None:
+        questions = questions.filter(subject_id=subject_id)
+    count = index_questions(questions.iterator(chunk_size=2000))
+    clear_pools()
+    return count
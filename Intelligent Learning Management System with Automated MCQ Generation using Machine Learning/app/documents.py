@@ -0,0 +1,86 @@
+"""Streaming text extraction for uploaded source documents.
+
+Each reader yields one paragraph at a time so arbitrarily large files can be
+fed to ``MCQGenerator.generate_mcqs_stream`` without loading them whole.
+"""
+import codecs
+import os
+import re
+import zipfile
+from xml.etree import ElementTree
+
+SUPPORTED_EXTENSIONS = ('.txt', '.pdf', '.docx')
+
+# A paragraph longer than this is cut at the last whitespace to keep memory bounded
+MAX_PARAGRAPH_CHARS = 20_000
+
+_PARAGRAPH_BREAK = re.compile(r'\n\s*\n')
+_WORD_NS = '{http://schemas.openxmlformats.org/wordprocessingml/2006/main}'
+
+
+class DocumentError(Exception):
+    pass
+
+
+def iter_paragraphs(file, name):
+    extension = os.path.splitext(name)[1].lower()
+    if extension == '.txt':
+        return _iter_text_paragraphs(file)
+    if extension == '.pdf':
+        return _iter_pdf_paragraphs(file)
+    if extension == '.docx':
+        return _iter_docx_paragraphs(file)
+    raise DocumentError(f"Unsupported file type '{extension}'")
+
+
+def _split_paragraphs(text):
+    for paragraph in _PARAGRAPH_BREAK.split(text):
+        paragraph = paragraph.strip()
+        if paragraph:
+            yield paragraph
+
+
+def _iter_text_paragraphs(file, chunk_size=64 * 1024):
+    decoder = codecs.getincrementaldecoder('utf-8')(errors='replace')
+    buffer = ''
+    while True:
+        chunk = file.read(chunk_size)
+        buffer += decoder.decode(chunk, final=not chunk)
+        parts = _PARAGRAPH_BREAK.split(buffer)
+        buffer = parts.pop()
+        for paragraph in parts:
+            yield from _split_paragraphs(paragraph)
+        while len(buffer) > MAX_PARAGRAPH_CHARS:
+            cut = buffer.rfind(' ', 0, MAX_PARAGRAPH_CHARS) + 1 or MAX_PARAGRAPH_CHARS
+            yield buffer[:cut].strip()
+            buffer = buffer[cut:]
+        if not chunk:
+            break
+    yield from _split_paragraphs(buffer)
+
+
+def _iter_pdf_paragraphs(file):
+    try:
+        from pypdf import PdfReader
+    except ImportError:
+        raise DocumentError("PDF uploads require the 'pypdf' package")
+
+    # Pages are parsed on demand, so only one page's text is held at a time
+    for page in PdfReader(file).pages:
+        yield from _split_paragraphs(page.extract_text() or '')
+
+
+def _iter_docx_paragraphs(file):
+    try:
+        archive = zipfile.ZipFile(file)
+        xml = archive.open('word/document.xml')
+    except (zipfile.BadZipFile, KeyError):
+        raise DocumentError("Not a valid .docx file")
+
+    with archive, xml:
+        for _event, element in ElementTree.iterparse(xml):
+            if element.tag == f'{_WORD_NS}p':
+                text = ''.join(node.text or '' for node in element.iter(f'{_WORD_NS}t')).strip()
+                if text:
+                    yield text
+                element.clear()
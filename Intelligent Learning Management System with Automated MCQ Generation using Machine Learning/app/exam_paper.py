@@ -0,0 +1,90 @@
+"""Cached rendering of exam papers.
+
+The question markup of a test is the same for every student, so it is
+rendered once and kept in the ``TEST_CACHE_ALIAS`` cache, shared by all
+workers, until the test or its questions change (see ``signals.py``).  Like
+answer keys, papers carry the version of the test row they were built from
+(``grading.cache_version``) and are rebuilt for a reused test id.  Per request
+the cached pieces are only put in the attempt's order (see ``shuffling.py``)
+and joined, and ``take_test`` renders the per-student shell (attempt, CSRF
+token, timer) around them.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.template.loader import render_to_string
+from django.utils.html import conditional_escape
+from django.utils.safestring import mark_safe
+
+from . import shuffling
+from .grading import cache_version
+from .models import Test
+
+OPTION_HTML = (
+    '<div class="form-check">'
+    '<input class="form-check-input" type="radio" name="question_{question_id}" '
+    'id="q{question_id}_{position}" value="{letter}"{required}>'
+    '<label class="form-check-label" for="q{question_id}_{position}">{letter}) {label}</label>'
+    '</div>'
+)
+
+
+def _cache():
+    return caches[getattr(settings, 'TEST_CACHE_ALIAS', 'default')]
+
+
+def _cache_key(test_id):
+    return f'exam-paper:{test_id}'
+
+
+def get_paper(test):
+    """Return the cached pieces of each question of ``test``, in canonical order.
+
+    Each entry is a dict with the question ``id``, its rendered ``stem`` and
+    the escaped label of every option keyed by letter.
+    """
+    version, paper = _cache().get(_cache_key(test.id), (None, None))
+    if paper is None or version != cache_version(test):
+        # Ordered by the link rows, i.e. the order questions were added to the test:
+        # shuffling.question_order permutes positions, so they must not depend on the
+        # row order the database happens to return
+        links = Test.questions.through.objects.filter(test=test).select_related('pythonquestion').order_by('id')
+        paper = [
+            {
+                'id': str(question.id),
+                'stem': render_to_string('student/_exam_question.html', {'question': question}),
+                'options': {
+                    letter: conditional_escape(getattr(question, f'option_{letter.lower()}'))
+                    for letter in shuffling.LETTERS
+                },
+            }
+            for question in (link.pythonquestion for link in links)
+        ]
+        _cache().set(
+            _cache_key(test.id), (cache_version(test), paper), getattr(settings, 'EXAM_PAPER_CACHE_TIMEOUT', 24 * 60 * 60)
+        )
+    return paper
+
+
+def render_for_attempt(paper, attempt_id):
+    """Assemble the question fragments of ``paper`` in the order ``attempt_id`` sees them."""
+    fragments = []
+    for index in shuffling.question_order(attempt_id, len(paper)):
+        question = paper[index]
+        options = ''.join(
+            OPTION_HTML.format(
+                question_id=question['id'],
+                position=position,
+                letter=display_letter,
+                required=' required' if position == 1 else '',
+                label=question['options'][canonical_letter],
+            )
+            for position, (display_letter, canonical_letter) in enumerate(
+                zip(shuffling.LETTERS, shuffling.option_order(attempt_id, question['id'])), start=1
+            )
+        )
+        fragments.append(mark_safe(question['stem'] + options))
+    return fragments
+
+
+def invalidate_papers(test_ids):
+    _cache().delete_many([_cache_key(test_id) for test_id in test_ids])
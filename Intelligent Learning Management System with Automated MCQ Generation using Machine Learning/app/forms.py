@@ -1,102 +1,224 @@
-from django import forms
-from django.contrib.auth.forms import UserCreationForm
-from .models import User, Course, PythonQuestion, Test, Subject
-
-class UserRegistrationForm(UserCreationForm):
-    email = forms.EmailField(
-        required=True,
-        widget=forms.EmailInput(attrs={'class': 'form-control'})
-    )
-    user_type = forms.ChoiceField(
-        choices=User.USER_TYPE_CHOICES,
-        widget=forms.RadioSelect,
-        initial='student'
-    )
-
-    class Meta:
-        model = User
-        fields = ['username', 'email', 'user_type', 'password1', 'password2']
-    
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields['username'].widget.attrs.update({'class': 'form-control'})
-        self.fields['password1'].widget.attrs.update({'class': 'form-control'})
-        self.fields['password2'].widget.attrs.update({'class': 'form-control'})
-    
-    def save(self, commit=True):
-        user = super().save(commit=False)
-        user.email = self.cleaned_data['email']
-        user.user_type = self.cleaned_data['user_type']
-        if commit:
-            user.save()
-        return user
-
-
-# ---------------- COURSE CREATION FORM ----------------
-class CourseCreationForm(forms.ModelForm):
-    class Meta:
-        model = Course
-        fields = [
-            'name', 'code', 'description',
-            'subjects', 'start_date', 'end_date', 'is_active'
-        ]
-        widgets = {
-            'start_date': forms.DateInput(attrs={'type': 'date'}),
-            'end_date': forms.DateInput(attrs={'type': 'date'}),
-            'subjects': forms.SelectMultiple(attrs={'class': 'form-control'}),  # Changed to SelectMultiple
-        }
-
-    def __init__(self, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields['subjects'].queryset = Subject.objects.all()
-        self.fields['subjects'].required = True
-# ---------------- PYTHON QUESTION FORM ----------------
-class PythonQuestionForm(forms.ModelForm):
-    class Meta:
-        model = PythonQuestion
-        fields = [
-            'question_text',
-            'option_a', 'option_b', 'option_c', 'option_d',
-            'correct_answer',
-            'explanation',
-            'difficulty',
-            'question_type',
-            'subject',
-            'topic'
-        ]
-
-
-# ---------------- TEST CREATION FORM ----------------
-class TestCreationForm(forms.ModelForm):
-    questions = forms.ModelMultipleChoiceField(
-        queryset=PythonQuestion.objects.none(),
-        widget=forms.CheckboxSelectMultiple,
-        required=True
-    )
-
-    def __init__(self, user, *args, **kwargs):
-        super().__init__(*args, **kwargs)
-        self.fields['questions'].queryset = PythonQuestion.objects.filter(created_by=user)
-        self.fields['course'].queryset = Course.objects.filter(instructor=user)
-
-    class Meta:
-        model = Test
-        fields = [
-            'title', 'description', 'course',
-            'questions', 'time_limit', 'max_score', 'passing_score',
-            'is_published', 'available_from', 'available_to'
-        ]
-        widgets = {
-            'available_from': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
-            'available_to': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
-        }
-
-
-# ---------------- TEXT TO MCQ GENERATION FORM ----------------
-class TextToMCQForm(forms.Form):
-    text = forms.CharField(
-        label="Text Input",
-        widget=forms.Textarea(attrs={'rows': 6, 'placeholder': 'Paste text here...'})
-    )
-    subject = forms.ModelChoiceField(queryset=Subject.objects.all())
-    difficulty = forms.ChoiceField(choices=PythonQuestion.DIFFICULTY_CHOICES)
+from django import forms
+from django.contrib.auth.forms import UserCreationForm
+from django.conf import settings
+from .models import User, Course, PythonQuestion, Test, Subject, Topic
+from .documents import SUPPORTED_EXTENSIONS
+from .question_io import FORMATS as QUESTION_FILE_FORMATS, format_for_filename
+import os
+
+class UserRegistrationForm(UserCreationForm):
+    email = forms.EmailField(
+        required=True,
+        widget=forms.EmailInput(attrs={'class': 'form-control'})
+    )
+    user_type = forms.ChoiceField(
+        choices=User.USER_TYPE_CHOICES,
+        widget=forms.RadioSelect,
+        initial='student'
+    )
+
+    class Meta:
+        model = User
+        fields = ['username', 'email', 'user_type', 'password1', 'password2']
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['username'].widget.attrs.update({'class': 'form-control'})
+        self.fields['password1'].widget.attrs.update({'class': 'form-control'})
+        self.fields['password2'].widget.attrs.update({'class': 'form-control'})
+    
+    def save(self, commit=True):
+        user = super().save(commit=False)
+        user.email = self.cleaned_data['email']
+        user.user_type = self.cleaned_data['user_type']
+        if commit:
+            user.save()
+        return user
+
+
+# ---------------- COURSE CREATION FORM ----------------
+class CourseCreationForm(forms.ModelForm):
+    class Meta:
+        model = Course
+        fields = [
+            'name', 'code', 'description',
+            'subjects', 'start_date', 'end_date', 'is_active'
+        ]
+        widgets = {
+            'start_date': forms.DateInput(attrs={'type': 'date'}),
+            'end_date': forms.DateInput(attrs={'type': 'date'}),
+            'subjects': forms.SelectMultiple(attrs={'class': 'form-control'}),  # Changed to SelectMultiple
+        }
+
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['subjects'].queryset = Subject.objects.all()
+        self.fields['subjects'].required = True
+# ---------------- PYTHON QUESTION FORM ----------------
+class PythonQuestionForm(forms.ModelForm):
+    class Meta:
+        model = PythonQuestion
+        fields = [
+            'question_text',
+            'option_a', 'option_b', 'option_c', 'option_d',
+            'correct_answer',
+            'explanation',
+            'difficulty',
+            'question_type',
+            'subject',
+            'topic'
+        ]
+
+
+# ---------------- TEST CREATION FORM ----------------
+class TestCreationForm(forms.ModelForm):
+    questions = forms.ModelMultipleChoiceField(
+        queryset=PythonQuestion.objects.none(),
+        widget=forms.CheckboxSelectMultiple,
+        required=True
+    )
+
+    def __init__(self, user, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['questions'].queryset = PythonQuestion.objects.filter(created_by=user)
+        self.fields['course'].queryset = Course.objects.filter(instructor=user)
+
+    class Meta:
+        model = Test
+        fields = [
+            'title', 'description', 'course',
+            'questions', 'time_limit', 'max_score', 'passing_score',
+            'is_published', 'available_from', 'available_to'
+        ]
+        widgets = {
+            'available_from': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+            'available_to': forms.DateTimeInput(attrs={'type': 'datetime-local'}),
+        }
+
+
+# ---------------- TEXT TO MCQ GENERATION FORM ----------------
+class TextToMCQForm(forms.Form):
+    text = forms.CharField(
+        label="Text Input",
+        required=False,
+        widget=forms.Textarea(attrs={'rows': 6, 'placeholder': 'Paste text here...'})
+    )
+    document = forms.FileField(
+        label="Or upload a document",
+        required=False,
+        help_text="Plain text, PDF or Word (.docx) file",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': ','.join(SUPPORTED_EXTENSIONS)})
+    )
+    subject = forms.ModelChoiceField(queryset=Subject.objects.all())
+    difficulty = forms.ChoiceField(choices=PythonQuestion.DIFFICULTY_CHOICES)
+    num_questions = forms.IntegerField(
+        label="Number of Questions",
+        initial=5, min_value=1, max_value=500,
+        widget=forms.NumberInput(attrs={'class': 'form-control'})
+    )
+
+    def clean_document(self):
+        document = self.cleaned_data.get('document')
+        if document:
+            if os.path.splitext(document.name)[1].lower() not in SUPPORTED_EXTENSIONS:
+                raise forms.ValidationError("Upload a .txt, .pdf or .docx file.")
+            if document.size > settings.MCQ_UPLOAD_MAX_BYTES:
+                raise forms.ValidationError("This document is too large.")
+        return document
+
+    def clean(self):
+        cleaned_data = super().clean()
+        if not cleaned_data.get('text', '').strip() and not cleaned_data.get('document'):
+            raise forms.ValidationError("Paste some text or upload a document.")
+        return cleaned_data
+
+
+# ---------------- PERFORMANCE REPORT FILTER FORM ----------------
+class PerformanceFilterForm(forms.Form):
+    course_id = forms.ModelChoiceField(
+        queryset=Course.objects.order_by('name'),
+        required=False,
+        empty_label="All Courses",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    date_from = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+    date_to = forms.DateField(required=False, widget=forms.DateInput(attrs={'type': 'date', 'class': 'form-control'}))
+
+    def clean(self):
+        cleaned_data = super().clean()
+        date_from, date_to = cleaned_data.get('date_from'), cleaned_data.get('date_to')
+        if date_from and date_to and date_from > date_to:
+            raise forms.ValidationError("The start date must be before the end date.")
+        return cleaned_data
+
+
+# ---------------- QUESTION BANK SEARCH FORM ----------------
+class QuestionFilterForm(forms.Form):
+    q = forms.CharField(
+        required=False,
+        label="Search",
+        widget=forms.TextInput(attrs={'class': 'form-control', 'placeholder': 'Search questions...'})
+    )
+    subject = forms.ModelChoiceField(
+        queryset=Subject.objects.order_by('name'), required=False, empty_label="All subjects",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    topic = forms.ModelChoiceField(
+        queryset=Topic.objects.order_by('name'), required=False, empty_label="All topics",
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    difficulty = forms.ChoiceField(
+        choices=[('', 'Any difficulty')] + PythonQuestion.DIFFICULTY_CHOICES, required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+
+# ---------------- QUESTION IMPORT FORM ----------------
+class QuestionImportForm(forms.Form):
+    file = forms.FileField(
+        help_text="CSV, JSON Lines (.jsonl) or QTI 1.2 (.xml) file",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl,.xml,.qti'})
+    )
+    format = forms.ChoiceField(
+        choices=[('', 'From file extension')] + [(fmt, fmt.upper()) for fmt in QUESTION_FILE_FORMATS],
+        required=False,
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        upload = cleaned_data.get('file')
+        if upload and not cleaned_data.get('format'):
+            cleaned_data['format'] = format_for_filename(upload.name)
+            if cleaned_data['format'] is None:
+                raise forms.ValidationError("Choose the file format; it can't be told from the file name.")
+        return cleaned_data
+
+
+# ---------------- ROSTER SYNC FORM ----------------
+class RosterSyncForm(forms.Form):
+    course = forms.ModelChoiceField(
+        queryset=Course.objects.none(),
+        widget=forms.Select(attrs={'class': 'form-select'})
+    )
+    roster = forms.FileField(
+        help_text="CSV with a username or email column, or JSON Lines (.jsonl) with the same keys",
+        widget=forms.ClearableFileInput(attrs={'class': 'form-control', 'accept': '.csv,.jsonl'})
+    )
+    keep_missing = forms.BooleanField(
+        required=False,
+        label="Keep students who are not on the roster",
+        help_text="Only add and reactivate enrollments; nobody is deactivated"
+    )
+    dry_run = forms.BooleanField(required=False, label="Preview the changes without saving them")
+
+    def __init__(self, user, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.fields['course'].queryset = Course.objects.filter(instructor=user).order_by('name')
+
+    def clean_roster(self):
+        roster = self.cleaned_data['roster']
+        self.cleaned_data['format'] = format_for_filename(roster.name)
+        if self.cleaned_data['format'] not in ('csv', 'jsonl'):
+            raise forms.ValidationError("Upload a .csv or .jsonl file.")
+        return roster
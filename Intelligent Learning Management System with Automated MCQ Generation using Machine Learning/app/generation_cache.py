@@ -0,0 +1,107 @@
+"""Cache of generated MCQs keyed by the submitted text and generator parameters.
+
+Entries live in the ``MCQ_CACHE_ALIAS`` cache (see ``CACHES`` in settings),
+which handles size limits and expiry; the default backend evicts the least
+recently used entries.  Difficulty is not part of the key because it does
+not change what the generator produces.
+
+Hit and miss counts are kept in ``MCQCacheCounter`` rows rather than in the
+cache: every worker process and ``manage.py mcq_cache_stats`` see the same
+totals, and culling cache entries can't reset them.  Each process adds up
+its lookups and writes them every ``FLUSH_LOOKUPS`` lookups or
+``FLUSH_SECONDS`` seconds, so a hit costs no database write; totals read from
+another process can lag by that much.
+"""
+import hashlib
+import json
+import threading
+import time
+from collections import Counter
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db.models import F
+
+from .models import MCQCacheCounter
+
+KEY_VERSION = 1
+HITS = 'hits'
+MISSES = 'misses'
+FLUSH_LOOKUPS = 100
+FLUSH_SECONDS = 60
+
+_pending = Counter()
+_pending_lock = threading.Lock()
+_last_flush = time.monotonic()
+
+
+def _cache():
+    return caches[getattr(settings, 'MCQ_CACHE_ALIAS', 'default')]
+
+
+def normalize_text(text):
+    return ' '.join(text.split())
+
+
+def make_key(text, subject_id, num_questions):
+    payload = json.dumps([normalize_text(text), subject_id, num_questions])
+    return f"mcq-cache:{KEY_VERSION}:{hashlib.sha256(payload.encode('utf-8')).hexdigest()}"
+
+
+def _incr(name, amount):
+    if not MCQCacheCounter.objects.filter(name=name).update(value=F('value') + amount):
+        _, created = MCQCacheCounter.objects.get_or_create(name=name, defaults={'value': amount})
+        if not created:
+            # Another process created the row first
+            MCQCacheCounter.objects.filter(name=name).update(value=F('value') + amount)
+
+
+def _count(name):
+    with _pending_lock:
+        _pending[name] += 1
+        due = sum(_pending.values()) >= FLUSH_LOOKUPS or time.monotonic() - _last_flush >= FLUSH_SECONDS
+    if due:
+        flush_stats()
+
+
+def flush_stats():
+    """Write the lookups this process has counted since the last flush."""
+    global _last_flush
+    with _pending_lock:
+        counts = dict(_pending)
+        _pending.clear()
+        _last_flush = time.monotonic()
+    for name, amount in counts.items():
+        if amount:
+            _incr(name, amount)
+
+
+def get(text, subject_id, num_questions):
+    mcqs = _cache().get(make_key(text, subject_id, num_questions))
+    _count(HITS if mcqs is not None else MISSES)
+    return mcqs
+
+
+def set(text, subject_id, num_questions, mcqs):
+    _cache().set(make_key(text, subject_id, num_questions), mcqs)
+
+
+def stats():
+    flush_stats()
+    counters = dict(MCQCacheCounter.objects.values_list('name', 'value'))
+    hits = counters.get(HITS, 0)
+    misses = counters.get(MISSES, 0)
+    lookups = hits + misses
+    return {
+        'hits': hits,
+        'misses': misses,
+        'hit_rate': hits / lookups if lookups else 0.0,
+    }
+
+
+def reset_stats():
+    global _last_flush
+    with _pending_lock:
+        _pending.clear()
+        _last_flush = time.monotonic()
+    MCQCacheCounter.objects.update(value=0)
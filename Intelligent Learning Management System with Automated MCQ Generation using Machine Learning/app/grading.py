@@ -0,0 +1,169 @@
+"""Grading of submitted answer sheets.
+
+A submission is scored in memory against the test's answer key and written
+back with one ``bulk_create`` and one attempt update inside a single
+transaction, together with the update of the summary tables in
+``stats.py``.  ``bulk_create`` skips ``TestResult.save()``, so the per-row
+``calculate_score()`` round trips never run.
+
+Answer keys are compiled once per test and kept in the ``TEST_CACHE_ALIAS``
+cache, shared by all workers; the handlers in ``signals.py`` drop them when a
+test or its questions change.  The cache can outlive the database (a flush,
+a restore, a test run), so each key records the ``created_at`` of the test
+row it was built from and is rebuilt when a reused test id no longer matches.
+"""
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.utils import timezone
+
+from . import shuffling, stats
+from .models import PythonQuestion, TestAttempt, TestResult
+
+VALID_OPTIONS = frozenset('ABCD')
+
+
+class AnswerKey:
+    """Correct letter for every question of a test, keyed by question id string."""
+
+    def __init__(self, test_id, answers, version=None):
+        self.test_id = test_id
+        self.answers = answers
+        self.count = len(answers)
+        self.version = version
+
+    def __repr__(self):
+        return f"<AnswerKey test={self.test_id} questions={self.count}>"
+
+
+def _cache():
+    return caches[getattr(settings, 'TEST_CACHE_ALIAS', 'default')]
+
+
+def _answer_key_cache_key(test_id):
+    return f'answer-key:{test_id}'
+
+
+def cache_version(test):
+    """Identity of ``test``'s row: ids are reused after a flush or restore, creation times are not."""
+    return test.created_at.isoformat()
+
+
+def get_answer_key(test):
+    key = _cache().get(_answer_key_cache_key(test.pk))
+    if key is None or key.version != cache_version(test):
+        answers = PythonQuestion.objects.filter(tests=test.pk).values_list('id', 'correct_answer')
+        key = AnswerKey(test.pk, {str(question_id): letter for question_id, letter in answers}, cache_version(test))
+        _cache().set(_answer_key_cache_key(test.pk), key, getattr(settings, 'ANSWER_KEY_CACHE_TIMEOUT', 24 * 60 * 60))
+    return key
+
+
+def invalidate_answer_keys(test_ids):
+    _cache().delete_many([_answer_key_cache_key(test_id) for test_id in test_ids])
+
+
+def answers_from_post(data):
+    """Map question id -> selected letter from ``question_<id>`` form fields."""
+    return {
+        name[len('question_'):]: value
+        for name, value in data.items()
+        if name.startswith('question_')
+    }
+
+
+def save_answers(attempt, answers):
+    """Upsert answers (question id -> displayed letter) for an attempt in one statement.
+
+    Used both by the autosave endpoint and on final submit; a later answer
+    for the same question replaces the earlier one.  Returns the number of
+    answers stored.
+    """
+    answer_key = get_answer_key(attempt.test)
+    results = []
+    for question_id, display_letter in answers.items():
+        correct_answer = answer_key.answers.get(str(question_id))
+        if correct_answer is None:
+            continue
+        # Students answer with the letters they saw; undo this attempt's option shuffle
+        selected = shuffling.to_canonical(attempt.id, question_id, display_letter or '')
+        if selected not in VALID_OPTIONS:
+            continue
+        results.append(TestResult(
+            attempt_id=attempt.pk,
+            question_id=question_id,
+            selected_option=selected,
+            is_correct=selected == correct_answer,
+            answered_at=timezone.now(),
+        ))
+    if results:
+        TestResult.objects.bulk_create(
+            results,
+            update_conflicts=True,
+            unique_fields=['attempt', 'question'],
+            update_fields=['selected_option', 'is_correct', 'answered_at'],
+        )
+    return len(results)
+
+
+def _lock(attempt):
+    # Only the attempt row is locked; the test is fetched alongside for its answer key
+    return TestAttempt.objects.select_related('test').select_for_update(of=('self',)).get(pk=attempt.pk)
+
+
+def autosave(attempt, answers):
+    """Store in-progress ``answers`` unless ``attempt`` has been submitted meanwhile.
+
+    Takes the same row lock as :func:`grade_submission`, so an autosave racing
+    the final submit either lands before grading or finds the attempt
+    completed.  Returns the number of answers stored, or None if the attempt
+    is already completed.
+    """
+    with transaction.atomic():
+        attempt = _lock(attempt)
+        if attempt.completed_at:
+            return None
+        return save_answers(attempt, answers)
+
+
+def grade_submission(attempt, answers):
+    """Store the final ``answers`` for ``attempt``, score everything saved and mark it completed.
+
+    Returns the updated attempt.  An attempt that is already completed is
+    returned unchanged, so a double submit can't grade twice.
+    """
+    with transaction.atomic():
+        attempt = _lock(attempt)
+        if attempt.completed_at:
+            return attempt
+
+        save_answers(attempt, answers)
+
+        # Re-check autosaved rows against the current key in case it changed mid-exam
+        answer_key = get_answer_key(attempt.test)
+        correct = 0
+        stale = []
+        results = attempt.results.values_list('id', 'question_id', 'selected_option', 'is_correct')
+        for result_id, question_id, selected, stored_is_correct in results:
+            is_correct = selected == answer_key.answers.get(str(question_id))
+            correct += is_correct
+            if stored_is_correct != is_correct:
+                stale.append(TestResult(id=result_id, is_correct=is_correct))
+        if stale:
+            TestResult.objects.bulk_update(stale, ['is_correct'])
+
+        total = answer_key.count
+        attempt.total_questions = total
+        attempt.correct_answers = correct
+        attempt.score = (correct / total) * 100 if total else 0
+        attempt.completed_at = timezone.now()
+        attempt.save(update_fields=['total_questions', 'correct_answers', 'score', 'completed_at'])
+        stats.record_attempt(attempt)
+    return attempt
+
+
+def saved_answers(attempt):
+    """Answers stored so far for an in-progress attempt, as question id -> displayed letter."""
+    return {
+        str(question_id): shuffling.to_display(attempt.id, question_id, selected)
+        for question_id, selected in attempt.results.values_list('question_id', 'selected_option')
+    }
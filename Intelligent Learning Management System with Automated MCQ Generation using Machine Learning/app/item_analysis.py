@@ -0,0 +1,152 @@
+"""Classical item analysis of a test's questions.
+
+The answers of all completed attempts are loaded into an attempts x
+questions matrix of option indexes (``-1`` for unanswered) and every
+statistic is computed on whole columns with NumPy:
+
+* p-value: share of attempts answering the item correctly (difficulty)
+* discrimination: point-biserial correlation of the item with the rest
+  score (total score without the item itself)
+* option frequencies: share of attempts choosing each option, so weak
+  distractors (chosen by almost nobody) stand out
+* KR-20: internal-consistency reliability of the whole test
+
+Rows are read with a raw cursor and mapped to matrix cells with
+``np.unique``, so no Python code runs per ``TestResult`` beyond fetching it.
+"""
+import numpy as np
+from django.db import connection
+
+from .grading import get_answer_key
+from .models import PythonQuestion, TestAttempt, TestResult
+
+OPTIONS = 'ABCD'
+FETCH_SIZE = 50000
+
+
+class ItemAnalysis:
+    """Item statistics of one test; arrays are indexed like ``question_ids``."""
+
+    def __init__(self, test_id, question_ids, choices, correct_options):
+        self.test_id = test_id
+        self.question_ids = question_ids
+        self.attempt_count, self.question_count = choices.shape
+        self.correct_options = correct_options
+
+        correct = (choices == correct_options).astype(np.float64)
+        totals = correct.sum(axis=1)
+        self.mean_score = totals.mean() if self.attempt_count else None
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            self.p_values = correct.mean(axis=0)
+            self.discrimination = _point_biserial(correct, totals)
+            self.option_frequencies = np.stack(
+                [(choices == option).mean(axis=0) for option in range(len(OPTIONS))], axis=1
+            )
+            self.omitted = (choices == -1).mean(axis=0)
+        self.kr20 = _kr20(self.p_values, totals)
+
+    def items(self):
+        """One dict per question for templates, in test order."""
+        questions = PythonQuestion.objects.in_bulk(self.question_ids)
+        for index, question_id in enumerate(self.question_ids):
+            yield {
+                'question': questions.get(question_id),
+                'p_value': _number(self.p_values[index]),
+                'discrimination': _number(self.discrimination[index]),
+                'omitted': _number(self.omitted[index]),
+                'options': [
+                    {
+                        'letter': letter,
+                        'frequency': _number(self.option_frequencies[index, option]),
+                        'is_correct': option == self.correct_options[index],
+                    }
+                    for option, letter in enumerate(OPTIONS)
+                ],
+            }
+
+    def __repr__(self):
+        return f"<ItemAnalysis test={self.test_id} attempts={self.attempt_count} questions={self.question_count}>"
+
+
+def _number(value):
+    return None if value is None or np.isnan(value) else float(value)
+
+
+def _point_biserial(correct, totals):
+    """Pearson correlation of each item column with the rest score, column-wise."""
+    rest = totals[:, None] - correct
+    item_dev = correct - correct.mean(axis=0)
+    rest_dev = rest - rest.mean(axis=0)
+    covariance = (item_dev * rest_dev).sum(axis=0)
+    scale = np.sqrt((item_dev ** 2).sum(axis=0) * (rest_dev ** 2).sum(axis=0))
+    return np.where(scale > 0, covariance / scale, np.nan)
+
+
+def _kr20(p_values, totals):
+    items = len(p_values)
+    if items < 2 or not len(totals):
+        return None
+    variance = totals.var()
+    if variance == 0:
+        return None
+    return float(items / (items - 1) * (1 - (p_values * (1 - p_values)).sum() / variance))
+
+
+def _fetch_columns(test_id):
+    """Attempt ids, question ids and selected letters of the test's completed attempts."""
+    results = TestResult.objects.filter(
+        attempt__test_id=test_id, attempt__completed_at__isnull=False
+    ).values_list('attempt_id', 'question_id', 'selected_option')
+    sql, params = results.query.sql_with_params()
+    columns = ([], [], [])
+    with connection.cursor() as cursor:
+        cursor.execute(sql, params)
+        while rows := cursor.fetchmany(FETCH_SIZE):
+            for column, values in zip(columns, zip(*rows)):
+                column.extend(values)
+    return columns
+
+
+def _keys(values):
+    keys = np.array(values)
+    # UUID objects (PostgreSQL) sort as Python objects; compare them as text instead
+    return keys.astype(str) if keys.dtype == object else keys
+
+
+def _option_indexes(letters):
+    codes = np.array(letters, dtype='<U1').view(np.uint32)
+    lookup = np.full(256, -1, dtype=np.int8)
+    lookup[[ord(letter) for letter in OPTIONS]] = np.arange(len(OPTIONS))
+    return np.where(codes < 256, lookup[np.minimum(codes, 255)], -1)
+
+
+def analyze_test(test):
+    """Build the :class:`ItemAnalysis` of ``test`` from its completed attempts."""
+    test_id = test.pk
+    answer_key = get_answer_key(test)
+    question_ids = list(answer_key.answers)
+    correct_options = np.array([OPTIONS.index(answer_key.answers[key]) for key in question_ids], dtype=np.int8)
+    # Stored question ids come back as hex strings (SQLite) or dashed UUIDs
+    column_of = {key.replace('-', ''): index for index, key in enumerate(question_ids)}
+
+    attempt_count = TestAttempt.objects.filter(test_id=test_id, completed_at__isnull=False).count()
+    attempt_ids, result_questions, selected = _fetch_columns(test_id)
+
+    if attempt_ids:
+        question_keys, question_index = np.unique(_keys(result_questions), return_inverse=True)
+        key_columns = np.array([column_of.get(key.replace('-', ''), -1) for key in question_keys])
+        columns = key_columns[question_index]
+        attempt_keys, rows = np.unique(_keys(attempt_ids), return_inverse=True)
+        options = _option_indexes(selected)
+
+        # Attempts without any answer keep all-unanswered rows after the answered ones
+        choices = np.full((max(attempt_count, len(attempt_keys)), len(question_ids)), -1, dtype=np.int8)
+        # Answers to questions no longer on the test are dropped
+        kept = columns >= 0
+        choices[rows[kept], columns[kept]] = options[kept]
+    else:
+        choices = np.full((attempt_count, len(question_ids)), -1, dtype=np.int8)
+
+    question_pks = [PythonQuestion._meta.pk.to_python(key) for key in question_ids]
+    return ItemAnalysis(test_id, question_pks, choices, correct_options)
@@ -0,0 +1,236 @@
+"""Database-backed queue for MCQ generation jobs.
+
+Jobs are rows in ``MCQGenerationJob``.  By default they are picked up by a
+small thread pool inside the web process; ``manage.py run_mcq_jobs`` drains
+the same table from a separate process.  Either way workers claim jobs from
+the table with a conditional UPDATE, so a job runs exactly once no matter
+how many workers are polling, and jobs queued before a restart are found
+again.  The in-process pool is woken when a job is submitted and whenever its
+status is polled.
+
+A running job refreshes ``heartbeat_at`` from a background thread; jobs whose
+heartbeat is older than ``MCQ_JOB_STALE_AFTER`` seconds lost their worker and
+are put back on the queue.
+"""
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import close_old_connections, connection, transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from . import distractors, documents, generation_cache
+from .mcq_generator import get_generator
+from .models import GeneratedBatch, GeneratedItem, MCQGenerationJob
+
+logger = logging.getLogger(__name__)
+
+_executor = None
+_executor_lock = threading.Lock()
+_draining = 0
+_draining_lock = threading.Lock()
+
+
+def _max_workers():
+    return getattr(settings, 'MCQ_JOB_WORKERS', 2)
+
+
+def _stale_after():
+    return getattr(settings, 'MCQ_JOB_STALE_AFTER', 600)
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        with _executor_lock:
+            if _executor is None:
+                _executor = ThreadPoolExecutor(max_workers=_max_workers(), thread_name_prefix='mcq-job')
+    return _executor
+
+
+def submit(job):
+    """Wake the in-process pool for ``job`` once the current transaction commits."""
+    transaction.on_commit(wake)
+
+
+def wake():
+    """Have the in-process pool work through the queue, unless a separate worker runs jobs."""
+    global _draining
+    if not getattr(settings, 'MCQ_JOB_RUN_IN_PROCESS', True):
+        return
+    with _draining_lock:
+        if _draining >= _max_workers():
+            return
+        _draining += 1
+    _get_executor().submit(_drain)
+
+
+def _drain():
+    global _draining
+    try:
+        while True:
+            requeue_stale()
+            job_id = claim_next()
+            if job_id is None:
+                return
+            run_job(job_id, claimed=True)
+    except Exception:
+        logger.exception("MCQ job worker stopped")
+    finally:
+        with _draining_lock:
+            _draining -= 1
+        close_old_connections()
+
+
+class _Heartbeat:
+    """Refresh a running job's ``heartbeat_at`` from a background thread until stopped."""
+
+    def __init__(self, job_id):
+        self.job_id = job_id
+        self.interval = max(_stale_after() / 4, 1)
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._beat, name=f'mcq-heartbeat-{job_id}', daemon=True)
+
+    def _beat(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                MCQGenerationJob.objects.filter(pk=self.job_id, status='running').update(heartbeat_at=timezone.now())
+        except Exception:
+            logger.exception("Heartbeat of MCQ job %s failed", self.job_id)
+        finally:
+            connection.close()
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+
+def claim(job_id):
+    now = timezone.now()
+    return MCQGenerationJob.objects.filter(pk=job_id, status='pending').update(
+        status='running', progress=10, started_at=now, heartbeat_at=now
+    ) == 1
+
+
+def claim_next():
+    """Claim the oldest pending job, returning its id or None when the queue is empty."""
+    while True:
+        job_id = (
+            MCQGenerationJob.objects.filter(status='pending')
+            .order_by('created_at')
+            .values_list('pk', flat=True)
+            .first()
+        )
+        if job_id is None:
+            return None
+        if claim(job_id):
+            return job_id
+
+
+def requeue_stale(max_age=None):
+    """Put running jobs whose heartbeat stopped (their worker died) back on the queue."""
+    cutoff = timezone.now() - timedelta(seconds=_stale_after() if max_age is None else max_age)
+    return MCQGenerationJob.objects.filter(
+        Q(heartbeat_at__lt=cutoff) | Q(heartbeat_at__isnull=True, started_at__lt=cutoff),
+        status='running',
+    ).update(status='pending', progress=0, started_at=None, heartbeat_at=None)
+
+
+def run_job(job_id, claimed=False):
+    if not claimed and not claim(job_id):
+        return
+    job = MCQGenerationJob.objects.get(pk=job_id)
+    try:
+        with _Heartbeat(job_id):
+            if job.source_file:
+                mcqs = _generate_from_file(job)
+            else:
+                mcqs = _generate_from_text(job)
+        # The answers picked from this text make good distractors for later questions
+        distractors.record_terms(job.subject_id, [(mcq['correct_answer'], mcq['answer_tag']) for mcq in mcqs])
+    except Exception as exc:
+        logger.exception("MCQ generation job %s failed", job_id)
+        MCQGenerationJob.objects.filter(pk=job_id).update(
+            status='failed', error=str(exc), source_file='', finished_at=timezone.now()
+        )
+        return
+    finally:
+        if job.source_file:
+            job.source_file.delete(save=False)
+
+    with transaction.atomic():
+        batch = store_batch(job, mcqs)
+        MCQGenerationJob.objects.filter(pk=job_id).update(
+            status='done', progress=100, batch=batch, source_file='', finished_at=timezone.now()
+        )
+
+
+def store_batch(job, mcqs):
+    """Persist generated questions for review; the session only keeps the batch id."""
+    ttl = getattr(settings, 'MCQ_BATCH_TTL', 24 * 60 * 60)
+    batch = GeneratedBatch.objects.create(
+        created_by_id=job.created_by_id,
+        subject_id=job.subject_id,
+        difficulty=job.difficulty,
+        expires_at=timezone.now() + timedelta(seconds=ttl),
+    )
+    GeneratedItem.objects.bulk_create([
+        GeneratedItem(
+            batch=batch,
+            position=position,
+            question_text=mcq['question'],
+            options=mcq['options'],
+            correct_answer=mcq['correct_answer'],
+            answer_tag=mcq.get('answer_tag', ''),
+            explanation=mcq.get('explanation', ''),
+        )
+        for position, mcq in enumerate(mcqs)
+    ])
+    return batch
+
+
+def delete_expired(now=None):
+    """Remove expired review batches and the jobs that produced them."""
+    now = now or timezone.now()
+    cutoff = now - timedelta(seconds=getattr(settings, 'MCQ_BATCH_TTL', 24 * 60 * 60))
+    jobs_deleted, _ = MCQGenerationJob.objects.filter(status__in=('done', 'failed'), finished_at__lt=cutoff).delete()
+    _, deleted = GeneratedBatch.objects.filter(expires_at__lte=now).delete()
+    return deleted.get(GeneratedBatch._meta.label, 0), jobs_deleted
+
+
+def _generate_from_text(job):
+    generator = get_generator()
+    pool = distractors.get_pool(job.subject_id)
+    if len(job.text) >= getattr(settings, 'MCQ_PARALLEL_MIN_CHARS', 200_000):
+        mcqs = generator.generate_mcqs_parallel(
+            job.text, job.num_questions,
+            workers=getattr(settings, 'MCQ_PARALLEL_WORKERS', None),
+            distractors=pool,
+        )
+    else:
+        mcqs = generator.generate_mcqs(job.text, job.num_questions, distractors=pool)
+    generation_cache.set(job.text, job.subject_id, job.num_questions, mcqs)
+    return mcqs
+
+
+def _generate_from_file(job):
+    generator = get_generator()
+    pool = distractors.get_pool(job.subject_id)
+    mcqs = []
+    reported = 10
+    with job.source_file.open('rb') as source:
+        paragraphs = documents.iter_paragraphs(source, job.source_file.name)
+        for mcq in generator.generate_mcqs_stream(paragraphs, job.num_questions, distractors=pool):
+            mcqs.append(mcq)
+            progress = 10 + 90 * len(mcqs) // job.num_questions
+            if progress - reported >= 10:
+                MCQGenerationJob.objects.filter(pk=job.pk).update(progress=min(progress, 99))
+                reported = progress
+    return mcqs
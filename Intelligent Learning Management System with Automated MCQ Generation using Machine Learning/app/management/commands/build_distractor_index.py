@@ -0,0 +1,26 @@
+from django.core.management.base import BaseCommand
+
+from app import distractors
+from app.models import DistractorTerm
+
+
+class Command(BaseCommand):
+    help = "Build the distractor index from the options of the question bank"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--subject', type=int, default=None, help="Only index questions of this subject id")
+        parser.add_argument('--clear', action='store_true', help="Delete existing index entries first")
+
+    def handle(self, *args, **options):
+        subject_id = options['subject']
+        if options['clear']:
+            terms = DistractorTerm.objects.all()
+            if subject_id is not None:
+                terms = terms.filter(subject_id=subject_id)
+            deleted, _ = terms.delete()
+            self.stdout.write(f"Deleted {deleted} index entries")
+
+        count = distractors.rebuild_index(subject_id)
+        self.stdout.write(self.style.SUCCESS(
+            f"Indexed {count} questions, {DistractorTerm.objects.count()} distractor terms in total"
+        ))
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from app import jobs
+
+
+class Command(BaseCommand):
+    help = "Delete expired generated MCQ batches and finished generation jobs"
+
+    def handle(self, *args, **options):
+        batches, finished_jobs = jobs.delete_expired()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {batches} expired batch(es) and {finished_jobs} old job(s)"))
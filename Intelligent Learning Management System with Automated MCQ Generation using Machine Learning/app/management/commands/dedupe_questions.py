@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from app import near_duplicates
+from app.models import PythonQuestion
+
+
+class Command(BaseCommand):
+    help = "Find near-duplicate questions in one pass over the bank and rebuild the duplicate index"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--threshold', type=float, default=None,
+                            help="Similarity (0-1) above which questions are duplicates (default: MCQ_DUPLICATE_THRESHOLD)")
+        parser.add_argument('--delete', action='store_true',
+                            help="Delete duplicates that are not part of any test")
+        parser.add_argument('--batch-size', type=int, default=1000)
+
+    def handle(self, *args, **options):
+        duplicates = []
+        for question, original_id, score in near_duplicates.scan_bank(options['batch_size'], options['threshold']):
+            duplicates.append(question.pk)
+            if options['verbosity'] > 1:
+                self.stdout.write(f"{question.pk} duplicates {original_id} ({score:.2f}): {question.question_text[:60]}")
+        self.stdout.write(f"Found {len(duplicates)} near-duplicate question(s)")
+
+        if options['delete'] and duplicates:
+            deleted = 0
+            for start in range(0, len(duplicates), options['batch_size']):
+                ids = duplicates[start:start + options['batch_size']]
+                unused = PythonQuestion.objects.filter(pk__in=ids, tests__isnull=True)
+                # Deleted one by one so the post_delete handlers clean up the search index
+                for question in unused:
+                    question.delete()
+                    deleted += 1
+            self.stdout.write(self.style.SUCCESS(
+                f"Deleted {deleted} duplicate(s); {len(duplicates) - deleted} are used in tests and were kept"
+            ))
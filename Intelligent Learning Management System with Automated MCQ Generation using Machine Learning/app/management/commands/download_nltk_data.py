@@ -0,0 +1,38 @@
+from django.conf import settings
+from django.core.management.base import BaseCommand, CommandError
+
+from app import nltk_resources
+
+
+class Command(BaseCommand):
+    help = "Download the NLTK data used by the MCQ generator into NLTK_DATA_DIR"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--dir', dest='data_dir', default=None,
+            help="Target directory (defaults to settings.NLTK_DATA_DIR)",
+        )
+        parser.add_argument(
+            '--check', action='store_true',
+            help="Only report which resources are missing, don't download anything",
+        )
+
+    def handle(self, *args, **options):
+        data_dir = options['data_dir'] or settings.NLTK_DATA_DIR
+        nltk_resources.configure_data_path(data_dir)
+
+        missing = nltk_resources.missing_resources()
+        if options['check']:
+            if missing:
+                raise CommandError(f"Missing NLTK data: {', '.join(missing)}")
+            self.stdout.write(self.style.SUCCESS("All NLTK data is installed."))
+            return
+
+        if not missing:
+            self.stdout.write(self.style.SUCCESS(f"NLTK data already installed in {data_dir}"))
+            return
+
+        failed = nltk_resources.provision(data_dir, missing, quiet=options['verbosity'] < 2)
+        if failed:
+            raise CommandError(f"Could not download: {', '.join(failed)}")
+        self.stdout.write(self.style.SUCCESS(f"Installed {', '.join(missing)} into {data_dir}"))
@@ -0,0 +1,34 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from app import question_io
+from app.models import PythonQuestion
+
+
+class Command(BaseCommand):
+    help = "Export questions as CSV, JSON Lines or QTI 1.2, streaming them from the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--format', choices=sorted(question_io.FORMATS), default='csv')
+        parser.add_argument('--author', help="Only export questions created by this username")
+        parser.add_argument('--output', '-o', help="File to write (default: standard output)")
+        parser.add_argument('--chunk-size', type=int, default=question_io.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        questions = PythonQuestion.objects.all()
+        if options['author']:
+            questions = questions.filter(created_by__username=options['author'])
+        chunks = question_io.EXPORTERS[options['format']](questions, options['chunk_size'])
+
+        if not options['output']:
+            for chunk in chunks:
+                sys.stdout.write(chunk)
+            return
+        try:
+            with open(options['output'], 'w', encoding='utf-8', newline='') as target:
+                for chunk in chunks:
+                    target.write(chunk)
+        except OSError as exc:
+            raise CommandError(f"Can't write {options['output']}: {exc}")
+        self.stdout.write(self.style.SUCCESS(f"Exported questions to {options['output']}"))
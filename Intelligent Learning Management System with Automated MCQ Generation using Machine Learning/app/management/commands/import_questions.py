@@ -0,0 +1,35 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import question_io
+from app.models import User
+
+
+class Command(BaseCommand):
+    help = "Import questions from a CSV, JSON Lines or QTI 1.2 file in chunks"
+
+    def add_arguments(self, parser):
+        parser.add_argument('path')
+        parser.add_argument('--author', required=True, help="Username of the instructor who will own the questions")
+        parser.add_argument('--format', choices=sorted(question_io.FORMATS),
+                            help="File format (default: guessed from the extension)")
+        parser.add_argument('--chunk-size', type=int, default=question_io.CHUNK_SIZE)
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or question_io.format_for_filename(options['path'])
+        if fmt is None:
+            raise CommandError("Can't tell the format from the file name; pass --format")
+        try:
+            author = User.objects.get(username=options['author'])
+        except User.DoesNotExist:
+            raise CommandError(f"No user named '{options['author']}'")
+
+        with open(options['path'], 'rb') as source:
+            report = question_io.import_questions(source, fmt, author, options['chunk_size'])
+
+        for number, messages in report.errors:
+            self.stderr.write(f"Row {number}: {'; '.join(messages)}")
+        if report.error_count > len(report.errors):
+            self.stderr.write(f"... and {report.error_count - len(report.errors)} more row error(s)")
+        self.stdout.write(self.style.SUCCESS(
+            f"Imported {report.created} question(s); {report.error_count} row(s) skipped"
+        ))
@@ -0,0 +1,19 @@
+from django.core.management.base import BaseCommand
+
+from app import generation_cache
+
+
+class Command(BaseCommand):
+    help = "Show hit/miss counters of the MCQ generation cache"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--reset', action='store_true', help="Reset the counters after printing them")
+
+    def handle(self, *args, **options):
+        stats = generation_cache.stats()
+        self.stdout.write(
+            f"hits: {stats['hits']}  misses: {stats['misses']}  hit rate: {stats['hit_rate']:.1%}"
+        )
+        if options['reset']:
+            generation_cache.reset_stats()
+            self.stdout.write("Counters reset.")
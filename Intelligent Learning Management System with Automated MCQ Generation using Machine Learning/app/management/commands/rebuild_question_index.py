@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from app import question_search
+
+
+class Command(BaseCommand):
+    help = "Rebuild the full-text search index of the question bank"
+
+    def handle(self, *args, **options):
+        if not question_search.fts_enabled():
+            self.stdout.write("Full-text indexing is only used on SQLite; nothing to do")
+            return
+        count = question_search.rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {count} question(s)"))
@@ -0,0 +1,13 @@
+from django.core.management.base import BaseCommand
+
+from app import stats
+
+
+class Command(BaseCommand):
+    help = "Rebuild the per-student and per-test statistics tables from completed attempts"
+
+    def handle(self, *args, **options):
+        student_rows, test_rows = stats.rebuild()
+        self.stdout.write(self.style.SUCCESS(
+            f"Rebuilt {student_rows} student/course row(s) and {test_rows} test row(s)"
+        ))
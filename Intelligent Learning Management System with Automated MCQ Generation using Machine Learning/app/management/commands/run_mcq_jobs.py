@@ -0,0 +1,39 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from app import jobs
+
+
+class Command(BaseCommand):
+    help = "Process queued MCQ generation jobs"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--once', action='store_true',
+            help="Exit when the queue is empty instead of polling for new jobs",
+        )
+        parser.add_argument(
+            '--poll-interval', type=float, default=2.0,
+            help="Seconds to wait between polls when the queue is empty",
+        )
+
+    def handle(self, *args, **options):
+        processed = 0
+        while True:
+            requeued = jobs.requeue_stale()
+            if requeued:
+                self.stdout.write(f"Requeued {requeued} stale job(s)")
+
+            job_id = jobs.claim_next()
+            if job_id is None:
+                if options['once']:
+                    break
+                time.sleep(options['poll_interval'])
+                continue
+
+            jobs.run_job(job_id, claimed=True)
+            processed += 1
+            self.stdout.write(f"Finished job {job_id}")
+
+        self.stdout.write(self.style.SUCCESS(f"Processed {processed} job(s)"))
@@ -0,0 +1,43 @@
+from django.core.management.base import BaseCommand, CommandError
+
+from app import question_io, rosters
+from app.models import Course
+
+
+class Command(BaseCommand):
+    help = "Sync a course's enrollments with a CSV or JSON Lines roster of usernames or emails"
+
+    def add_arguments(self, parser):
+        parser.add_argument('course_code')
+        parser.add_argument('path')
+        parser.add_argument('--format', choices=sorted(rosters.READERS),
+                            help="File format (default: guessed from the extension)")
+        parser.add_argument('--keep-missing', action='store_true',
+                            help="Don't deactivate enrolled students who are not on the roster")
+        parser.add_argument('--dry-run', action='store_true', help="Report the changes without saving them")
+
+    def handle(self, *args, **options):
+        fmt = options['format'] or question_io.format_for_filename(options['path'])
+        if fmt not in rosters.READERS:
+            raise CommandError("Can't tell the format from the file name; pass --format")
+        try:
+            course = Course.objects.get(code=options['course_code'])
+        except Course.DoesNotExist:
+            raise CommandError(f"No course with code '{options['course_code']}'")
+
+        with open(options['path'], 'rb') as source:
+            report = rosters.sync_roster(
+                course, source, fmt, deactivate_missing=not options['keep_missing'], dry_run=options['dry_run']
+            )
+
+        for number, message in report.errors:
+            self.stderr.write(f"Row {number}: {message}")
+        if report.error_count > len(report.errors):
+            self.stderr.write(f"... and {report.error_count - len(report.errors)} more row error(s)")
+        if report.unreadable:
+            raise CommandError("The roster could not be read to the end, so nothing was changed")
+        summary = (
+            f"{report.created} enrolled, {report.reactivated} reactivated, {report.deactivated} deactivated, "
+            f"{report.unchanged} unchanged, {report.error_count} row(s) skipped"
+        )
+        self.stdout.write(self.style.SUCCESS(f"{'Dry run: ' if options['dry_run'] else ''}{summary}"))
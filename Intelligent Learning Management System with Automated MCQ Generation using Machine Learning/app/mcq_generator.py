@@ -1,58 +1,247 @@
-import nltk
-from nltk.tokenize import sent_tokenize, word_tokenize
-from nltk.corpus import stopwords
-from nltk.stem import WordNetLemmatizer
-from nltk import pos_tag
-import random
-
-# Download necessary NLTK data
-nltk.download('punkt')
-nltk.download('stopwords')
-nltk.download('wordnet')
-nltk.download('averaged_perceptron_tagger')
-
-
-class MCQGenerator:
-    def __init__(self):
-        self.lemmatizer = WordNetLemmatizer()
-        self.stop_words = set(stopwords.words('english'))
-        self.important_pos_tags = ['NN', 'NNS', 'NNP', 'NNPS', 'JJ', 'JJR', 'JJS']
-
-    def _extract_keywords(self, sentence):
-        words = word_tokenize(sentence)
-        tagged_words = pos_tag(words)
-        keywords = [
-            word for word, tag in tagged_words
-            if tag in self.important_pos_tags and word.lower() not in self.stop_words
-        ]
-        return list(set(keywords))  # unique words only
-
-    def generate_mcqs(self, text, num_questions=5):
-        sentences = sent_tokenize(text)
-        mcqs = []
-
-        for sentence in sentences[:num_questions]:
-            keywords = self._extract_keywords(sentence)
-            if not keywords:
-                continue
-
-            correct_answer = random.choice(keywords)
-            question = sentence.replace(correct_answer, "______", 1)
-
-            distractors = [kw for kw in keywords if kw != correct_answer][:3]
-            while len(distractors) < 3:
-                filler = random.choice(keywords)
-                if filler != correct_answer and filler not in distractors:
-                    distractors.append(filler)
-
-            options = [correct_answer] + distractors
-            random.shuffle(options)
-
-            mcqs.append({
-                'question': question,
-                'options': options,
-                'correct_answer': correct_answer,
-                'explanation': f"This tests understanding of the word '{correct_answer}' in context."
-            })
-
-        return mcqs
+import nltk
+from nltk.tokenize import sent_tokenize, word_tokenize
+from nltk.corpus import stopwords
+from nltk.stem import WordNetLemmatizer
+from nltk.tag.perceptron import PerceptronTagger
+from concurrent.futures import ProcessPoolExecutor
+import itertools
+import multiprocessing
+import random
+import threading
+
+from .nltk_resources import ensure_resources
+
+# Pool workers are never forked from the caller: jobs start the pool from a thread of the web
+# process, and a forked child would inherit locks other threads (the job heartbeat, database
+# connections, logging) hold at that moment
+POOL_START_METHOD = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+
+
+class MCQGenerator:
+    def __init__(self):
+        # NLTK data is provisioned ahead of time (manage.py download_nltk_data), never fetched here
+        ensure_resources()
+        self.lemmatizer = WordNetLemmatizer()
+        self.stop_words = set(stopwords.words('english'))
+        self.important_pos_tags = ['NN', 'NNS', 'NNP', 'NNPS', 'JJ', 'JJR', 'JJS']
+        # Keep our own tagger instance so the pickle is loaded once, not per pos_tag() call
+        self.tagger = PerceptronTagger()
+
+    def warm_up(self):
+        # Touch the lazily loaded corpora so the first real request doesn't pay for them
+        self.lemmatizer.lemmatize('warm')
+        self._extract_keywords("The generator is ready.")
+
+    def _extract_keywords(self, sentence):
+        return self._keywords_from_tagged(self.tagger.tag(word_tokenize(sentence)))
+
+    def _keywords_from_tagged(self, tagged_words):
+        keywords = [
+            (word, tag) for word, tag in tagged_words
+            if tag in self.important_pos_tags and word.lower() not in self.stop_words
+        ]
+        return list(dict.fromkeys(keywords))  # unique (word, tag) pairs, in sentence order
+
+    def extract_keywords_batch(self, texts):
+        """Return the ``(word, tag)`` keywords of each text, tagging them all in one pass."""
+        tagged_texts = self.tagger.tag_sents(word_tokenize(text) for text in texts)
+        return [self._keywords_from_tagged(tagged_words) for tagged_words in tagged_texts]
+
+    def _build_mcq(self, sentence, keywords, rng, pools):
+        correct_answer, answer_tag = rng.choice(keywords)
+        question = sentence.replace(correct_answer, "______", 1)
+
+        distractors = []
+        exclude = {correct_answer.lower()}
+        for pool in pools:
+            for term in pool.sample(answer_tag, 3 - len(distractors), exclude, rng):
+                distractors.append(term)
+                exclude.add(term.lower())
+            if len(distractors) == 3:
+                break
+        else:
+            # Not enough indexed terms, fall back to the other keywords of the sentence
+            leftovers = [word for word, _tag in keywords if word.lower() not in exclude]
+            distractors += leftovers[:3 - len(distractors)]
+            if len(distractors) < 3:
+                return None
+
+        options = [correct_answer] + distractors
+        rng.shuffle(options)
+
+        return {
+            'question': question,
+            'options': options,
+            'correct_answer': correct_answer,
+            'answer_tag': answer_tag,
+            'explanation': f"This tests understanding of the word '{correct_answer}' in context."
+        }
+
+    def generate_mcqs(self, text, num_questions=5, seed=None, distractors=None):
+        return self.generate_mcqs_batch([text], num_questions, seed=seed, distractors=distractors)[0]
+
+    def generate_mcqs_batch(self, documents, num_questions=5, seed=None, distractors=None):
+        """Generate MCQs for several documents, returning one list per document.
+
+        Every sentence of every document is tagged in a single ``tag_sents``
+        pass; sentences without usable keywords are skipped so each document
+        yields up to ``num_questions`` questions.  Distractors are drawn from
+        the document's own keywords first, then from the ``distractors`` pool.
+        """
+        document_sentences = [sent_tokenize(text) for text in documents]
+        keyword_lists = iter(self.extract_keywords_batch(
+            sentence for sentences in document_sentences for sentence in sentences
+        ))
+
+        rng = random.Random(seed)
+        return [
+            self._mcqs_from_keywords(
+                sentences, list(itertools.islice(keyword_lists, len(sentences))),
+                num_questions, rng, distractors,
+            )
+            for sentences in document_sentences
+        ]
+
+    def generate_mcqs_parallel(self, text, num_questions=5, workers=None, chunk_size=500, seed=None,
+                               distractors=None):
+        """Like ``generate_mcqs`` but tags sentence chunks on a process pool.
+
+        Chunks are consumed in submission order and the document pool grows
+        with each one, as in ``generate_mcqs_stream``; once ``num_questions``
+        exist the chunks not yet started are cancelled.  All random choices
+        are made here in the parent, so a given ``seed`` gives the same
+        questions whatever the number of workers.
+        """
+        sentences = sent_tokenize(text)
+        chunks = [sentences[i:i + chunk_size] for i in range(0, len(sentences), chunk_size)]
+        executor = None
+        if len(chunks) > 1 and workers != 1:
+            executor = ProcessPoolExecutor(
+                max_workers=workers,
+                mp_context=multiprocessing.get_context(POOL_START_METHOD),
+                initializer=_init_worker,
+                initargs=(list(nltk.data.path),),
+            )
+        try:
+            if executor is None:
+                keyword_lists = map(self.extract_keywords_batch, chunks)
+            else:
+                keyword_lists = executor.map(_extract_chunk_keywords, chunks)
+            return list(itertools.islice(
+                self._iter_mcqs_by_chunk(zip(chunks, keyword_lists), random.Random(seed), distractors),
+                num_questions,
+            ))
+        finally:
+            if executor is not None:
+                executor.shutdown(cancel_futures=True)
+
+    def generate_mcqs_stream(self, paragraphs, num_questions=5, seed=None, distractors=None, batch_size=200):
+        """Yield MCQs from an iterable of paragraphs, stopping once ``num_questions`` are made.
+
+        Sentences are tagged ``batch_size`` at a time and the document pool
+        only holds the keywords seen so far, so memory stays bounded however
+        long the input is.
+        """
+        sentences = (sentence for paragraph in paragraphs for sentence in sent_tokenize(paragraph))
+        batches = iter(lambda: list(itertools.islice(sentences, batch_size)), [])
+        tagged = ((batch, self.extract_keywords_batch(batch)) for batch in batches)
+        yield from itertools.islice(
+            self._iter_mcqs_by_chunk(tagged, random.Random(seed), distractors), num_questions
+        )
+
+    def _iter_mcqs_by_chunk(self, tagged_chunks, rng, distractors):
+        # Each chunk's keywords join the document pool before its questions are built,
+        # so the next chunk is only tagged if more questions are still wanted
+        document_pool = DistractorPool()
+        pools = [document_pool] if distractors is None else [document_pool, distractors]
+        for sentences, keyword_lists in tagged_chunks:
+            for keywords in keyword_lists:
+                document_pool.update(keywords)
+            yield from self._iter_mcqs(sentences, keyword_lists, rng, pools)
+
+    def _mcqs_from_keywords(self, sentences, keyword_lists, num_questions, rng, distractors):
+        document_pool = DistractorPool()
+        for keywords in keyword_lists:
+            document_pool.update(keywords)
+        pools = [document_pool] if distractors is None else [document_pool, distractors]
+        return list(itertools.islice(self._iter_mcqs(sentences, keyword_lists, rng, pools), num_questions))
+
+    def _iter_mcqs(self, sentences, keyword_lists, rng, pools):
+        for sentence, keywords in zip(sentences, keyword_lists):
+            if keywords:
+                mcq = self._build_mcq(sentence, keywords, rng, pools)
+                if mcq is not None:
+                    yield mcq
+
+
+class DistractorPool:
+    """Candidate distractor terms grouped by POS tag.
+
+    Terms are also filed under their coarse tag (``NN``, ``JJ``) so a plural
+    noun can still find singular alternatives.  Sampling only looks at a
+    handful of entries, independent of how many terms the pool holds.
+    """
+
+    def __init__(self, tagged_terms=()):
+        self._terms = {}
+        self._seen = set()
+        self.update(tagged_terms)
+
+    def __len__(self):
+        return len(self._seen)
+
+    def add(self, term, tag):
+        key = (term.lower(), tag)
+        if key in self._seen:
+            return
+        self._seen.add(key)
+        self._terms.setdefault(tag, []).append(term)
+        if len(tag) > 2:
+            self._terms.setdefault(tag[:2], []).append(term)
+
+    def update(self, tagged_terms):
+        for term, tag in tagged_terms:
+            self.add(term, tag)
+
+    def sample(self, tag, k, exclude=(), rng=random):
+        picked = []
+        seen = set(exclude)
+        for key in dict.fromkeys((tag, tag[:2])):
+            candidates = self._terms.get(key, ())
+            # Draw a few spares so excluded/duplicate terms don't leave us short
+            for term in rng.sample(candidates, min(len(candidates), k + len(seen) + 2)):
+                if term.lower() not in seen:
+                    picked.append(term)
+                    seen.add(term.lower())
+                    if len(picked) == k:
+                        return picked
+        return picked
+
+
+_generator = None
+_generator_lock = threading.Lock()
+
+
+def get_generator():
+    """Return the process-wide MCQGenerator, building it on first use.
+
+    The generator only holds read-only NLP state (stopwords, lemmatizer,
+    tagger weights), so a single instance is safely shared between threads.
+    """
+    global _generator
+    if _generator is None:
+        with _generator_lock:
+            if _generator is None:
+                generator = MCQGenerator()
+                generator.warm_up()
+                _generator = generator
+    return _generator
+
+
+def _init_worker(data_path):
+    # Workers are not forked (POOL_START_METHOD), so they don't inherit the parent's NLTK data directory
+    nltk.data.path[:] = data_path
+
+
+def _extract_chunk_keywords(sentences):
+    return get_generator().extract_keywords_batch(sentences)
@@ -0,0 +1,36 @@
+# Generated by Django 4.2 on 2026-10-17 11:30
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0002_mcqgenerationjob'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DistractorTerm',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('term', models.CharField(max_length=200)),
+                ('pos_tag', models.CharField(max_length=4)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('subject', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='distractor_terms', to='app.subject')),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='distractorterm',
+            index=models.Index(fields=['subject', 'pos_tag'], name='app_distrac_subject_c54634_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='distractorterm',
+            constraint=models.UniqueConstraint(fields=('subject', 'term', 'pos_tag'), name='unique_distractor_term'),
+        ),
+        migrations.AddConstraint(
+            model_name='distractorterm',
+            constraint=models.UniqueConstraint(condition=models.Q(('subject__isnull', True)), fields=('term', 'pos_tag'), name='unique_general_distractor_term'),
+        ),
+    ]
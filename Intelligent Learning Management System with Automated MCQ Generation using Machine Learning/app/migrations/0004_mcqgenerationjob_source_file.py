@@ -0,0 +1,23 @@
+# Generated by Django 4.2 on 2026-10-17 11:31
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0003_distractorterm'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mcqgenerationjob',
+            name='source_file',
+            field=models.FileField(blank=True, upload_to='mcq_sources/'),
+        ),
+        migrations.AlterField(
+            model_name='mcqgenerationjob',
+            name='text',
+            field=models.TextField(blank=True),
+        ),
+    ]
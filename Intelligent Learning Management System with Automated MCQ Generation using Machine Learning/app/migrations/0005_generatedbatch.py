@@ -0,0 +1,56 @@
+# Generated by Django 4.2 on 2026-10-17 11:32
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+import uuid
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0004_mcqgenerationjob_source_file'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='GeneratedBatch',
+            fields=[
+                ('id', models.UUIDField(default=uuid.uuid4, editable=False, primary_key=True, serialize=False)),
+                ('difficulty', models.CharField(choices=[('easy', 'Easy'), ('medium', 'Medium'), ('hard', 'Hard')], default='medium', max_length=10)),
+                ('created_at', models.DateTimeField(auto_now_add=True)),
+                ('expires_at', models.DateTimeField(db_index=True)),
+                ('created_by', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='generated_batches', to=settings.AUTH_USER_MODEL)),
+                ('subject', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, to='app.subject')),
+            ],
+        ),
+        migrations.RemoveField(
+            model_name='mcqgenerationjob',
+            name='result',
+        ),
+        migrations.CreateModel(
+            name='GeneratedItem',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('position', models.PositiveIntegerField()),
+                ('question_text', models.TextField()),
+                ('options', models.JSONField()),
+                ('correct_answer', models.CharField(max_length=200)),
+                ('answer_tag', models.CharField(blank=True, max_length=4)),
+                ('explanation', models.TextField(blank=True)),
+                ('batch', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='items', to='app.generatedbatch')),
+            ],
+            options={
+                'ordering': ['position'],
+            },
+        ),
+        migrations.AddField(
+            model_name='mcqgenerationjob',
+            name='batch',
+            field=models.OneToOneField(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='job', to='app.generatedbatch'),
+        ),
+        migrations.AddConstraint(
+            model_name='generateditem',
+            constraint=models.UniqueConstraint(fields=('batch', 'position'), name='unique_generated_item_position'),
+        ),
+    ]
@@ -0,0 +1,34 @@
+# Generated by Django 4.2 on 2026-10-17 11:36
+
+from django.db import migrations, models
+from django.db.models import Count
+
+
+def remove_duplicate_results(apps, schema_editor):
+    # A double submit could store two answers for the same question of an
+    # attempt. Keep the most recent one.
+    TestResult = apps.get_model('app', 'TestResult')
+    duplicates = (
+        TestResult.objects.values('attempt_id', 'question_id')
+        .annotate(n=Count('id')).filter(n__gt=1)
+    )
+    for group in duplicates.iterator():
+        results = TestResult.objects.filter(
+            attempt_id=group['attempt_id'], question_id=group['question_id']
+        ).order_by('-answered_at', '-id')
+        results.exclude(pk=results.first().pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0005_generatedbatch'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_results, migrations.RunPython.noop),
+        migrations.AddConstraint(
+            model_name='testresult',
+            constraint=models.UniqueConstraint(fields=('attempt', 'question'), name='unique_attempt_question'),
+        ),
+    ]
@@ -0,0 +1,60 @@
+# Generated by Django 4.2 on 2026-10-17 11:41
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count
+import django.db.models.deletion
+
+
+def remove_duplicate_attempts(apps, schema_editor):
+    # Concurrent first visits to take_test could create two attempts for the
+    # same student and test. Keep the completed one (else the earliest).
+    TestAttempt = apps.get_model('app', 'TestAttempt')
+    duplicates = (
+        TestAttempt.objects.values('student_id', 'test_id')
+        .annotate(n=Count('id')).filter(n__gt=1)
+    )
+    for group in duplicates.iterator():
+        attempts = TestAttempt.objects.filter(
+            student_id=group['student_id'], test_id=group['test_id']
+        ).order_by('completed_at', 'started_at')
+        keep = attempts.filter(completed_at__isnull=False).first() or attempts.first()
+        attempts.exclude(pk=keep.pk).delete()
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0006_testresult_unique_attempt_question'),
+    ]
+
+    operations = [
+        migrations.RunPython(remove_duplicate_attempts, migrations.RunPython.noop),
+        migrations.AlterField(
+            model_name='test',
+            name='course',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='tests', to='app.course'),
+        ),
+        migrations.AlterField(
+            model_name='testattempt',
+            name='student',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='test_attempts', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AlterField(
+            model_name='testresult',
+            name='attempt',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='results', to='app.testattempt'),
+        ),
+        migrations.AddIndex(
+            model_name='test',
+            index=models.Index(condition=models.Q(('is_published', True)), fields=['course', 'available_from', 'available_to'], name='test_course_availability_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='testattempt',
+            index=models.Index(fields=['student', 'completed_at'], name='attempt_student_completed_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='testattempt',
+            constraint=models.UniqueConstraint(fields=('student', 'test'), name='unique_student_test_attempt'),
+        ),
+    ]
@@ -0,0 +1,89 @@
+# Generated by Django 4.2 on 2026-10-17 11:42
+
+from django.conf import settings
+from django.db import migrations, models
+from django.db.models import Count, F, IntegerField, Q, Sum
+from django.db.models.functions import Cast, Floor, Least
+import django.db.models.deletion
+
+HISTOGRAM_BINS = 10
+
+
+def fill_stats(apps, schema_editor):
+    # The dashboard and reports read these tables from now on, so existing
+    # attempts are summed in here (the same grouped queries as stats.rebuild)
+    TestAttempt = apps.get_model('app', 'TestAttempt')
+    StudentCourseStats = apps.get_model('app', 'StudentCourseStats')
+    TestStats = apps.get_model('app', 'TestStats')
+    attempts = TestAttempt.objects.filter(completed_at__isnull=False, score__isnull=False)
+
+    def totals(*group_by):
+        return attempts.values(*group_by).annotate(
+            attempts=Count('id'),
+            passed=Count('id', filter=Q(score__gte=F('test__passing_score'))),
+            total=Sum('score'),
+        ).order_by()
+
+    histograms = {}
+    bins = attempts.annotate(
+        bin=Least(Cast(Floor(F('score') / (100 / HISTOGRAM_BINS)), IntegerField()), HISTOGRAM_BINS - 1)
+    ).values('test_id', 'bin').annotate(n=Count('id')).order_by()
+    for row in bins.iterator():
+        histograms.setdefault(row['test_id'], [0] * HISTOGRAM_BINS)[row['bin']] = row['n']
+
+    StudentCourseStats.objects.bulk_create([
+        StudentCourseStats(
+            student_id=row['student_id'], course_id=row['test__course_id'],
+            attempts_count=row['attempts'], passed_count=row['passed'], score_sum=row['total'],
+        )
+        for row in totals('student_id', 'test__course_id').iterator()
+    ], batch_size=1000)
+    TestStats.objects.bulk_create([
+        TestStats(
+            test_id=row['test_id'], attempts_count=row['attempts'], passed_count=row['passed'],
+            score_sum=row['total'], histogram=histograms[row['test_id']],
+        )
+        for row in totals('test_id').iterator()
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0007_attempt_and_test_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TestStats',
+            fields=[
+                ('test', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='stats', serialize=False, to='app.test')),
+                ('attempts_count', models.PositiveIntegerField(default=0)),
+                ('passed_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('histogram', models.JSONField(default=list)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+        ),
+        migrations.CreateModel(
+            name='StudentCourseStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts_count', models.PositiveIntegerField(default=0)),
+                ('passed_count', models.PositiveIntegerField(default=0)),
+                ('score_sum', models.FloatField(default=0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('course', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='student_stats', to='app.course')),
+                ('student', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='course_stats', to=settings.AUTH_USER_MODEL)),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name='studentcoursestats',
+            constraint=models.UniqueConstraint(fields=('student', 'course'), name='unique_student_course_stats'),
+        ),
+        migrations.AddConstraint(
+            model_name='studentcoursestats',
+            constraint=models.UniqueConstraint(condition=models.Q(('course__isnull', True)), fields=('student',), name='unique_student_general_stats'),
+        ),
+        migrations.RunPython(fill_stats, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-17 12:26
+
+from django.conf import settings
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def create_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    schema_editor.execute(
+        "CREATE VIRTUAL TABLE app_question_fts USING fts5("
+        "question_id UNINDEXED, question_text, options, explanation, tokenize='porter unicode61')"
+    )
+    schema_editor.execute(
+        "INSERT INTO app_question_fts (question_id, question_text, options, explanation) "
+        "SELECT id, question_text, option_a || ' ' || option_b || ' ' || option_c || ' ' || option_d, explanation "
+        "FROM app_pythonquestion"
+    )
+
+
+def drop_fts_table(apps, schema_editor):
+    if schema_editor.connection.vendor == 'sqlite':
+        schema_editor.execute("DROP TABLE IF EXISTS app_question_fts")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0008_stats_tables'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_fts_table, drop_fts_table),
+        migrations.AlterField(
+            model_name='pythonquestion',
+            name='created_by',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='questions_created', to=settings.AUTH_USER_MODEL),
+        ),
+        migrations.AddIndex(
+            model_name='pythonquestion',
+            index=models.Index(fields=['created_by', 'created_at', 'id'], name='question_author_created_idx'),
+        ),
+    ]
@@ -0,0 +1,59 @@
+# Generated by Django 4.2 on 2026-10-17 12:28
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def fill_signatures(apps, schema_editor):
+    # Questions already in the bank need signatures, or new duplicates of them go
+    # unnoticed. The hashing has to match what the app computes, hence the import.
+    from app.near_duplicates import band_keys, question_signature
+
+    PythonQuestion = apps.get_model('app', 'PythonQuestion')
+    QuestionSignature = apps.get_model('app', 'QuestionSignature')
+    QuestionBucket = apps.get_model('app', 'QuestionBucket')
+    fields = ('id', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d')
+    batch = []
+    for question in PythonQuestion.objects.only(*fields).iterator(chunk_size=1000):
+        batch.append((question.pk, question_signature(question)))
+        if len(batch) == 1000:
+            _store_signatures(QuestionSignature, QuestionBucket, batch, band_keys)
+            batch = []
+    _store_signatures(QuestionSignature, QuestionBucket, batch, band_keys)
+
+
+def _store_signatures(QuestionSignature, QuestionBucket, batch, band_keys):
+    QuestionSignature.objects.bulk_create([
+        QuestionSignature(question_id=question_id, minhash=minhash.tobytes()) for question_id, minhash in batch
+    ])
+    QuestionBucket.objects.bulk_create([
+        QuestionBucket(question_id=question_id, key=key)
+        for question_id, minhash in batch
+        for key in band_keys(minhash)
+    ], batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0009_question_search'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='QuestionSignature',
+            fields=[
+                ('question', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='signature', serialize=False, to='app.pythonquestion')),
+                ('minhash', models.BinaryField()),
+            ],
+        ),
+        migrations.CreateModel(
+            name='QuestionBucket',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('key', models.BigIntegerField(db_index=True)),
+                ('question', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='lsh_buckets', to='app.pythonquestion')),
+            ],
+        ),
+        migrations.RunPython(fill_signatures, migrations.RunPython.noop),
+    ]
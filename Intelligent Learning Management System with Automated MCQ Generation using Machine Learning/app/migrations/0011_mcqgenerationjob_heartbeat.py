@@ -0,0 +1,18 @@
+# Generated by Django 4.2 on 2026-10-17 12:45
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0010_question_signatures'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='mcqgenerationjob',
+            name='heartbeat_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
@@ -0,0 +1,20 @@
+# Generated by Django 4.2 on 2026-10-17 12:49
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0011_mcqgenerationjob_heartbeat'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='MCQCacheCounter',
+            fields=[
+                ('name', models.CharField(max_length=20, primary_key=True, serialize=False)),
+                ('value', models.PositiveBigIntegerField(default=0)),
+            ],
+        ),
+    ]
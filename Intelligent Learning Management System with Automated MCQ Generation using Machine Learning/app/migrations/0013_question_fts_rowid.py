@@ -0,0 +1,44 @@
+# Generated by Django 4.2 on 2026-10-17 13:05
+
+from django.db import migrations
+
+
+def reindex_by_rowid(apps, schema_editor):
+    # Rows are now addressed by a rowid derived from the question id (see
+    # question_search.fts_rowid), so rows written by 0009 are replaced.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    PythonQuestion = apps.get_model('app', 'PythonQuestion')
+    fields = ('id', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'explanation')
+    schema_editor.execute("DELETE FROM app_question_fts")
+    batch = []
+    with schema_editor.connection.cursor() as cursor:
+        for question in PythonQuestion.objects.only(*fields).iterator(chunk_size=2000):
+            batch.append((
+                question.pk.int >> 65, question.pk.hex, question.question_text,
+                ' '.join([question.option_a, question.option_b, question.option_c, question.option_d]),
+                question.explanation,
+            ))
+            if len(batch) == 2000:
+                _insert(cursor, batch)
+                batch = []
+        _insert(cursor, batch)
+
+
+def _insert(cursor, rows):
+    cursor.executemany(
+        "INSERT INTO app_question_fts (rowid, question_id, question_text, options, explanation) "
+        "VALUES (%s, %s, %s, %s, %s)",
+        rows,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('app', '0012_mcqcachecounter'),
+    ]
+
+    operations = [
+        migrations.RunPython(reindex_by_rowid, migrations.RunPython.noop),
+    ]
@@ -1,163 +1,361 @@
-from django.db import models
-from django.contrib.auth.models import AbstractUser
-import uuid
-
-class User(AbstractUser):
-    USER_TYPE_CHOICES = [
-        ('student', 'Student'),
-        ('instructor', 'Instructor'),
-    ]
-    email = models.EmailField(unique=True, verbose_name='email address')
-    user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES, default='student')
-
-    def __str__(self):
-        return self.username
-
-class Subject(models.Model):
-    name = models.CharField(max_length=100)
-    description = models.TextField(blank=True)
-    created_at = models.DateTimeField(auto_now_add=True)
-
-    def __str__(self):
-        return self.name
-
-class Topic(models.Model):
-    name = models.CharField(max_length=100)
-    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='topics')
-    description = models.TextField(blank=True)
-
-    def __str__(self):
-        return f"{self.name} ({self.subject.name})"
-
-class Course(models.Model):
-    name = models.CharField(max_length=200)
-    code = models.CharField(max_length=20, unique=True)
-    description = models.TextField()
-    instructor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='courses_taught')
-    subjects = models.ManyToManyField(Subject, related_name='courses')
-    start_date = models.DateField()
-    end_date = models.DateField()
-    is_active = models.BooleanField(default=True)
-    created_at = models.DateTimeField(auto_now_add=True)
-
-    def __str__(self):
-        return f"{self.code}: {self.name}"
-
-class Enrollment(models.Model):
-    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments')
-    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
-    enrollment_date = models.DateTimeField(auto_now_add=True)
-    is_active = models.BooleanField(default=True)
-
-    class Meta:
-        unique_together = ('student', 'course')
-
-    def __str__(self):
-        return f"{self.student.username} in {self.course.code}"
-
-class PythonQuestion(models.Model):
-    DIFFICULTY_CHOICES = [
-        ('easy', 'Easy'),
-        ('medium', 'Medium'),
-        ('hard', 'Hard'),
-    ]
-    QUESTION_TYPE_CHOICES = [
-        ('mcq', 'Multiple Choice'),
-        ('code', 'Coding Question'),
-    ]
-
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    question_text = models.TextField()
-    option_a = models.CharField(max_length=200)
-    option_b = models.CharField(max_length=200)
-    option_c = models.CharField(max_length=200)
-    option_d = models.CharField(max_length=200)
-    correct_answer = models.CharField(max_length=1, choices=[
-        ('A', 'Option A'),
-        ('B', 'Option B'),
-        ('C', 'Option C'),
-        ('D', 'Option D'),
-    ])
-    explanation = models.TextField(blank=True)
-    difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES, default='medium')
-    question_type = models.CharField(max_length=10, choices=QUESTION_TYPE_CHOICES, default='mcq')
-    subject = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, blank=True)
-    topic = models.ForeignKey(Topic, on_delete=models.SET_NULL, null=True, blank=True)
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='questions_created')
-    created_at = models.DateTimeField(auto_now_add=True)
-    updated_at = models.DateTimeField(auto_now=True)
-
-    def __str__(self):
-        return f"{self.question_text[:50]}... ({self.get_difficulty_display()})"
-
-class Test(models.Model):
-    title = models.CharField(max_length=200)
-    description = models.TextField(blank=True)
-    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='tests', null=True, blank=True)
-    questions = models.ManyToManyField(PythonQuestion, related_name='tests')
-    time_limit = models.PositiveIntegerField(help_text="Time limit in minutes", default=30)
-    max_score = models.PositiveIntegerField(default=100)
-    passing_score = models.PositiveIntegerField(default=60)
-    is_published = models.BooleanField(default=False)
-    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tests_created')
-    created_at = models.DateTimeField(auto_now_add=True)
-    available_from = models.DateTimeField()
-    available_to = models.DateTimeField()
-
-    def __str__(self):
-        return f"{self.title} ({self.course.code if self.course else 'General'})"
-
-class TestAttempt(models.Model):
-    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='test_attempts')
-    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='attempts')
-    started_at = models.DateTimeField(auto_now_add=True)
-    completed_at = models.DateTimeField(null=True, blank=True)
-    score = models.FloatField(null=True, blank=True)
-    total_questions = models.PositiveIntegerField()
-    correct_answers = models.PositiveIntegerField(default=0)
-
-    def calculate_score(self):
-        correct = self.results.filter(is_correct=True).count()
-        total = self.results.count()
-        if total > 0:
-            self.correct_answers = correct
-            self.score = (correct / total) * 100
-            self.save()
-
-    def __str__(self):
-        return f"{self.student.username}'s attempt on {self.test.title}"
-
-class TestResult(models.Model):
-    attempt = models.ForeignKey(TestAttempt, on_delete=models.CASCADE, related_name='results')
-    question = models.ForeignKey(PythonQuestion, on_delete=models.CASCADE)
-    selected_option = models.CharField(max_length=1, choices=[
-        ('A', 'Option A'),
-        ('B', 'Option B'),
-        ('C', 'Option C'),
-        ('D', 'Option D'),
-    ])
-    is_correct = models.BooleanField(default=False)
-    answered_at = models.DateTimeField(auto_now_add=True)
-
-    def save(self, *args, **kwargs):
-        self.is_correct = self.selected_option == self.question.correct_answer
-        super().save(*args, **kwargs)
-        self.attempt.calculate_score()
-
-    def __str__(self):
-        return f"Result for Q{self.question.id} in {self.attempt}"
-
-class Evaluation(models.Model):
-    test_attempt = models.OneToOneField(TestAttempt, on_delete=models.CASCADE, related_name='evaluation')
-    evaluated_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='evaluations_done')
-    comments = models.TextField(blank=True)
-    feedback = models.TextField()
-    score_adjustment = models.IntegerField(default=0)
-    evaluated_at = models.DateTimeField(auto_now_add=True)
-
-    def final_score(self):
-        return min(100, max(0, (self.test_attempt.score or 0) + self.score_adjustment))
-
-    def __str__(self):
-        return f"Evaluation of {self.test_attempt} by {self.evaluated_by.username}"
+from django.db import models
+from django.contrib.auth.models import AbstractUser
+from django.utils import timezone
+import uuid
+
+class User(AbstractUser):
+    USER_TYPE_CHOICES = [
+        ('student', 'Student'),
+        ('instructor', 'Instructor'),
+    ]
+    email = models.EmailField(unique=True, verbose_name='email address')
+    user_type = models.CharField(max_length=20, choices=USER_TYPE_CHOICES, default='student')
+
+    def __str__(self):
+        return self.username
+
+class Subject(models.Model):
+    name = models.CharField(max_length=100)
+    description = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return self.name
+
+class Topic(models.Model):
+    name = models.CharField(max_length=100)
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, related_name='topics')
+    description = models.TextField(blank=True)
+
+    def __str__(self):
+        return f"{self.name} ({self.subject.name})"
+
+class Course(models.Model):
+    name = models.CharField(max_length=200)
+    code = models.CharField(max_length=20, unique=True)
+    description = models.TextField()
+    instructor = models.ForeignKey(User, on_delete=models.CASCADE, related_name='courses_taught')
+    subjects = models.ManyToManyField(Subject, related_name='courses')
+    start_date = models.DateField()
+    end_date = models.DateField()
+    is_active = models.BooleanField(default=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        return f"{self.code}: {self.name}"
+
+class Enrollment(models.Model):
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='enrollments')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='enrollments')
+    enrollment_date = models.DateTimeField(auto_now_add=True)
+    is_active = models.BooleanField(default=True)
+
+    class Meta:
+        unique_together = ('student', 'course')
+
+    def __str__(self):
+        return f"{self.student.username} in {self.course.code}"
+
+class PythonQuestion(models.Model):
+    DIFFICULTY_CHOICES = [
+        ('easy', 'Easy'),
+        ('medium', 'Medium'),
+        ('hard', 'Hard'),
+    ]
+    QUESTION_TYPE_CHOICES = [
+        ('mcq', 'Multiple Choice'),
+        ('code', 'Coding Question'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    question_text = models.TextField()
+    option_a = models.CharField(max_length=200)
+    option_b = models.CharField(max_length=200)
+    option_c = models.CharField(max_length=200)
+    option_d = models.CharField(max_length=200)
+    correct_answer = models.CharField(max_length=1, choices=[
+        ('A', 'Option A'),
+        ('B', 'Option B'),
+        ('C', 'Option C'),
+        ('D', 'Option D'),
+    ])
+    explanation = models.TextField(blank=True)
+    difficulty = models.CharField(max_length=10, choices=DIFFICULTY_CHOICES, default='medium')
+    question_type = models.CharField(max_length=10, choices=QUESTION_TYPE_CHOICES, default='mcq')
+    subject = models.ForeignKey(Subject, on_delete=models.SET_NULL, null=True, blank=True)
+    topic = models.ForeignKey(Topic, on_delete=models.SET_NULL, null=True, blank=True)
+    # Indexed as the leading column of question_author_created_idx
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='questions_created', db_index=False)
+    created_at = models.DateTimeField(auto_now_add=True)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            # Keyset pagination of an author's questions (question_search.page)
+            models.Index(fields=['created_by', 'created_at', 'id'], name='question_author_created_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.question_text[:50]}... ({self.get_difficulty_display()})"
+
+class QuestionSignature(models.Model):
+    """MinHash signature of a question's text and options (``near_duplicates.py``)."""
+    question = models.OneToOneField(PythonQuestion, on_delete=models.CASCADE, primary_key=True, related_name='signature')
+    minhash = models.BinaryField()
+
+    def __str__(self):
+        return f"Signature of {self.question_id}"
+
+class QuestionBucket(models.Model):
+    """One LSH band bucket of a question's signature."""
+    question = models.ForeignKey(PythonQuestion, on_delete=models.CASCADE, related_name='lsh_buckets')
+    key = models.BigIntegerField(db_index=True)
+
+    def __str__(self):
+        return f"Bucket {self.key} of {self.question_id}"
+
+class Test(models.Model):
+    title = models.CharField(max_length=200)
+    description = models.TextField(blank=True)
+    # Indexed as the leading column of test_course_availability_idx
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, related_name='tests', null=True, blank=True, db_index=False)
+    questions = models.ManyToManyField(PythonQuestion, related_name='tests')
+    time_limit = models.PositiveIntegerField(help_text="Time limit in minutes", default=30)
+    max_score = models.PositiveIntegerField(default=100)
+    passing_score = models.PositiveIntegerField(default=60)
+    is_published = models.BooleanField(default=False)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='tests_created')
+    created_at = models.DateTimeField(auto_now_add=True)
+    available_from = models.DateTimeField()
+    available_to = models.DateTimeField()
+
+    class Meta:
+        indexes = [
+            # Partial on is_published: Django compiles is_published=True to a
+            # bare boolean term, which planners match against the index
+            # condition but not against an indexed column.
+            models.Index(
+                fields=['course', 'available_from', 'available_to'],
+                condition=models.Q(is_published=True),
+                name='test_course_availability_idx'
+            ),
+        ]
+
+    def __str__(self):
+        return f"{self.title} ({self.course.code if self.course else 'General'})"
+
+class TestAttempt(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    # Indexed as the leading column of the (student, test) and (student, completed_at) keys
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='test_attempts', db_index=False)
+    test = models.ForeignKey(Test, on_delete=models.CASCADE, related_name='attempts')
+    started_at = models.DateTimeField(auto_now_add=True)
+    completed_at = models.DateTimeField(null=True, blank=True)
+    score = models.FloatField(null=True, blank=True)
+    total_questions = models.PositiveIntegerField()
+    correct_answers = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'test'], name='unique_student_test_attempt'),
+        ]
+        indexes = [
+            models.Index(fields=['student', 'completed_at'], name='attempt_student_completed_idx'),
+        ]
+
+    def calculate_score(self):
+        correct = self.results.filter(is_correct=True).count()
+        total = self.results.count()
+        if total > 0:
+            self.correct_answers = correct
+            self.score = (correct / total) * 100
+            self.save()
+
+    def __str__(self):
+        return f"{self.student.username}'s attempt on {self.test.title}"
+
+class TestResult(models.Model):
+    # Indexed as the leading column of unique_attempt_question
+    attempt = models.ForeignKey(TestAttempt, on_delete=models.CASCADE, related_name='results', db_index=False)
+    question = models.ForeignKey(PythonQuestion, on_delete=models.CASCADE)
+    selected_option = models.CharField(max_length=1, choices=[
+        ('A', 'Option A'),
+        ('B', 'Option B'),
+        ('C', 'Option C'),
+        ('D', 'Option D'),
+    ])
+    is_correct = models.BooleanField(default=False)
+    answered_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            # One row per question: autosave upserts on this key
+            models.UniqueConstraint(fields=['attempt', 'question'], name='unique_attempt_question'),
+        ]
+
+    def save(self, *args, **kwargs):
+        self.is_correct = self.selected_option == self.question.correct_answer
+        super().save(*args, **kwargs)
+        self.attempt.calculate_score()
+
+    def __str__(self):
+        return f"Result for Q{self.question.id} in {self.attempt}"
+
+class StudentCourseStats(models.Model):
+    """Running totals of a student's completed attempts in one course (``stats.py``)."""
+    student = models.ForeignKey(User, on_delete=models.CASCADE, related_name='course_stats')
+    course = models.ForeignKey(Course, on_delete=models.CASCADE, null=True, blank=True, related_name='student_stats')
+    attempts_count = models.PositiveIntegerField(default=0)
+    passed_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['student', 'course'], name='unique_student_course_stats'),
+            models.UniqueConstraint(
+                fields=['student'], condition=models.Q(course__isnull=True),
+                name='unique_student_general_stats'
+            ),
+        ]
+
+    @property
+    def average_score(self):
+        return self.score_sum / self.attempts_count if self.attempts_count else None
+
+    def __str__(self):
+        return f"Stats for {self.student_id} in course {self.course_id or 'General'}"
+
+class TestStats(models.Model):
+    """Running totals of all completed attempts of a test (``stats.py``)."""
+    HISTOGRAM_BINS = 10
+
+    test = models.OneToOneField(Test, on_delete=models.CASCADE, primary_key=True, related_name='stats')
+    attempts_count = models.PositiveIntegerField(default=0)
+    passed_count = models.PositiveIntegerField(default=0)
+    score_sum = models.FloatField(default=0)
+    # Attempts per 10-point score band: [0-10), [10-20), ... [90-100]
+    histogram = models.JSONField(default=list)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    @property
+    def mean_score(self):
+        return self.score_sum / self.attempts_count if self.attempts_count else None
+
+    @property
+    def pass_rate(self):
+        return self.passed_count / self.attempts_count * 100 if self.attempts_count else None
+
+    def __str__(self):
+        return f"Stats for test {self.test_id}"
+
+class Evaluation(models.Model):
+    test_attempt = models.OneToOneField(TestAttempt, on_delete=models.CASCADE, related_name='evaluation')
+    evaluated_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='evaluations_done')
+    comments = models.TextField(blank=True)
+    feedback = models.TextField()
+    score_adjustment = models.IntegerField(default=0)
+    evaluated_at = models.DateTimeField(auto_now_add=True)
+
+    def final_score(self):
+        return min(100, max(0, (self.test_attempt.score or 0) + self.score_adjustment))
+
+    def __str__(self):
+        return f"Evaluation of {self.test_attempt} by {self.evaluated_by.username}"
+
+class GeneratedBatch(models.Model):
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='generated_batches')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    difficulty = models.CharField(max_length=10, choices=PythonQuestion.DIFFICULTY_CHOICES, default='medium')
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def is_expired(self):
+        return self.expires_at <= timezone.now()
+
+    def __str__(self):
+        return f"Generated batch {self.id} ({self.subject.name})"
+
+class GeneratedItem(models.Model):
+    batch = models.ForeignKey(GeneratedBatch, on_delete=models.CASCADE, related_name='items')
+    position = models.PositiveIntegerField()
+    question_text = models.TextField()
+    options = models.JSONField()
+    correct_answer = models.CharField(max_length=200)
+    answer_tag = models.CharField(max_length=4, blank=True)
+    explanation = models.TextField(blank=True)
+
+    class Meta:
+        ordering = ['position']
+        constraints = [
+            models.UniqueConstraint(fields=['batch', 'position'], name='unique_generated_item_position'),
+        ]
+
+    def __str__(self):
+        return f"Item {self.position} of {self.batch_id}"
+
+class MCQGenerationJob(models.Model):
+    STATUS_CHOICES = [
+        ('pending', 'Pending'),
+        ('running', 'Running'),
+        ('done', 'Done'),
+        ('failed', 'Failed'),
+    ]
+
+    id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
+    created_by = models.ForeignKey(User, on_delete=models.CASCADE, related_name='mcq_jobs')
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE)
+    difficulty = models.CharField(max_length=10, choices=PythonQuestion.DIFFICULTY_CHOICES, default='medium')
+    text = models.TextField(blank=True)
+    source_file = models.FileField(upload_to='mcq_sources/', blank=True)
+    num_questions = models.PositiveIntegerField(default=5)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default='pending')
+    progress = models.PositiveSmallIntegerField(default=0)
+    batch = models.OneToOneField(GeneratedBatch, on_delete=models.SET_NULL, null=True, blank=True, related_name='job')
+    error = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    # Refreshed while the job runs; a running job whose heartbeat stops is requeued
+    heartbeat_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'created_at']),
+        ]
+
+    def is_finished(self):
+        return self.status in ('done', 'failed')
+
+    def __str__(self):
+        return f"MCQ job {self.id} ({self.get_status_display()})"
+
+class DistractorTerm(models.Model):
+    subject = models.ForeignKey(Subject, on_delete=models.CASCADE, null=True, blank=True, related_name='distractor_terms')
+    term = models.CharField(max_length=200)
+    pos_tag = models.CharField(max_length=4)
+    created_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['subject', 'term', 'pos_tag'], name='unique_distractor_term'),
+            models.UniqueConstraint(
+                fields=['term', 'pos_tag'], condition=models.Q(subject__isnull=True),
+                name='unique_general_distractor_term'
+            ),
+        ]
+        indexes = [
+            models.Index(fields=['subject', 'pos_tag']),
+        ]
+
+    def __str__(self):
+        return f"{self.term} ({self.pos_tag})"
+
+class MCQCacheCounter(models.Model):
+    """Hit or miss count of the generated-MCQ cache (``generation_cache.py``), shared by all workers."""
+    name = models.CharField(max_length=20, primary_key=True)
+    value = models.PositiveBigIntegerField(default=0)
+
+    def __str__(self):
+        return f"{self.name}: {self.value}"
@@ -0,0 +1,181 @@
+"""Near-duplicate detection for the question bank with MinHash and LSH.
+
+Each question is reduced to the set of character shingles of its normalized
+text and options.  A MinHash signature of ``NUM_PERM`` values estimates the
+Jaccard similarity of two such sets, and is cut into ``BANDS`` bands whose
+hashes are stored in ``QuestionBucket``.  Questions sharing any band bucket
+are candidates; only those are compared, so a lookup touches a handful of
+rows instead of the whole bank.  With 16 bands of 8 rows, pairs above about
+0.7 similarity become candidates and ``MCQ_DUPLICATE_THRESHOLD`` decides.
+
+Duplicates are looked for among the same author's questions, matching what
+an instructor sees in their question bank.
+"""
+import hashlib
+import re
+import zlib
+
+import numpy as np
+from django.conf import settings
+from django.db import transaction
+
+from .models import PythonQuestion, QuestionBucket, QuestionSignature
+
+NUM_PERM = 128
+BANDS = 16
+ROWS = NUM_PERM // BANDS
+SHINGLE_SIZE = 4
+# Candidate ids per signature query, below SQLite's bound parameter limit
+LOOKUP_BATCH_SIZE = 900
+# Universal hashing (a * x + b) mod p over 32-bit shingle hashes; a, b < 2**31 keep it inside uint64
+_PRIME = np.uint64(4294967311)
+_rng = np.random.RandomState(20240601)
+_A = _rng.randint(1, 2 ** 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+_B = _rng.randint(0, 2 ** 31, size=NUM_PERM, dtype=np.int64).astype(np.uint64)
+
+_NON_WORD = re.compile(r'[\W_]+', re.UNICODE)
+
+
+def default_threshold():
+    return getattr(settings, 'MCQ_DUPLICATE_THRESHOLD', 0.8)
+
+
+def question_words(question_text, options):
+    """Normalized text of a question: lowercase words of the stem, then the sorted options."""
+    parts = [question_text, *sorted(option.lower() for option in options)]
+    return ' '.join(_NON_WORD.sub(' ', part.lower()).strip() for part in parts)
+
+
+def signature(question_text, options):
+    """MinHash signature (``NUM_PERM`` uint32 values) of a question's shingle set."""
+    text = question_words(question_text, options)
+    if len(text) < SHINGLE_SIZE:
+        text = text.ljust(SHINGLE_SIZE)
+    shingles = {text[i:i + SHINGLE_SIZE] for i in range(len(text) - SHINGLE_SIZE + 1)}
+    hashes = np.fromiter((zlib.crc32(shingle.encode()) for shingle in shingles), dtype=np.uint64, count=len(shingles))
+    return ((np.outer(hashes, _A) + _B) % _PRIME).min(axis=0).astype(np.uint32)
+
+
+def question_signature(question):
+    return signature(question.question_text, [question.option_a, question.option_b, question.option_c, question.option_d])
+
+
+def band_keys(minhash):
+    """One signed 64-bit bucket key per band; the band number is part of the hash."""
+    keys = []
+    for band in range(BANDS):
+        digest = hashlib.blake2b(minhash[band * ROWS:(band + 1) * ROWS].tobytes(), digest_size=8,
+                                 person=band.to_bytes(2, 'big')).digest()
+        keys.append(int.from_bytes(digest, 'big', signed=True))
+    return keys
+
+
+def similarity(first, second):
+    """Estimated Jaccard similarity of two signatures."""
+    return float(np.mean(first == second))
+
+
+def bucket_candidates(keys):
+    """Ids of the questions with a band bucket in ``keys``, found through the bucket key index."""
+    return QuestionBucket.objects.filter(key__in=keys).values_list('question_id', flat=True).distinct()
+
+
+def stored_signatures(question_ids):
+    """``(question_id, author_id, minhash)`` of the given questions, read by primary key."""
+    return QuestionSignature.objects.filter(question_id__in=question_ids).values_list(
+        'question_id', 'question__created_by_id', 'minhash'
+    )
+
+
+def find_duplicates(signatures, author, threshold=None):
+    """Near-duplicates in ``author``'s bank for each signature in ``signatures``.
+
+    The bucket index gives every question sharing a band with any of the
+    signatures; only their signatures are then read, by primary key.  The
+    author is checked on those rows rather than in SQL, where the planner
+    would start from the author's index and walk their whole bank.  Returns
+    one ``[(question_id, similarity)]`` list per signature, most similar first.
+    """
+    threshold = default_threshold() if threshold is None else threshold
+    keys = {key for minhash in signatures for key in band_keys(minhash)}
+    ids = list(bucket_candidates(keys))
+    candidates = [
+        (question_id, minhash)
+        for start in range(0, len(ids), LOOKUP_BATCH_SIZE)
+        for question_id, author_id, minhash in stored_signatures(ids[start:start + LOOKUP_BATCH_SIZE])
+        if author_id == author.pk
+    ]
+    if not candidates:
+        return [[] for _ in signatures]
+
+    candidate_ids = [question_id for question_id, _ in candidates]
+    stored = np.stack([np.frombuffer(minhash, dtype=np.uint32) for _, minhash in candidates])
+    scores = (np.asarray(signatures)[:, None, :] == stored[None, :, :]).mean(axis=2)
+    return [
+        sorted(
+            ((candidate_ids[index], float(row[index])) for index in np.flatnonzero(row >= threshold)),
+            key=lambda match: -match[1],
+        )
+        for row in scores
+    ]
+
+
+def index_questions(questions, signatures=None):
+    """Store signatures and band buckets of ``questions``, replacing existing ones."""
+    if not questions:
+        return
+    if signatures is None:
+        signatures = [question_signature(question) for question in questions]
+    ids = [question.pk for question in questions]
+    with transaction.atomic():
+        QuestionBucket.objects.filter(question_id__in=ids).delete()
+        QuestionSignature.objects.filter(question_id__in=ids).delete()
+        QuestionSignature.objects.bulk_create([
+            QuestionSignature(question_id=question_id, minhash=minhash.tobytes())
+            for question_id, minhash in zip(ids, signatures)
+        ])
+        QuestionBucket.objects.bulk_create([
+            QuestionBucket(question_id=question_id, key=key)
+            for question_id, minhash in zip(ids, signatures)
+            for key in band_keys(minhash)
+        ])
+
+
+def scan_bank(batch_size=1000, threshold=None):
+    """Stream the whole bank once, oldest first per author, and re-index it.
+
+    The first question of each near-duplicate group is kept; later ones are
+    yielded as ``(duplicate, original_id, similarity)``.  The LSH buckets of
+    the current author are held in memory, so memory grows with the largest
+    author's bank, not the whole table.  Every question is (re)indexed.
+    """
+    threshold = default_threshold() if threshold is None else threshold
+    fields = ('id', 'created_by_id', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'created_at')
+    questions = PythonQuestion.objects.only(*fields).order_by('created_by_id', 'created_at', 'id')
+
+    author, buckets, kept = None, {}, {}
+    pending, pending_signatures = [], []
+    for question in questions.iterator(chunk_size=batch_size):
+        if question.created_by_id != author:
+            author, buckets, kept = question.created_by_id, {}, {}
+        minhash = question_signature(question)
+        keys = band_keys(minhash)
+
+        best = None
+        for candidate in {candidate for key in keys for candidate in buckets.get(key, ())}:
+            score = similarity(minhash, kept[candidate])
+            if score >= threshold and (best is None or score > best[1]):
+                best = (candidate, score)
+        if best:
+            yield question, best[0], best[1]
+        else:
+            kept[question.pk] = minhash
+            for key in keys:
+                buckets.setdefault(key, []).append(question.pk)
+
+        pending.append(question)
+        pending_signatures.append(minhash)
+        if len(pending) >= batch_size:
+            index_questions(pending, pending_signatures)
+            pending, pending_signatures = [], []
+    index_questions(pending, pending_signatures)
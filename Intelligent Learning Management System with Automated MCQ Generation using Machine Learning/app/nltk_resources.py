@@ -0,0 +1,88 @@
+"""Local NLTK data management for the MCQ generator.
+
+Nothing in here touches the network except ``provision()``, which is only
+called from the ``download_nltk_data`` management command.
+"""
+import threading
+
+import nltk
+from nltk.tag.perceptron import PerceptronTagger
+from nltk.tokenize import punkt
+
+# Resource name -> (downloader package, data path).  NLTK 3.8.2 replaced the pickled
+# punkt models with punkt_tab and 3.9 moved the tagger to averaged_perceptron_tagger_eng;
+# each release only loads its own format, so the package is picked by feature detection.
+RESOURCES = {
+    'punkt': (
+        ('punkt_tab', 'tokenizers/punkt_tab')
+        if hasattr(punkt, 'PunktTokenizer') else ('punkt', 'tokenizers/punkt')
+    ),
+    'stopwords': ('stopwords', 'corpora/stopwords'),
+    'wordnet': ('wordnet', 'corpora/wordnet'),
+    'tagger': (
+        ('averaged_perceptron_tagger_eng', 'taggers/averaged_perceptron_tagger_eng')
+        if hasattr(PerceptronTagger, 'load_from_json')
+        else ('averaged_perceptron_tagger', 'taggers/averaged_perceptron_tagger')
+    ),
+}
+
+_checked = False
+_check_lock = threading.Lock()
+
+
+def configure_data_path(data_dir):
+    """Make ``data_dir`` the first place NLTK looks for its data."""
+    if not data_dir:
+        return
+    data_dir = str(data_dir)
+    if data_dir in nltk.data.path:
+        nltk.data.path.remove(data_dir)
+    nltk.data.path.insert(0, data_dir)
+
+
+def _is_installed(data_path):
+    try:
+        nltk.data.find(data_path)
+    except LookupError:
+        return False
+    return True
+
+
+def missing_resources():
+    return [name for name, (_package, data_path) in RESOURCES.items() if not _is_installed(data_path)]
+
+
+def ensure_resources():
+    """Raise ``LookupError`` if any NLTK resource is missing locally.
+
+    The lookup only hits the filesystem and is done once per process.
+    """
+    global _checked
+    if _checked:
+        return
+    with _check_lock:
+        if _checked:
+            return
+        missing = missing_resources()
+        if missing:
+            raise LookupError(
+                f"Missing NLTK data: {', '.join(missing)}. "
+                "Run 'python manage.py download_nltk_data' to install it."
+            )
+        _checked = True
+
+
+def provision(data_dir, names=None, quiet=True):
+    """Download the given resources (all by default) into ``data_dir``.
+
+    Returns the list of resource names that could not be installed.
+    """
+    global _checked
+    failed = []
+    for name in names or RESOURCES:
+        package, _data_path = RESOURCES[name]
+        if not nltk.download(package, download_dir=str(data_dir), quiet=quiet):
+            failed.append(name)
+    configure_data_path(data_dir)
+    _checked = False
+    return failed
@@ -0,0 +1,111 @@
+"""Bulk helpers for adding questions to the question bank."""
+import re
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+
+from . import near_duplicates, question_search
+from .models import PythonQuestion
+
+OPTION_LETTERS = 'ABCD'
+
+_RANGE = re.compile(r'^\s*(\d+)\s*(?:-\s*(\d+))?\s*$')
+
+
+def parse_ranges(value, item_count):
+    """Turn "1-20, 25" (1-based, as shown on the review page) into 0-based positions."""
+    positions = set()
+    for part in filter(None, (part.strip() for part in value.split(','))):
+        match = _RANGE.match(part)
+        if not match:
+            raise ValueError(f"'{part}' is not a question number or range")
+        start = int(match.group(1))
+        end = int(match.group(2) or start)
+        if start > end:
+            start, end = end, start
+        positions.update(range(max(start, 1) - 1, min(end, item_count)))
+    return positions
+
+
+def selected_positions(data, item_count):
+    """Positions picked on the review form: "accept all", a range string and/or checkboxes."""
+    if data.get('accept_all'):
+        return set(range(item_count))
+    positions = parse_ranges(data.get('ranges', ''), item_count)
+    positions.update(
+        position for position in range(item_count) if data.get(f'save_{position}')
+    )
+    return positions
+
+
+def question_from_item(item, batch, user):
+    options = list(item.options)
+    if len(options) != 4:
+        raise ValidationError({'options': f"Expected 4 options, got {len(options)}."})
+    if item.correct_answer not in options:
+        raise ValidationError({'correct_answer': "The correct answer is not one of the options."})
+
+    question = PythonQuestion(
+        question_text=item.question_text,
+        option_a=options[0],
+        option_b=options[1],
+        option_c=options[2],
+        option_d=options[3],
+        correct_answer=OPTION_LETTERS[options.index(item.correct_answer)],
+        explanation=item.explanation,
+        subject=batch.subject,
+        difficulty=batch.difficulty,
+        created_by=user,
+    )
+    # Field checks only (lengths, choices); the foreign keys are known to be valid
+    question.clean_fields(exclude=['subject', 'topic', 'created_by'])
+    return question
+
+
+def accept_generated_items(batch, positions, user):
+    """Save the chosen items of a generated batch with a single bulk insert.
+
+    Near-duplicates of questions already in the user's bank, or of an
+    earlier item of the same selection, are skipped.  Returns
+    ``(questions, errors)`` where ``errors`` maps an item position to the
+    messages that kept it out of the question bank.
+    """
+    candidates = []
+    errors = {}
+    for item in batch.items.filter(position__in=positions):
+        try:
+            candidates.append((item.position, question_from_item(item, batch, user)))
+        except ValidationError as exc:
+            errors[item.position] = [
+                f"{field.replace('_', ' ')}: {message}"
+                for field, messages in exc.message_dict.items()
+                for message in messages
+            ]
+
+    signatures = [near_duplicates.question_signature(question) for _, question in candidates]
+    in_bank = near_duplicates.find_duplicates(signatures, user) if signatures else []
+    questions = []
+    kept_signatures = []
+    # Band key -> positions in kept_signatures, so each item is only compared with
+    # the kept items it shares a bucket with (as in near_duplicates.scan_bank)
+    kept_buckets = {}
+    threshold = near_duplicates.default_threshold()
+    for (position, question), minhash, matches in zip(candidates, signatures, in_bank):
+        keys = near_duplicates.band_keys(minhash)
+        similar_kept = {index for key in keys for index in kept_buckets.get(key, ())}
+        if matches:
+            errors[position] = ["near-duplicate of a question already in your question bank"]
+        elif any(near_duplicates.similarity(minhash, kept_signatures[index]) >= threshold for index in similar_kept):
+            errors[position] = ["near-duplicate of another selected question"]
+        else:
+            for key in keys:
+                kept_buckets.setdefault(key, []).append(len(kept_signatures))
+            questions.append(question)
+            kept_signatures.append(minhash)
+
+    with transaction.atomic():
+        PythonQuestion.objects.bulk_create(questions)
+        # bulk_create sends no post_save, so the indexes are updated here
+        question_search.index_questions(questions, new=True)
+        near_duplicates.index_questions(questions, kept_signatures)
+    return questions, errors
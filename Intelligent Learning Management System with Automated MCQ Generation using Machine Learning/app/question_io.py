@@ -0,0 +1,383 @@
+"""Streaming import and export of question banks.
+
+Three formats are supported: CSV, JSON Lines and QTI 1.2 (a single
+``questestinterop`` XML document, as read by most LMSs).  Exports read the
+database with ``iterator()`` and yield text chunks, so the ``manage.py``
+commands and the streaming HTTP response hold one chunk of rows at a time.
+Imports parse their input incrementally and save valid rows with one
+``bulk_create`` per chunk, each chunk in its own transaction; invalid rows
+are reported with their row number and skipped.  Problems with the file
+itself (not UTF-8, broken CSV quoting, malformed XML) are reported the same
+way with the ``FILE_ERROR`` code and end the read.  Seekable text files are
+checked for UTF-8 before their first row, so a file in another encoding is
+rejected before any chunk is saved.
+"""
+import codecs
+import csv
+import io
+import json
+import os
+from xml.etree.ElementTree import iterparse
+from xml.sax.saxutils import escape, quoteattr
+
+from django.core.exceptions import ValidationError
+from django.db import transaction
+from django.db.models import F
+from django.http import StreamingHttpResponse
+
+from . import near_duplicates, question_search
+from .models import PythonQuestion, Subject, Topic
+
+FORMATS = {
+    'csv': '.csv',
+    'jsonl': '.jsonl',
+    'qti': '.xml',
+}
+CONTENT_TYPES = {
+    'csv': 'text/csv',
+    'jsonl': 'application/x-ndjson',
+    'qti': 'application/xml',
+}
+FIELDS = [
+    'question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'correct_answer',
+    'explanation', 'difficulty', 'question_type', 'subject', 'topic',
+]
+LETTERS = 'ABCD'
+CHUNK_SIZE = 1000
+# Row errors kept for the report; further errors are only counted
+MAX_REPORTED_ERRORS = 1000
+# ValidationError code of a problem that stops the rest of the file from being read
+FILE_ERROR = 'file'
+
+
+def format_for_filename(name):
+    """Format matching a file extension (``.xml`` and ``.qti`` are QTI), or None."""
+    extension = os.path.splitext(name)[1].lower()
+    if extension in ('.xml', '.qti'):
+        return 'qti'
+    return next((fmt for fmt, suffix in FORMATS.items() if suffix == extension), None)
+
+
+# ---------------- Export ----------------
+
+def _export_rows(queryset, chunk_size):
+    rows = queryset.order_by('created_at', 'id').values(
+        *FIELDS[:-2], subject_name=F('subject__name'), topic_name=F('topic__name')
+    )
+    for row in rows.iterator(chunk_size=chunk_size):
+        row['subject'] = row.pop('subject_name') or ''
+        row['topic'] = row.pop('topic_name') or ''
+        yield row
+
+
+def export_csv(queryset, chunk_size=CHUNK_SIZE):
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=FIELDS)
+    writer.writeheader()
+    for count, row in enumerate(_export_rows(queryset, chunk_size), start=1):
+        writer.writerow(row)
+        if count % chunk_size == 0:
+            yield buffer.getvalue()
+            buffer.seek(0)
+            buffer.truncate()
+    yield buffer.getvalue()
+
+
+def export_jsonl(queryset, chunk_size=CHUNK_SIZE):
+    lines = []
+    for row in _export_rows(queryset, chunk_size):
+        lines.append(json.dumps(row, ensure_ascii=False))
+        if len(lines) == chunk_size:
+            yield '\n'.join(lines) + '\n'
+            lines = []
+    if lines:
+        yield '\n'.join(lines) + '\n'
+
+
+def _mattext(text):
+    return f'<material><mattext texttype="text/plain">{escape(text)}</mattext></material>'
+
+
+def _qti_item(row, number):
+    metadata = ''.join(
+        f'<qtimetadatafield><fieldlabel>{label}</fieldlabel><fieldentry>{escape(row[label])}</fieldentry></qtimetadatafield>'
+        for label in ('difficulty', 'question_type', 'subject', 'topic')
+    )
+    choices = ''.join(
+        f'<response_label ident="{letter}">{_mattext(row[f"option_{letter.lower()}"])}</response_label>'
+        for letter in LETTERS
+    )
+    feedback = (
+        f'<itemfeedback ident="general_fb"><flow_mat>{_mattext(row["explanation"])}</flow_mat></itemfeedback>'
+        if row['explanation'] else ''
+    )
+    return (
+        f'<item ident="q{number}" title={quoteattr(row["question_text"][:80])}>'
+        f'<itemmetadata><qtimetadata>{metadata}</qtimetadata></itemmetadata>'
+        f'<presentation>{_mattext(row["question_text"])}'
+        f'<response_lid ident="response1" rcardinality="Single"><render_choice>{choices}</render_choice></response_lid>'
+        f'</presentation>'
+        f'<resprocessing><outcomes><decvar maxvalue="100" minvalue="0" varname="SCORE" vartype="Decimal"/></outcomes>'
+        f'<respcondition continue="No"><conditionvar><varequal respident="response1">{row["correct_answer"]}</varequal>'
+        f'</conditionvar><setvar action="Set" varname="SCORE">100</setvar></respcondition></resprocessing>'
+        f'{feedback}</item>\n'
+    )
+
+
+def export_qti(queryset, chunk_size=CHUNK_SIZE):
+    yield '<?xml version="1.0" encoding="UTF-8"?>\n<questestinterop>\n'
+    items = []
+    for number, row in enumerate(_export_rows(queryset, chunk_size), start=1):
+        items.append(_qti_item(row, number))
+        if len(items) == chunk_size:
+            yield ''.join(items)
+            items = []
+    yield ''.join(items) + '</questestinterop>\n'
+
+
+EXPORTERS = {
+    'csv': export_csv,
+    'jsonl': export_jsonl,
+    'qti': export_qti,
+}
+
+
+def export_response(queryset, fmt, filename='questions'):
+    response = StreamingHttpResponse(EXPORTERS[fmt](queryset), content_type=CONTENT_TYPES[fmt])
+    response['Content-Disposition'] = f'attachment; filename="{filename}{FORMATS[fmt]}"'
+    return response
+
+
+# ---------------- Import ----------------
+
+def _not_utf8(line):
+    return line, ValidationError("the file is not UTF-8 encoded text", code=FILE_ERROR)
+
+
+def encoding_error(binary_file, block_size=64 * 1024):
+    """``(line number, error)`` for the first non-UTF-8 bytes of ``binary_file``, or None.
+
+    Only seekable files are checked; the position is restored afterwards.
+    """
+    if not binary_file.seekable():
+        return None
+    start = binary_file.tell()
+    decoder = codecs.getincrementaldecoder('utf-8')()
+    line = 1
+    try:
+        while True:
+            block = binary_file.read(block_size)
+            try:
+                decoder.decode(block, final=not block)
+            except UnicodeDecodeError as exc:
+                return _not_utf8(line + block.count(b'\n', 0, exc.start))
+            if not block:
+                return None
+            line += block.count(b'\n')
+    finally:
+        binary_file.seek(start)
+
+
+def read_csv(binary_file):
+    error = encoding_error(binary_file)
+    if error:
+        yield error
+        return
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig', newline='')
+    reader = csv.DictReader(text)
+    try:
+        # Row 1 is the header, so data rows are numbered as in a spreadsheet
+        for number, row in enumerate(reader, start=2):
+            yield number, row
+    except UnicodeDecodeError:
+        yield _not_utf8(reader.line_num + 1)
+    except csv.Error as exc:
+        yield reader.line_num, ValidationError(f"invalid CSV: {exc}", code=FILE_ERROR)
+
+
+def read_jsonl(binary_file):
+    error = encoding_error(binary_file)
+    if error:
+        yield error
+        return
+    text = io.TextIOWrapper(binary_file, encoding='utf-8-sig')
+    number = 0
+    try:
+        for number, line in enumerate(text, start=1):
+            if not line.strip():
+                continue
+            try:
+                row = json.loads(line)
+            except ValueError as exc:
+                yield number, ValidationError(f"invalid JSON: {exc}")
+                continue
+            yield number, row if isinstance(row, dict) else ValidationError("expected a JSON object")
+    except UnicodeDecodeError:
+        yield _not_utf8(number + 1)
+
+
+def _text(element, path):
+    found = element.find(path)
+    return (found.text or '').strip() if found is not None else ''
+
+
+def _qti_row(item):
+    labels = item.findall('.//response_label')
+    if len(labels) != 4:
+        return ValidationError(f"expected 4 choices, found {len(labels)}")
+    idents = [label.get('ident') for label in labels]
+    correct = _text(item, './/resprocessing//varequal')
+    row = {
+        'question_text': _text(item, './presentation/material/mattext'),
+        'correct_answer': LETTERS[idents.index(correct)] if correct in idents else correct,
+        'explanation': _text(item, './itemfeedback//mattext'),
+    }
+    for letter, label in zip(LETTERS, labels):
+        row[f'option_{letter.lower()}'] = _text(label, './/mattext')
+    for field in item.findall('.//qtimetadatafield'):
+        row[_text(field, 'fieldlabel')] = _text(field, 'fieldentry')
+    return row
+
+
+def _read_qti(binary_file):
+    """Items of a QTI 1.2 document; each item is removed from the tree once read."""
+    number = 0
+    # Open elements, so a finished item can be detached from its parent: clearing
+    # it alone would still leave one empty element per item under the root
+    open_elements = []
+    try:
+        for event, element in iterparse(binary_file, events=('start', 'end')):
+            if event == 'start':
+                open_elements.append(element)
+                continue
+            open_elements.pop()
+            if element.tag != 'item':
+                continue
+            number += 1
+            row = _qti_row(element)
+            if open_elements:
+                open_elements[-1].remove(element)
+            yield number, row
+    except SyntaxError as exc:
+        yield number + 1, ValidationError(f"invalid XML: {exc}", code=FILE_ERROR)
+
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+    'qti': _read_qti,
+}
+
+
+class ImportReport:
+    """Outcome of an import: saved question count and ``(row number, messages)`` errors."""
+
+    def __init__(self):
+        self.created = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, number, messages):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((number, messages))
+
+    def __repr__(self):
+        return f"<ImportReport created={self.created} errors={self.error_count}>"
+
+
+def _check_name_length(field, name, model):
+    max_length = model._meta.get_field('name').max_length
+    if len(name) > max_length:
+        raise ValidationError({field: f"Ensure this value has at most {max_length} characters (it has {len(name)})."})
+
+
+class _Lookups:
+    """Subjects and topics by name, created on first use and then remembered."""
+
+    def __init__(self):
+        self.subjects = {}
+        self.topics = {}
+
+    def subject(self, name):
+        if not name:
+            return None
+        _check_name_length('subject', name, Subject)
+        if name not in self.subjects:
+            self.subjects[name] = Subject.objects.filter(name=name).first() or Subject.objects.create(name=name)
+        return self.subjects[name]
+
+    def topic(self, name, subject):
+        if not name or subject is None:
+            return None
+        _check_name_length('topic', name, Topic)
+        key = (name, subject.pk)
+        if key not in self.topics:
+            self.topics[key] = (
+                Topic.objects.filter(name=name, subject=subject).first()
+                or Topic.objects.create(name=name, subject=subject)
+            )
+        return self.topics[key]
+
+
+def question_from_row(row, user, lookups):
+    """Validated, unsaved question for an import row; raises ``ValidationError``."""
+    values = {field: str(row.get(field) or '').strip() for field in FIELDS}
+    subject = lookups.subject(values['subject'])
+    question = PythonQuestion(
+        question_text=values['question_text'],
+        option_a=values['option_a'],
+        option_b=values['option_b'],
+        option_c=values['option_c'],
+        option_d=values['option_d'],
+        correct_answer=values['correct_answer'].upper(),
+        explanation=values['explanation'],
+        difficulty=values['difficulty'] or 'medium',
+        question_type=values['question_type'] or 'mcq',
+        subject=subject,
+        topic=lookups.topic(values['topic'], subject),
+        created_by=user,
+    )
+    question.clean_fields(exclude=['subject', 'topic', 'created_by'])
+    return question
+
+
+def _save_chunk(questions):
+    with transaction.atomic():
+        PythonQuestion.objects.bulk_create(questions)
+        # bulk_create sends no post_save, so the indexes are updated here
+        question_search.index_questions(questions, new=True)
+        near_duplicates.index_questions(questions)
+
+
+def import_questions(binary_file, fmt, user, chunk_size=CHUNK_SIZE):
+    """Import questions for ``user`` from a binary file object in format ``fmt``."""
+    report = ImportReport()
+    lookups = _Lookups()
+    chunk = []
+    for number, row in READERS[fmt](binary_file):
+        try:
+            if isinstance(row, ValidationError):
+                raise row
+            chunk.append(question_from_row(row, user, lookups))
+        except ValidationError as exc:
+            report.add_error(number, _messages(exc))
+            continue
+        if len(chunk) == chunk_size:
+            _save_chunk(chunk)
+            report.created += len(chunk)
+            chunk = []
+    if chunk:
+        _save_chunk(chunk)
+        report.created += len(chunk)
+    return report
+
+
+def _messages(exc):
+    if hasattr(exc, 'message_dict'):
+        return [
+            f"{field.replace('_', ' ')}: {message}"
+            for field, messages in exc.message_dict.items()
+            for message in messages
+        ]
+    return list(exc.messages)
@@ -0,0 +1,177 @@
+"""Full-text search and keyset pagination over the question bank.
+
+On SQLite the question text, options and explanation are indexed in the
+FTS5 table ``app_question_fts`` (created by migration 0009).  Saves and
+deletes keep it in sync through ``signals.py``; ``bulk_create`` sends no
+signals, so bulk inserts call :func:`index_questions` themselves.  The
+``question_id`` column is unindexed, so rows are addressed by an FTS
+``rowid`` derived from the question's UUID (:func:`fts_rowid`).  Matches
+are ranked with ``bm25()``.  Other databases fall back to ``icontains``.
+
+Pages are cut with a cursor holding the sort key of the last row shown
+instead of an offset, so page 500 costs the same as page 1.
+"""
+import base64
+import json
+import re
+import uuid
+
+from django.db import connection
+from django.db.models import FloatField, Q, Value
+from django.db.models.expressions import RawSQL
+from django.utils.dateparse import parse_datetime
+
+from .models import PythonQuestion
+
+FTS_TABLE = 'app_question_fts'
+PAGE_SIZE = 50
+
+_WORD = re.compile(r'\w+', re.UNICODE)
+
+
+def fts_enabled():
+    return connection.vendor == 'sqlite'
+
+
+def _options_text(question):
+    return ' '.join([question.option_a, question.option_b, question.option_c, question.option_d])
+
+
+def fts_rowid(question_id):
+    """FTS rowid of a question: the top 63 bits of its UUID, which fit SQLite's signed 64-bit rowid."""
+    return question_id.int >> 65
+
+
+def index_questions(questions, new=False):
+    """Add or replace the index rows of ``questions``.
+
+    Pass ``new=True`` for questions just created, which have no rows to replace.
+    """
+    if not fts_enabled() or not questions:
+        return
+    with connection.cursor() as cursor:
+        if not new:
+            remove_from_index([question.pk for question in questions], cursor=cursor)
+        cursor.executemany(
+            f'INSERT INTO {FTS_TABLE} (rowid, question_id, question_text, options, explanation) '
+            f'VALUES (%s, %s, %s, %s, %s)',
+            [
+                (fts_rowid(question.pk), question.pk.hex, question.question_text, _options_text(question),
+                 question.explanation)
+                for question in questions
+            ],
+        )
+
+
+def remove_from_index(question_ids, cursor=None):
+    if not fts_enabled() or not question_ids:
+        return
+    ids = [fts_rowid(question_id) for question_id in question_ids]
+    sql = f'DELETE FROM {FTS_TABLE} WHERE rowid IN ({", ".join(["%s"] * len(ids))})'
+    if cursor is not None:
+        cursor.execute(sql, ids)
+        return
+    with connection.cursor() as cursor:
+        cursor.execute(sql, ids)
+
+
+def rebuild_index(batch_size=2000):
+    """Re-index every question; returns the number indexed."""
+    if not fts_enabled():
+        return 0
+    with connection.cursor() as cursor:
+        cursor.execute(f'DELETE FROM {FTS_TABLE}')
+    count = 0
+    batch = []
+    fields = ('id', 'question_text', 'option_a', 'option_b', 'option_c', 'option_d', 'explanation')
+    for question in PythonQuestion.objects.only(*fields).iterator(chunk_size=batch_size):
+        batch.append(question)
+        if len(batch) == batch_size:
+            index_questions(batch, new=True)
+            count += len(batch)
+            batch = []
+    index_questions(batch, new=True)
+    return count + len(batch)
+
+
+def match_expression(query):
+    """FTS5 query matching every word of ``query`` as a prefix, or '' if it has none.
+
+    Words are quoted so user input can't form FTS5 syntax (operators,
+    column filters, unbalanced quotes).
+    """
+    return ' '.join(f'"{word}"*' for word in _WORD.findall(query))
+
+
+def search(queryset, query):
+    """Restrict ``queryset`` to questions matching ``query``, annotated with ``rank``.
+
+    Lower ranks are better matches (``bm25()`` scores are negative).
+    """
+    words = _WORD.findall(query)
+    if not words:
+        return queryset.none()
+    if not fts_enabled():
+        for word in words:
+            queryset = queryset.filter(
+                Q(question_text__icontains=word) | Q(option_a__icontains=word) | Q(option_b__icontains=word)
+                | Q(option_c__icontains=word) | Q(option_d__icontains=word) | Q(explanation__icontains=word)
+            )
+        return queryset.annotate(rank=Value(0.0))
+    table = connection.ops.quote_name(PythonQuestion._meta.db_table)
+    return queryset.extra(
+        tables=[FTS_TABLE],
+        where=[f'{FTS_TABLE}.question_id = {table}.id', f'{FTS_TABLE} MATCH %s'],
+        params=[match_expression(query)],
+    ).annotate(rank=RawSQL(f'bm25({FTS_TABLE})', [], output_field=FloatField()))
+
+
+def encode_cursor(values):
+    return base64.urlsafe_b64encode(json.dumps(values).encode()).decode().rstrip('=')
+
+
+def decode_cursor(cursor, ranked=False):
+    """Sort key encoded in ``cursor`` with typed values, or None if it is malformed."""
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + '=' * (-len(cursor) % 4)))
+        rank, created_at, question_id = values if ranked else [None, *values]
+        key = [parse_datetime(created_at), uuid.UUID(question_id)]
+        if key[0] is None:
+            return None
+        return [float(rank), *key] if ranked else key
+    except (ValueError, TypeError):
+        return None
+
+
+def _after(key, ranked):
+    """Filter selecting the rows that sort after the cursor ``key``."""
+    if ranked:
+        rank, created_at, question_id = key
+        return Q(rank__gt=rank) | Q(rank=rank, created_at__lt=created_at) | Q(
+            rank=rank, created_at=created_at, id__lt=question_id
+        )
+    created_at, question_id = key
+    return Q(created_at__lt=created_at) | Q(created_at=created_at, id__lt=question_id)
+
+
+def page(queryset, cursor=None, ranked=False, size=PAGE_SIZE):
+    """One page of ``queryset`` after ``cursor``, plus the cursor of the next page (or None).
+
+    Browsing is newest first on ``(created_at, id)``; search results (from
+    :func:`search`) are ordered by ``(rank, created_at, id)``.  A malformed
+    cursor restarts at the first page.
+    """
+    order = ('-created_at', '-id')
+    queryset = queryset.order_by('rank', *order) if ranked else queryset.order_by(*order)
+    key = decode_cursor(cursor, ranked) if cursor else None
+    if key:
+        queryset = queryset.filter(_after(key, ranked))
+
+    rows = list(queryset[:size + 1])
+    next_cursor = None
+    if len(rows) > size:
+        rows = rows[:size]
+        last = rows[-1]
+        key = [last.created_at.isoformat(), last.pk.hex]
+        next_cursor = encode_cursor([last.rank, *key] if ranked else key)
+    return rows, next_cursor
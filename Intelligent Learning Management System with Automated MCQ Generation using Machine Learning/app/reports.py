@@ -0,0 +1,85 @@
+"""Instructor reports computed in the database.
+
+Each report is a single grouped query, so the page costs the same number
+of queries for ten students as for twenty thousand.  The views paginate the
+queryset for HTML and stream it row by row for CSV export.
+"""
+import csv
+from datetime import datetime, time
+
+from django.db.models import Avg, Count, Exists, OuterRef, Q, Sum
+from django.db.models.functions import Coalesce, NullIf
+from django.http import StreamingHttpResponse
+from django.utils import timezone
+
+from .models import Enrollment, User
+
+PERFORMANCE_CSV_HEADER = ['username', 'first_name', 'last_name', 'email', 'tests_taken', 'avg_score']
+
+
+def _day_bound(day, upper=False):
+    return timezone.make_aware(datetime.combine(day, time.max if upper else time.min))
+
+
+def student_performance(course=None, date_from=None, date_to=None):
+    """Students annotated with ``tests_taken`` and ``avg_score``.
+
+    Only completed attempts count, restricted to ``course``'s tests and to
+    attempts finished between ``date_from`` and ``date_to`` (inclusive dates)
+    when given.  With a course, only students enrolled in it are listed.
+    Without a date range the totals come from ``StudentCourseStats``.
+    """
+    students = User.objects.filter(user_type='student')
+    if course is not None:
+        students = students.filter(
+            Exists(Enrollment.objects.filter(student=OuterRef('pk'), course=course))
+        )
+    if not date_from and not date_to:
+        return _from_summaries(students, course)
+
+    attempts = Q(test_attempts__completed_at__isnull=False)
+    if course is not None:
+        attempts &= Q(test_attempts__test__course=course)
+    if date_from:
+        attempts &= Q(test_attempts__completed_at__gte=_day_bound(date_from))
+    if date_to:
+        attempts &= Q(test_attempts__completed_at__lte=_day_bound(date_to, upper=True))
+    return students.annotate(
+        tests_taken=Count('test_attempts', filter=attempts),
+        avg_score=Avg('test_attempts__score', filter=attempts),
+    ).order_by('username', 'pk')
+
+
+def _from_summaries(students, course):
+    rows = Q(course_stats__course=course) if course is not None else Q()
+    taken = Sum('course_stats__attempts_count', filter=rows)
+    return students.annotate(
+        tests_taken=Coalesce(taken, 0),
+        avg_score=Sum('course_stats__score_sum', filter=rows) / NullIf(taken, 0),
+    ).order_by('username', 'pk')
+
+
+class _Echo:
+    """File-like object whose ``write`` hands the line back to the caller."""
+
+    def write(self, value):
+        return value
+
+
+def stream_csv(header, rows, filename):
+    writer = csv.writer(_Echo())
+    lines = (writer.writerow(row) for row in _with_header(header, rows))
+    response = StreamingHttpResponse(lines, content_type='text/csv')
+    response['Content-Disposition'] = f'attachment; filename="{filename}"'
+    return response
+
+
+def _with_header(header, rows):
+    yield header
+    yield from rows
+
+
+def performance_csv(students):
+    rows = students.values_list(*PERFORMANCE_CSV_HEADER[:-1], 'avg_score').iterator(chunk_size=2000)
+    rows = (row[:-1] + (round(row[-1] or 0.0, 2),) for row in rows)
+    return stream_csv(PERFORMANCE_CSV_HEADER, rows, 'student_performance.csv')
@@ -0,0 +1,143 @@
+"""Course roster sync.
+
+A roster lists the students who should be enrolled in a course, one row per
+student identified by ``username`` or ``email`` (CSV with a header row, or
+JSON Lines).  Syncing diffs it against the course's ``Enrollment`` rows and
+applies the difference in one transaction: missing enrollments are inserted
+with ``bulk_create``, inactive ones listed in the roster are reactivated and
+active ones missing from it are deactivated, each with batched ``UPDATE``
+statements.  Enrollments are never deleted, so attempts and history stay
+attached, and syncing the same roster twice changes nothing the second time.
+A roster that can't be read to the end (not UTF-8, broken CSV) changes
+nothing at all, since every student after the failure would look missing.
+"""
+from django.db import transaction
+
+from . import student_dashboard
+from .models import Enrollment, User
+from .question_io import FILE_ERROR, MAX_REPORTED_ERRORS, read_csv, read_jsonl
+
+READERS = {
+    'csv': read_csv,
+    'jsonl': read_jsonl,
+}
+# Values per IN (...) list, below SQLite's default limit of 999 query parameters
+BATCH_SIZE = 900
+
+
+class SyncReport:
+    """Counts of a roster sync, plus ``(row number, message)`` errors for unusable rows.
+
+    ``unreadable`` is set when the file could not be read to the end; nothing
+    is changed then.
+    """
+
+    def __init__(self):
+        self.unreadable = False
+        self.created = 0
+        self.reactivated = 0
+        self.deactivated = 0
+        self.unchanged = 0
+        self.error_count = 0
+        self.errors = []
+
+    def add_error(self, number, message):
+        self.error_count += 1
+        if len(self.errors) < MAX_REPORTED_ERRORS:
+            self.errors.append((number, message))
+
+    def __repr__(self):
+        return (
+            f"<SyncReport created={self.created} reactivated={self.reactivated} "
+            f"deactivated={self.deactivated} unchanged={self.unchanged} errors={self.error_count}>"
+        )
+
+
+def _batches(values):
+    values = list(values)
+    for start in range(0, len(values), BATCH_SIZE):
+        yield values[start:start + BATCH_SIZE]
+
+
+def _roster_rows(binary_file, fmt, report):
+    """``(row number, field, value)`` for each usable row; other rows are reported."""
+    rows = []
+    for number, row in READERS[fmt](binary_file):
+        if not isinstance(row, dict):
+            report.add_error(number, '; '.join(row.messages))
+            report.unreadable = report.unreadable or row.code == FILE_ERROR
+            continue
+        username = str(row.get('username') or '').strip()
+        email = str(row.get('email') or '').strip()
+        if username:
+            rows.append((number, 'username', username))
+        elif email:
+            rows.append((number, 'email', email))
+        else:
+            report.add_error(number, "no username or email")
+    return rows
+
+
+def _resolve_students(rows, report):
+    """Ids of the students named by ``rows``, looked up a batch at a time."""
+    found = {}
+    for field in ('username', 'email'):
+        values = {value for _, row_field, value in rows if row_field == field}
+        for batch in _batches(values):
+            for user_id, value, user_type in User.objects.filter(**{f'{field}__in': batch}).values_list(
+                'id', field, 'user_type'
+            ):
+                found[field, value] = (user_id, user_type)
+
+    student_ids = set()
+    for number, field, value in rows:
+        user = found.get((field, value))
+        if user is None:
+            report.add_error(number, f"no user with {field} '{value}'")
+        elif user[1] != 'student':
+            report.add_error(number, f"'{value}' is not a student account")
+        else:
+            student_ids.add(user[0])
+    return student_ids
+
+
+def sync_roster(course, binary_file, fmt, deactivate_missing=True, dry_run=False):
+    """Make ``course``'s active enrollments match the roster in ``binary_file``.
+
+    With ``deactivate_missing=False`` students absent from the roster keep
+    their enrollment (a bulk enrollment rather than a sync).  With
+    ``dry_run`` the counts are computed but nothing is written.
+    """
+    report = SyncReport()
+    rows = _roster_rows(binary_file, fmt, report)
+    if report.unreadable:
+        return report
+    roster = _resolve_students(rows, report)
+
+    with transaction.atomic():
+        existing = dict(Enrollment.objects.filter(course=course).values_list('student_id', 'is_active'))
+        to_create = roster - existing.keys()
+        to_reactivate = {student_id for student_id in roster & existing.keys() if not existing[student_id]}
+        to_deactivate = (
+            {student_id for student_id, active in existing.items() if active and student_id not in roster}
+            if deactivate_missing else set()
+        )
+        report.created = len(to_create)
+        report.reactivated = len(to_reactivate)
+        report.deactivated = len(to_deactivate)
+        report.unchanged = len(roster) - report.created - report.reactivated
+        if dry_run:
+            return report
+
+        Enrollment.objects.bulk_create(
+            [Enrollment(course=course, student_id=student_id) for student_id in to_create],
+            batch_size=BATCH_SIZE,
+            # A student enrolling themselves meanwhile already has the row
+            ignore_conflicts=True,
+        )
+        for is_active, student_ids in ((True, to_reactivate), (False, to_deactivate)):
+            for batch in _batches(student_ids):
+                Enrollment.objects.filter(course=course, student_id__in=batch).update(is_active=is_active)
+        # Bulk writes send no signals, so the affected dashboards are refreshed here
+        student_dashboard.invalidate_students(to_create | to_reactivate | to_deactivate)
+    return report
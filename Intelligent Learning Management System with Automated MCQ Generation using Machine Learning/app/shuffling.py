@@ -0,0 +1,36 @@
+"""Per-attempt question and option order.
+
+Every permutation is derived from the ``TestAttempt`` id, so it can be
+recomputed at grading time instead of storing a copy of the paper for each
+student.  Option orders are seeded per question, which keeps them stable
+even if the paper is re-rendered in a different order.
+"""
+import random
+
+LETTERS = 'ABCD'
+
+
+def question_order(attempt_id, count):
+    """Indices of the paper's questions in the order this attempt shows them."""
+    order = list(range(count))
+    random.Random(f'questions:{attempt_id}').shuffle(order)
+    return order
+
+
+def option_order(attempt_id, question_id):
+    """Canonical letters in display order, e.g. 'CADB' shows option C first."""
+    letters = list(LETTERS)
+    random.Random(f'options:{attempt_id}:{question_id}').shuffle(letters)
+    return ''.join(letters)
+
+
+def to_canonical(attempt_id, question_id, display_letter):
+    """Map the letter a student picked on screen back to the stored option letter."""
+    if len(display_letter) != 1 or display_letter not in LETTERS:
+        return None
+    return option_order(attempt_id, question_id)[LETTERS.index(display_letter)]
+
+
+def to_display(attempt_id, question_id, canonical_letter):
+    """Inverse of ``to_canonical``: the letter this attempt shows for a stored option."""
+    return LETTERS[option_order(attempt_id, question_id).index(canonical_letter)]
@@ -0,0 +1,84 @@
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from . import course_catalog, near_duplicates, question_search, student_dashboard
+from .exam_paper import invalidate_papers
+from .grading import invalidate_answer_keys
+from .models import Course, Enrollment, PythonQuestion, Test, TestAttempt
+
+
+def invalidate_test_caches(test_ids):
+    test_ids = list(test_ids)
+    invalidate_answer_keys(test_ids)
+    invalidate_papers(test_ids)
+
+
+@receiver(m2m_changed, sender=Test.questions.through)
+def test_questions_changed(sender, instance, action, reverse, pk_set, **kwargs):
+    if action not in ('post_add', 'post_remove', 'post_clear', 'pre_clear'):
+        return
+    if not reverse:
+        invalidate_test_caches([instance.pk])
+    elif action == 'pre_clear':
+        # question.tests.clear(): the affected tests are only known before the rows go
+        invalidate_test_caches(instance.tests.values_list('id', flat=True))
+    elif pk_set:
+        invalidate_test_caches(pk_set)
+
+
+@receiver(post_save, sender=PythonQuestion)
+@receiver(pre_delete, sender=PythonQuestion)
+def question_changed(sender, instance, **kwargs):
+    if kwargs.get('created'):
+        return  # a new question can't be part of a test yet
+    invalidate_test_caches(instance.tests.values_list('id', flat=True))
+
+
+@receiver(post_save, sender=PythonQuestion)
+def question_saved(sender, instance, created, **kwargs):
+    question_search.index_questions([instance], new=created)
+    near_duplicates.index_questions([instance])
+
+
+@receiver(post_delete, sender=PythonQuestion)
+def question_deleted(sender, instance, **kwargs):
+    question_search.remove_from_index([instance.pk])
+
+
+@receiver(post_save, sender=Test)
+@receiver(post_delete, sender=Test)
+def test_changed(sender, instance, **kwargs):
+    # Also on creation: the id may be reused from a flushed or restored database
+    invalidate_test_caches([instance.pk])
+
+
+@receiver(post_save, sender=Enrollment)
+@receiver(post_delete, sender=Enrollment)
+def enrollment_changed(sender, instance, **kwargs):
+    student_dashboard.invalidate_student(instance.student_id)
+
+
+@receiver(post_save, sender=TestAttempt)
+def attempt_saved(sender, instance, **kwargs):
+    if instance.completed_at:
+        student_dashboard.invalidate_student(instance.student_id)
+
+
+@receiver(post_save, sender=Test)
+@receiver(post_delete, sender=Test)
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def catalog_changed(sender, instance, **kwargs):
+    student_dashboard.invalidate_all()
+
+
+@receiver(post_save, sender=Course)
+@receiver(post_delete, sender=Course)
+def course_changed(sender, instance, **kwargs):
+    course_catalog.invalidate()
+
+
+@receiver(m2m_changed, sender=Course.subjects.through)
+def course_subjects_changed(sender, action, **kwargs):
+    if action in ('post_add', 'post_remove', 'post_clear'):
+        course_catalog.invalidate()
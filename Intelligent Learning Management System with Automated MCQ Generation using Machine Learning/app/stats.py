@@ -0,0 +1,106 @@
+"""Materialized attempt statistics.
+
+``StudentCourseStats`` and ``TestStats`` keep running totals of completed
+attempts so the dashboard, the performance history and the instructor
+report read a handful of summary rows instead of scanning ``TestAttempt``.
+``record_attempt`` folds one attempt in when it is graded, inside the
+grading transaction; ``rebuild`` recomputes everything from the attempts
+(``manage.py rebuild_stats``), e.g. after attempts were deleted or a test's
+passing score changed.
+"""
+from django.db import transaction
+from django.db.models import Count, F, FloatField, IntegerField, Q, Sum
+from django.db.models.functions import Cast, Floor, Least
+
+from .models import StudentCourseStats, Test, TestAttempt, TestStats
+
+BIN_WIDTH = 100 / TestStats.HISTOGRAM_BINS
+
+
+def score_bin(score):
+    return min(int(score // BIN_WIDTH), TestStats.HISTOGRAM_BINS - 1)
+
+
+def record_attempt(attempt):
+    """Add a just-completed, scored ``attempt`` to the summary tables."""
+    test = Test.objects.only('course_id', 'passing_score').get(pk=attempt.test_id)
+    passed = int(attempt.score >= test.passing_score)
+
+    lookup = {'student_id': attempt.student_id, 'course_id': test.course_id}
+    StudentCourseStats.objects.get_or_create(**lookup)
+    StudentCourseStats.objects.filter(**lookup).update(
+        attempts_count=F('attempts_count') + 1,
+        passed_count=F('passed_count') + passed,
+        score_sum=F('score_sum') + attempt.score,
+    )
+
+    # The histogram is a JSON list, so this row is locked and updated in Python
+    test_stats, _ = TestStats.objects.select_for_update().get_or_create(test_id=test.pk)
+    histogram = test_stats.histogram or [0] * TestStats.HISTOGRAM_BINS
+    histogram[score_bin(attempt.score)] += 1
+    test_stats.attempts_count += 1
+    test_stats.passed_count += passed
+    test_stats.score_sum += attempt.score
+    test_stats.histogram = histogram
+    test_stats.save()
+
+
+def _totals(queryset, *group_by):
+    return queryset.values(*group_by).annotate(
+        attempts=Count('id'),
+        passed=Count('id', filter=Q(score__gte=F('test__passing_score'))),
+        total=Sum('score'),
+    ).order_by()
+
+
+def rebuild(batch_size=1000):
+    """Recompute both summary tables from completed attempts with grouped queries.
+
+    Returns ``(student_course_rows, test_rows)``.
+    """
+    attempts = TestAttempt.objects.filter(completed_at__isnull=False, score__isnull=False)
+
+    histograms = {}
+    bins = attempts.annotate(
+        bin=Least(Cast(Floor(F('score') / BIN_WIDTH), IntegerField()), TestStats.HISTOGRAM_BINS - 1)
+    ).values('test_id', 'bin').annotate(n=Count('id')).order_by()
+    for row in bins.iterator():
+        histograms.setdefault(row['test_id'], [0] * TestStats.HISTOGRAM_BINS)[row['bin']] = row['n']
+
+    student_rows = [
+        StudentCourseStats(
+            student_id=row['student_id'], course_id=row['test__course_id'],
+            attempts_count=row['attempts'], passed_count=row['passed'], score_sum=row['total'],
+        )
+        for row in _totals(attempts, 'student_id', 'test__course_id').iterator()
+    ]
+    test_rows = [
+        TestStats(
+            test_id=row['test_id'], attempts_count=row['attempts'], passed_count=row['passed'],
+            score_sum=row['total'], histogram=histograms[row['test_id']],
+        )
+        for row in _totals(attempts, 'test_id').iterator()
+    ]
+
+    with transaction.atomic():
+        StudentCourseStats.objects.all().delete()
+        TestStats.objects.all().delete()
+        StudentCourseStats.objects.bulk_create(student_rows, batch_size=batch_size)
+        TestStats.objects.bulk_create(test_rows, batch_size=batch_size)
+    return len(student_rows), len(test_rows)
+
+
+def student_summary(student):
+    """Completed, passed and failed attempt counts and average score of ``student``."""
+    totals = StudentCourseStats.objects.filter(student=student).aggregate(
+        attempts=Sum('attempts_count'), passed=Sum('passed_count'),
+        total=Sum('score_sum', output_field=FloatField()),
+    )
+    attempts = totals['attempts'] or 0
+    passed = totals['passed'] or 0
+    return {
+        'completed_tests': attempts,
+        'passed_count': passed,
+        'failed_count': attempts - passed,
+        'average_score': totals['total'] / attempts if attempts else 0,
+    }
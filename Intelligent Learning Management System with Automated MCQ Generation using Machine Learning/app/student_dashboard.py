@@ -0,0 +1,94 @@
+"""Cached student dashboard.
+
+The dashboard body is rendered once per student and kept in the
+``PAGE_CACHE_ALIAS`` cache, which all workers share.  Its key carries two
+version tokens: one per student, replaced when the student enrolls or
+completes an attempt, and one shared by everybody, replaced when a test or
+course changes (see ``signals.py``).  Replacing a token orphans every
+fragment built with the old one in every worker, so nothing has to be
+deleted.  Fragments also expire after ``DASHBOARD_CACHE_TIMEOUT`` seconds so
+tests opening or closing on schedule show up without any event.
+"""
+import uuid
+
+from django.conf import settings
+from django.core.cache import caches
+from django.db import transaction
+from django.db.models import Exists, OuterRef
+from django.template.loader import render_to_string
+from django.utils import timezone
+
+from . import stats
+from .models import Enrollment, Test, TestAttempt
+
+CATALOG_TOKEN_KEY = 'dashboard-version:catalog'
+
+
+def _cache():
+    return caches[getattr(settings, 'PAGE_CACHE_ALIAS', 'default')]
+
+
+def _student_token_key(student_id):
+    return f'dashboard-version:student:{student_id}'
+
+
+def _tokens(student_id):
+    keys = [_student_token_key(student_id), CATALOG_TOKEN_KEY]
+    tokens = _cache().get_many(keys)
+    missing = {key: uuid.uuid4().hex for key in keys if key not in tokens}
+    if missing:
+        _cache().set_many(missing)
+        tokens.update(missing)
+    return [tokens[key] for key in keys]
+
+
+def _replace_token(key):
+    # After commit, so a concurrent render can't cache pre-commit data under the new token
+    transaction.on_commit(lambda: _cache().set(key, uuid.uuid4().hex))
+
+
+def invalidate_student(student_id):
+    _replace_token(_student_token_key(student_id))
+
+
+def invalidate_students(student_ids):
+    keys = [_student_token_key(student_id) for student_id in student_ids]
+    if keys:
+        transaction.on_commit(lambda: _cache().set_many({key: uuid.uuid4().hex for key in keys}))
+
+
+def invalidate_all():
+    _replace_token(CATALOG_TOKEN_KEY)
+
+
+def student_context(student):
+    """Enrollments, available tests and score summary for the dashboard template."""
+    enrollments = list(
+        Enrollment.objects.filter(student=student).select_related('course__instructor').order_by('enrollment_date')
+    )
+    now = timezone.now()
+    completed = TestAttempt.objects.filter(student=student, test=OuterRef('pk'), completed_at__isnull=False)
+    active_tests = Test.objects.filter(
+        course_id__in=[enrollment.course_id for enrollment in enrollments if enrollment.is_active],
+        is_published=True,
+        available_from__lte=now,
+        available_to__gte=now,
+    ).exclude(Exists(completed)).select_related('course').order_by('available_to')
+
+    summary = stats.student_summary(student)
+    return {
+        'enrolled_courses': enrollments,
+        'completed_tests': summary['completed_tests'],
+        'average_score': round(summary['average_score'], 2),
+        'active_tests': list(active_tests),
+    }
+
+
+def render_student_dashboard(student):
+    student_token, catalog_token = _tokens(student.pk)
+    key = f'dashboard:{student.pk}:{student_token}:{catalog_token}'
+    html = _cache().get(key)
+    if html is None:
+        html = render_to_string('student/_dashboard.html', student_context(student))
+        _cache().set(key, html, getattr(settings, 'DASHBOARD_CACHE_TIMEOUT', 300))
+    return html
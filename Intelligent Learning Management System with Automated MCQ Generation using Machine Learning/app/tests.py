@@ -1,3 +1,1413 @@
-from django.test import TestCase
-
-# Create your tests here.
+import io
+import itertools
+import json
+import multiprocessing
+import os
+import random
+import statistics
+import tempfile
+import threading
+import uuid
+import zipfile
+from datetime import date, timedelta
+from unittest import mock, skipUnless
+
+from django.apps import apps
+from django.contrib.sessions.models import Session
+from django.core.cache import caches
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import CommandError, call_command
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+
+from . import (
+    course_catalog, distractors, documents, exam_paper, generation_cache, grading, item_analysis, jobs, mcq_generator, near_duplicates,
+    nltk_resources, question_bank, question_io, question_search, reports, rosters, shuffling, stats, student_dashboard,
+)
+from .cache_backends import LRUFileBasedCache
+from .forms import TextToMCQForm
+from .models import (
+    Course, DistractorTerm, Enrollment, GeneratedBatch, GeneratedItem, MCQCacheCounter, MCQGenerationJob, PythonQuestion,
+    StudentCourseStats, Subject, Test, TestAttempt, TestResult, TestStats, User,
+)
+
+# Per-process caches, so the suite never reads or fills the on-disk caches of a dev setup
+LOCAL_CACHES = {
+    alias: {'BACKEND': 'django.core.cache.backends.locmem.LocMemCache', 'LOCATION': alias}
+    for alias in ('default', 'mcq', 'tests', 'pages')
+}
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class ExamTestCase(TestCase):
+    """An instructor's published test of four questions and a student to take it."""
+
+    question_count = 4
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.instructor = User.objects.create(username='inst', email='inst@example.com', user_type='instructor')
+        cls.student = User.objects.create(username='stud', email='stud@example.com')
+        cls.course = Course.objects.create(
+            name='Python', code='PY101', description='', instructor=cls.instructor,
+            start_date=date.today(), end_date=date.today() + timedelta(days=30)
+        )
+        cls.test = Test.objects.create(
+            title='Quiz', course=cls.course, is_published=True, created_by=cls.instructor,
+            available_from=now - timedelta(days=1), available_to=now + timedelta(days=1)
+        )
+        cls.questions = [
+            PythonQuestion.objects.create(
+                question_text=f'Question {number}?', option_a=f'a{number}', option_b=f'b{number}',
+                option_c=f'c{number}', option_d=f'd{number}', correct_answer='ABCD'[number % 4],
+                created_by=cls.instructor,
+            )
+            for number in range(cls.question_count)
+        ]
+        cls.test.questions.add(*cls.questions)
+
+    def setUp(self):
+        for alias in LOCAL_CACHES:
+            caches[alias].clear()
+
+
+@skipUnless(connection.vendor == 'sqlite', "Query plans are checked against SQLite")
+class HotLookupQueryPlanTests(TestCase):
+    """The attempt/result lookups behind take_test, the dashboard and
+    test_result must stay on their composite indexes."""
+
+    @classmethod
+    def setUpTestData(cls):
+        now = timezone.now()
+        cls.instructor = User.objects.create(username='inst', email='inst@example.com', user_type='instructor')
+        cls.student = User.objects.create(username='stud', email='stud@example.com')
+        cls.course = Course.objects.create(
+            name='Python', code='PY101', description='', instructor=cls.instructor,
+            start_date=date.today(), end_date=date.today() + timedelta(days=30)
+        )
+        cls.test = Test.objects.create(
+            title='Quiz', course=cls.course, is_published=True, created_by=cls.instructor,
+            available_from=now - timedelta(days=1), available_to=now + timedelta(days=1)
+        )
+        cls.attempt = TestAttempt.objects.create(student=cls.student, test=cls.test, total_questions=0)
+
+    def assertSearchesIndex(self, queryset, condition):
+        # SQLite names unique-constraint indexes sqlite_autoindex_*, so match
+        # on the indexed columns the plan searches rather than the index name.
+        plan = queryset.explain()
+        self.assertIn('USING INDEX', plan)
+        self.assertIn(condition, plan)
+
+    def test_attempt_by_student_and_test(self):
+        self.assertSearchesIndex(
+            TestAttempt.objects.filter(student=self.student, test=self.test),
+            '(student_id=? AND test_id=?)'
+        )
+
+    def test_completed_attempts_by_student(self):
+        self.assertSearchesIndex(
+            TestAttempt.objects.filter(student=self.student, completed_at__isnull=False),
+            '(student_id=? AND completed_at>?)'
+        )
+
+    def test_results_by_attempt(self):
+        self.assertSearchesIndex(TestResult.objects.filter(attempt=self.attempt), '(attempt_id=?)')
+
+    def test_available_tests_by_course(self):
+        now = timezone.now()
+        self.assertSearchesIndex(
+            Test.objects.filter(
+                course__in=[self.course.id], is_published=True,
+                available_from__lte=now, available_to__gte=now
+            ),
+            '(course_id=? AND available_from<?)'
+        )
+
+
+class AnswerKeyCacheTests(ExamTestCase):
+
+    def test_answer_key_is_served_from_the_cache(self):
+        key = grading.get_answer_key(self.test)
+        self.assertEqual(key.answers, {str(question.id): question.correct_answer for question in self.questions})
+        with self.assertNumQueries(0):
+            self.assertEqual(grading.get_answer_key(self.test).answers, key.answers)
+
+    def test_adding_a_question_replaces_the_key(self):
+        grading.get_answer_key(self.test)
+        question = PythonQuestion.objects.create(
+            question_text='New?', option_a='a', option_b='b', option_c='c', option_d='d',
+            correct_answer='B', created_by=self.instructor,
+        )
+        self.test.questions.add(question)
+        self.assertEqual(grading.get_answer_key(self.test).answers[str(question.id)], 'B')
+
+    def test_saving_the_test_drops_cached_entries(self):
+        grading.get_answer_key(self.test)
+        exam_paper.get_paper(self.test)
+        self.test.save()
+        cache = caches['tests']
+        self.assertIsNone(cache.get(grading._answer_key_cache_key(self.test.pk)))
+        self.assertIsNone(cache.get(exam_paper._cache_key(self.test.pk)))
+
+    def test_entries_left_by_another_database_are_rebuilt(self):
+        # Same test id, but built for a row created at another time (flushed or restored DB)
+        cache = caches['tests']
+        cache.set(grading._answer_key_cache_key(self.test.pk), grading.AnswerKey(self.test.pk, {'stale': 'A'}, 'other'))
+        cache.set(exam_paper._cache_key(self.test.pk), ('other', []))
+        self.assertEqual(grading.get_answer_key(self.test).count, self.question_count)
+        self.assertEqual(len(exam_paper.get_paper(self.test)), self.question_count)
+
+
+class AutosaveTests(ExamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.attempt = TestAttempt.objects.create(student=self.student, test=self.test, total_questions=4)
+        self.client.force_login(self.student)
+
+    def autosave(self, answers):
+        return self.client.post(
+            reverse('autosave_answers', args=[self.attempt.id]),
+            json.dumps({'answers': answers}), content_type='application/json',
+        )
+
+    def test_saves_the_canonical_option_of_the_displayed_letter(self):
+        question = self.questions[0]
+        response = self.autosave({str(question.id): 'B'})
+        self.assertEqual(response.json(), {'saved': 1})
+        result = TestResult.objects.get(attempt=self.attempt)
+        self.assertEqual(result.selected_option, shuffling.to_canonical(self.attempt.id, question.id, 'B'))
+
+    def test_later_answer_replaces_earlier_one(self):
+        question_id = str(self.questions[0].id)
+        self.autosave({question_id: 'A'})
+        self.autosave({question_id: 'C'})
+        self.assertEqual(grading.saved_answers(self.attempt), {question_id: 'C'})
+
+    def test_malformed_values_are_rejected(self):
+        question_id = str(self.questions[0].id)
+        for letter in (1, ['A'], {'A': 1}, True):
+            with self.subTest(letter=letter):
+                self.assertEqual(self.autosave({question_id: letter}).status_code, 400)
+        self.assertEqual(self.autosave([question_id]).status_code, 400)
+        self.assertFalse(TestResult.objects.exists())
+
+    def test_unanswered_and_unknown_questions_are_skipped(self):
+        response = self.autosave({str(self.questions[0].id): None, 'not-a-question': 'A'})
+        self.assertEqual(response.json(), {'saved': 0})
+
+    def test_submitted_attempt_is_not_changed(self):
+        grading.grade_submission(self.attempt, {})
+        self.assertEqual(self.autosave({str(self.questions[0].id): 'A'}).status_code, 409)
+
+
+@skipUnless(question_search.fts_enabled(), "Full-text search uses SQLite FTS5")
+class QuestionSearchTests(ExamTestCase):
+
+    def fts_rows(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f'SELECT rowid, question_id FROM {question_search.FTS_TABLE}')
+            return cursor.fetchall()
+
+    def search(self, query):
+        return set(question_search.search(PythonQuestion.objects.all(), query).values_list('id', flat=True))
+
+    def test_saved_questions_are_found_by_word_prefix(self):
+        self.assertEqual(self.search('quest c2'), {self.questions[2].id})
+
+    def test_edit_replaces_the_index_row(self):
+        question = self.questions[0]
+        question.question_text = 'Which keyword defines a generator?'
+        question.save()
+        self.assertEqual(self.search('generator'), {question.id})
+        self.assertEqual(self.search('a0'), {question.id})
+        self.assertEqual(len(self.fts_rows()), self.question_count)
+
+    def test_index_rows_are_keyed_by_question_rowid(self):
+        self.assertEqual(
+            sorted(self.fts_rows()),
+            sorted((question_search.fts_rowid(question.pk), question.pk.hex) for question in self.questions),
+        )
+
+    def test_delete_removes_the_index_row(self):
+        self.questions[1].delete()
+        self.assertEqual(self.search('b1'), set())
+        self.assertEqual(len(self.fts_rows()), self.question_count - 1)
+
+    def test_rebuild_restores_every_row(self):
+        question_search.remove_from_index([question.pk for question in self.questions])
+        self.assertEqual(question_search.rebuild_index(), self.question_count)
+        self.assertEqual(self.search('question'), {question.id for question in self.questions})
+
+    def test_pages_cover_every_question_once(self):
+        for ranked, queryset in (
+            (False, PythonQuestion.objects.all()),
+            (True, question_search.search(PythonQuestion.objects.all(), 'question')),
+        ):
+            with self.subTest(ranked=ranked):
+                seen, cursor = [], None
+                while True:
+                    rows, cursor = question_search.page(queryset, cursor, ranked=ranked, size=3)
+                    seen.extend(row.id for row in rows)
+                    if cursor is None:
+                        break
+                self.assertCountEqual(seen, [question.id for question in self.questions])
+
+    def test_malformed_cursor_restarts_at_the_first_page(self):
+        first, _ = question_search.page(PythonQuestion.objects.all(), size=2)
+        self.assertEqual(question_search.page(PythonQuestion.objects.all(), 'not-a-cursor', size=2)[0], first)
+
+
+class NearDuplicateTests(ExamTestCase):
+
+    def make_question(self, text, author=None, **options):
+        return PythonQuestion.objects.create(
+            question_text=text, option_a=options.get('a', 'list'), option_b=options.get('b', 'tuple'),
+            option_c='set', option_d='dict', correct_answer='A', created_by=author or self.instructor,
+        )
+
+    def signature_of(self, text, **options):
+        return near_duplicates.signature(
+            text, [options.get('a', 'list'), options.get('b', 'tuple'), 'set', 'dict']
+        )
+
+    def test_reworded_question_is_found_in_the_authors_bank(self):
+        original = self.make_question('Which built-in type is an ordered, mutable sequence of items?')
+        matches = near_duplicates.find_duplicates(
+            [self.signature_of('Which built-in type is an ordered mutable sequence of items')], self.instructor
+        )[0]
+        self.assertEqual([question_id for question_id, _ in matches], [original.id])
+        self.assertGreaterEqual(matches[0][1], near_duplicates.default_threshold())
+
+    def test_other_authors_and_different_questions_are_ignored(self):
+        other = User.objects.create(username='other', email='other@example.com', user_type='instructor')
+        self.make_question('Which built-in type is an ordered, mutable sequence of items?', author=other)
+        self.make_question('What does the yield keyword turn a function into?', a='generator', b='coroutine')
+        signature = self.signature_of('Which built-in type is an ordered, mutable sequence of items?')
+        self.assertEqual(near_duplicates.find_duplicates([signature], self.instructor), [[]])
+
+    def test_edited_question_is_reindexed(self):
+        question = self.make_question('Which built-in type is an ordered, mutable sequence of items?')
+        question.question_text = 'What does the yield keyword turn a function into?'
+        question.save()
+        signature = self.signature_of('Which built-in type is an ordered, mutable sequence of items?')
+        self.assertEqual(near_duplicates.find_duplicates([signature], self.instructor), [[]])
+
+    def test_scan_bank_keeps_the_oldest_question_of_a_group(self):
+        original = self.make_question('Which built-in type is an ordered, mutable sequence of items?')
+        copy = self.make_question('Which built-in type is an ordered, mutable sequence of items?')
+        found = [(duplicate.id, original_id) for duplicate, original_id, _ in near_duplicates.scan_bank()]
+        self.assertEqual(found, [(copy.id, original.id)])
+
+    @skipUnless(connection.vendor == 'sqlite', "Query plans are checked against SQLite")
+    def test_lookups_start_from_the_bucket_index(self):
+        question = self.questions[0]
+        keys = near_duplicates.band_keys(near_duplicates.question_signature(question))
+        plan = near_duplicates.bucket_candidates(keys).explain()
+        self.assertIn('USING INDEX', plan)
+        self.assertIn('(key=?)', plan)
+        plan = near_duplicates.stored_signatures([question.pk]).explain()
+        self.assertNotIn('question_author_created_idx', plan)
+        self.assertNotIn('SCAN', plan)
+
+
+class StudentDashboardTests(ExamTestCase):
+
+    def render(self):
+        return student_dashboard.render_student_dashboard(self.student)
+
+    def test_dashboard_is_cached_in_the_shared_alias(self):
+        self.render()
+        with self.assertNumQueries(0):
+            self.render()
+        token_key = student_dashboard._student_token_key(self.student.pk)
+        self.assertIsNotNone(caches['pages'].get(token_key))
+        self.assertIsNone(caches['default'].get(token_key))
+
+    def test_enrollment_shows_the_course_and_its_open_test(self):
+        self.assertNotIn('Quiz', self.render())
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=self.student, course=self.course)
+        self.assertIn('Quiz', self.render())
+
+    def test_completed_attempt_removes_the_test(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=self.student, course=self.course)
+        self.assertIn('Quiz', self.render())
+        attempt = TestAttempt.objects.create(student=self.student, test=self.test, total_questions=4)
+        with self.captureOnCommitCallbacks(execute=True):
+            grading.grade_submission(attempt, {})
+        self.assertNotIn('Quiz', self.render())
+
+    def test_test_changes_reach_every_student(self):
+        with self.captureOnCommitCallbacks(execute=True):
+            Enrollment.objects.create(student=self.student, course=self.course)
+        self.render()
+        self.test.title = 'Final exam'
+        with self.captureOnCommitCallbacks(execute=True):
+            self.test.save()
+        self.assertIn('Final exam', self.render())
+
+
+class CourseCatalogTests(ExamTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        Course.objects.bulk_create([
+            Course(
+                name=f'Course {number}', code=f'CS{number:03}', description='', instructor=cls.instructor,
+                start_date=date.today(), end_date=date.today() + timedelta(days=30),
+            )
+            for number in range(5)
+        ])
+        Course.objects.create(
+            name='Archived', code='OLD1', description='', instructor=cls.instructor, is_active=False,
+            start_date=date.today(), end_date=date.today(),
+        )
+
+    def test_pages_follow_the_course_code_cursor(self):
+        codes, cursor = [], None
+        while True:
+            rows, cursor = course_catalog.catalog_page(cursor, size=2)
+            codes.extend(row['code'] for row in rows)
+            if cursor is None:
+                break
+        self.assertEqual(codes, ['CS000', 'CS001', 'CS002', 'CS003', 'CS004', 'PY101'])
+
+    def test_pages_are_cached_in_the_shared_alias(self):
+        course_catalog.catalog_page()
+        with self.assertNumQueries(0):
+            course_catalog.catalog_page()
+        self.assertIsNotNone(caches['pages'].get(course_catalog.TOKEN_KEY))
+        self.assertIsNone(caches['default'].get(course_catalog.TOKEN_KEY))
+
+    def test_course_changes_replace_the_cached_pages(self):
+        course_catalog.catalog_page()
+        with self.captureOnCommitCallbacks(execute=True):
+            Course.objects.filter(code='CS000').get().delete()
+        self.assertNotIn('CS000', [row['code'] for row in course_catalog.catalog_page()[0]])
+
+    def test_enrolled_marks_are_per_student(self):
+        Enrollment.objects.create(student=self.student, course=self.course)
+        rows, _ = course_catalog.page_for_student(self.student)
+        self.assertEqual([row['code'] for row in rows if row['enrolled']], ['PY101'])
+        other = User.objects.create(username='other', email='other@example.com')
+        self.assertFalse(any(row['enrolled'] for row in course_catalog.page_for_student(other)[0]))
+
+
+class QuestionImportTests(ExamTestCase):
+
+    HEADER = ','.join(question_io.FIELDS) + '\n'
+
+    def csv_file(self, *rows, encoding='utf-8'):
+        return io.BytesIO((self.HEADER + ''.join(rows)).encode(encoding))
+
+    def import_file(self, binary_file, fmt='csv', chunk_size=question_io.CHUNK_SIZE):
+        return question_io.import_questions(binary_file, fmt, self.instructor, chunk_size)
+
+    def test_exports_import_back_in_every_format(self):
+        for fmt, exporter in question_io.EXPORTERS.items():
+            with self.subTest(fmt=fmt):
+                data = ''.join(exporter(PythonQuestion.objects.filter(pk__in=[q.pk for q in self.questions])))
+                report = self.import_file(io.BytesIO(data.encode()), fmt)
+                self.assertEqual((report.created, report.errors), (self.question_count, []))
+        texts = PythonQuestion.objects.values_list('question_text', 'correct_answer')
+        self.assertEqual(len(texts), self.question_count * (len(question_io.EXPORTERS) + 1))
+        self.assertEqual(set(texts), {(q.question_text, q.correct_answer) for q in self.questions})
+
+    def test_invalid_rows_are_reported_and_skipped(self):
+        report = self.import_file(self.csv_file(
+            'Good?,a,b,c,d,A,,easy,mcq,,\n',
+            'Bad answer?,a,b,c,d,E,,easy,mcq,,\n',
+        ))
+        self.assertEqual(report.created, 1)
+        self.assertEqual([number for number, _ in report.errors], [3])
+
+    def test_file_in_another_encoding_is_rejected_before_saving(self):
+        rows = ['Plain?,a,b,c,d,A,,easy,mcq,,\n'] * 5 + ['Caf\xe9?,a,b,c,d,A,,easy,mcq,,\n']
+        report = self.import_file(self.csv_file(*rows, encoding='latin-1'), chunk_size=2)
+        self.assertEqual(report.created, 0)
+        self.assertEqual(report.errors, [(7, ['the file is not UTF-8 encoded text'])])
+
+    def test_encoding_errors_of_unseekable_streams_end_the_read(self):
+        class Stream(io.BytesIO):
+            def seekable(self):
+                return False
+
+        for fmt, data in (('csv', self.HEADER + 'Caf\xe9?,a,b,c,d,A,,,,,\n'), ('jsonl', '{"question_text": "Caf\xe9"}\n')):
+            with self.subTest(fmt=fmt):
+                report = self.import_file(Stream(data.encode('latin-1')), fmt)
+                self.assertEqual(report.errors[-1][1], ['the file is not UTF-8 encoded text'])
+
+    def test_broken_csv_is_reported(self):
+        report = self.import_file(self.csv_file('Good?,a,b,c,d,A,,easy,mcq,,\n', 'x' * 200000 + '\n'))
+        self.assertEqual(report.created, 1)
+        self.assertEqual(report.error_count, 1)
+        self.assertTrue(report.errors[0][1][0].startswith('invalid CSV: field larger than field limit'))
+
+    def test_malformed_xml_is_reported(self):
+        report = self.import_file(io.BytesIO(b'<questestinterop><item>'), 'qti')
+        self.assertEqual(report.created, 0)
+        self.assertTrue(report.errors[0][1][0].startswith('invalid XML'))
+
+
+class RosterSyncTests(ExamTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.students = [
+            User.objects.create(username=f'student{number}', email=f'student{number}@example.com')
+            for number in range(3)
+        ]
+
+    def sync(self, text, fmt='csv', encoding='utf-8', **kwargs):
+        return rosters.sync_roster(self.course, io.BytesIO(text.encode(encoding)), fmt, **kwargs)
+
+    def active_usernames(self):
+        return set(Enrollment.objects.filter(course=self.course, is_active=True).values_list('student__username', flat=True))
+
+    def test_sync_enrolls_reactivates_and_deactivates(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        Enrollment.objects.create(student=self.students[1], course=self.course, is_active=False)
+        report = self.sync('username,email\n,student1@example.com\nstudent2,\n')
+        self.assertEqual((report.created, report.reactivated, report.deactivated), (1, 1, 1))
+        self.assertEqual(self.active_usernames(), {'student1', 'student2'})
+        again = self.sync('username,email\n,student1@example.com\nstudent2,\n')
+        self.assertEqual((again.created, again.reactivated, again.deactivated, again.unchanged), (0, 0, 0, 2))
+
+    def test_unknown_users_and_instructors_are_reported(self):
+        report = self.sync('{"username": "nobody"}\n{"email": "inst@example.com"}\n{"username": "student0"}\n', 'jsonl')
+        self.assertEqual(report.created, 1)
+        self.assertEqual([number for number, _ in report.errors], [1, 2])
+
+    def test_roster_in_another_encoding_changes_nothing(self):
+        Enrollment.objects.create(student=self.students[0], course=self.course)
+        report = self.sync('username\nstudent1\nJos\xe9\nstudent2\n', encoding='latin-1')
+        self.assertTrue(report.unreadable)
+        self.assertEqual(report.errors, [(3, 'the file is not UTF-8 encoded text')])
+        self.assertEqual((report.created, report.deactivated), (0, 0))
+        self.assertEqual(self.active_usernames(), {'student0'})
+
+    def test_upload_of_a_bad_encoding_roster_is_reported(self):
+        self.client.force_login(self.instructor)
+        response = self.client.post(reverse('sync_course_roster'), {
+            'course': self.course.pk,
+            'roster': SimpleUploadedFile('roster.csv', 'username\nJos\xe9\n'.encode('latin-1')),
+        })
+        self.assertEqual(response.status_code, 200)
+        self.assertTrue(response.context['report'].unreadable)
+        self.assertFalse(Enrollment.objects.exists())
+
+
+class LRUFileBasedCacheTests(TestCase):
+
+    def setUp(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        self.cache = LRUFileBasedCache(directory.name, {'OPTIONS': {'MAX_ENTRIES': 3, 'CULL_FREQUENCY': 3}})
+
+    def age(self, key, seconds_ago):
+        moment = os.stat(self.cache._key_to_file(key)).st_mtime - seconds_ago
+        os.utime(self.cache._key_to_file(key), (moment, moment))
+
+    def test_least_recently_used_entry_is_evicted(self):
+        for seconds_ago, key in zip((30, 20, 10), 'abc'):
+            self.cache.set(key, key.upper())
+            self.age(key, seconds_ago)
+        self.assertEqual(self.cache.get('a'), 'A')  # now the most recently used
+        self.cache.set('d', 'D')
+        self.assertEqual([key for key in 'abcd' if self.cache.has_key(key)], ['a', 'c', 'd'])
+
+    def test_misses_return_the_default(self):
+        self.assertEqual(self.cache.get('missing', 'default'), 'default')
+
+
+@override_settings(CACHES=LOCAL_CACHES)
+class GenerationCacheTests(TestCase):
+
+    def setUp(self):
+        caches['mcq'].clear()
+        generation_cache.reset_stats()
+
+    def test_lookups_key_on_normalized_text(self):
+        generation_cache.set('Lists  are\nmutable.', 1, 5, ['mcq'])
+        self.assertEqual(generation_cache.get('Lists are mutable.', 1, 5), ['mcq'])
+        self.assertIsNone(generation_cache.get('Lists are mutable.', 2, 5))
+
+    @mock.patch.object(generation_cache, 'FLUSH_LOOKUPS', 3)
+    def test_lookups_are_counted_in_batches(self):
+        with self.assertNumQueries(0):
+            generation_cache.get('a', 1, 5)
+            generation_cache.get('b', 1, 5)
+        generation_cache.set('a', 1, 5, ['mcq'])
+        generation_cache.get('a', 1, 5)
+        self.assertEqual(dict(MCQCacheCounter.objects.values_list('name', 'value')), {'hits': 1, 'misses': 2})
+
+    def test_stats_include_lookups_not_yet_written(self):
+        generation_cache.set('a', 1, 5, ['mcq'])
+        generation_cache.get('a', 1, 5)
+        generation_cache.get('b', 1, 5)
+        self.assertEqual(generation_cache.stats(), {'hits': 1, 'misses': 1, 'hit_rate': 0.5})
+        generation_cache.reset_stats()
+        self.assertEqual(generation_cache.stats()['hits'], 0)
+
+
+requires_nltk_data = skipUnless(
+    not nltk_resources.missing_resources(), "NLTK data is not installed (manage.py download_nltk_data)"
+)
+
+SOURCE_TEXT = (
+    "Python stores ordered collections in lists. A dictionary maps hashable keys to values. "
+    "The interpreter compiles source code into bytecode. A generator produces values lazily with yield. "
+    "Decorators wrap functions to extend their behaviour. Exceptions propagate up the call stack. "
+    "Modules group related functions and classes. Tuples are immutable sequences of objects. "
+)
+
+
+class MCQGeneratorTests(TestCase):
+
+    def test_pool_workers_are_never_forked(self):
+        self.assertIn(mcq_generator.POOL_START_METHOD, multiprocessing.get_all_start_methods())
+        self.assertNotEqual(mcq_generator.POOL_START_METHOD, 'fork')
+
+    @requires_nltk_data
+    def test_batch_tags_all_documents_in_one_pass(self):
+        generator = mcq_generator.get_generator()
+        documents = [SOURCE_TEXT, "", SOURCE_TEXT.upper()]
+        with mock.patch.object(generator.tagger, 'tag_sents', wraps=generator.tagger.tag_sents) as tag_sents:
+            batch = generator.generate_mcqs_batch(documents, 3, seed=5)
+        tag_sents.assert_called_once()
+        self.assertEqual(len(batch), 3)
+        self.assertEqual(batch[1], [])
+        self.assertEqual(batch[0], generator.generate_mcqs(SOURCE_TEXT, 3, seed=5))
+        for mcq in batch[0]:
+            self.assertEqual(len(mcq['options']), 4)
+            self.assertIn(mcq['correct_answer'], mcq['options'])
+            self.assertIn('______', mcq['question'])
+
+    @requires_nltk_data
+    def test_parallel_questions_do_not_depend_on_the_worker_count(self):
+        generator = mcq_generator.get_generator()
+        text = SOURCE_TEXT * 20
+        serial = generator.generate_mcqs_parallel(text, 30, workers=1, chunk_size=16, seed=3)
+        with mock.patch.object(
+            mcq_generator, 'ProcessPoolExecutor', wraps=mcq_generator.ProcessPoolExecutor
+        ) as pool:
+            parallel = generator.generate_mcqs_parallel(text, 30, workers=2, chunk_size=16, seed=3)
+        self.assertEqual(parallel, serial)
+        self.assertEqual(
+            pool.call_args.kwargs['mp_context'].get_start_method(), mcq_generator.POOL_START_METHOD
+        )
+
+
+class SharedGeneratorTests(TestCase):
+
+    def setUp(self):
+        patcher = mock.patch.object(mcq_generator, '_generator', None)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_concurrent_first_calls_build_one_generator(self):
+        built = []
+        barrier = threading.Barrier(4)
+
+        def build():
+            built.append(mock.Mock())
+            return built[-1]
+
+        def call():
+            barrier.wait()
+            results.append(mcq_generator.get_generator())
+
+        results = []
+        with mock.patch.object(mcq_generator, 'MCQGenerator', side_effect=build):
+            threads = [threading.Thread(target=call) for _ in range(4)]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+        self.assertEqual(len(built), 1)
+        self.assertEqual(results, built * 4)
+        built[0].warm_up.assert_called_once_with()
+
+    def test_missing_data_does_not_block_startup(self):
+        with mock.patch.object(mcq_generator, 'MCQGenerator', side_effect=LookupError("Missing NLTK data: punkt")):
+            with self.assertLogs('app.apps', 'WARNING') as logs:
+                apps.get_app_config('app').preload_generator()
+        self.assertIn('Missing NLTK data: punkt', logs.output[0])
+        self.assertIsNone(mcq_generator._generator)
+
+
+class NLTKResourceTests(TestCase):
+
+    def setUp(self):
+        path = mock.patch('nltk.data.path', ['/usr/share/nltk_data'])
+        path.start()
+        self.addCleanup(path.stop)
+        checked = mock.patch.object(nltk_resources, '_checked', False)
+        checked.start()
+        self.addCleanup(checked.stop)
+
+    def only_missing(self, *names):
+        missing_paths = {nltk_resources.RESOURCES[name][1] for name in names}
+
+        def find(data_path):
+            if data_path in missing_paths:
+                raise LookupError(data_path)
+            return data_path
+
+        return mock.patch('nltk.data.find', side_effect=find)
+
+    def test_data_dir_is_searched_first(self):
+        import nltk
+        nltk_resources.configure_data_path('/srv/nltk')
+        nltk_resources.configure_data_path('/srv/nltk')
+        self.assertEqual(nltk.data.path, ['/srv/nltk', '/usr/share/nltk_data'])
+
+    def test_packages_match_the_installed_nltk(self):
+        from nltk.tokenize import punkt
+        expected = 'punkt_tab' if hasattr(punkt, 'PunktTokenizer') else 'punkt'
+        self.assertEqual(nltk_resources.RESOURCES['punkt'][0], expected)
+
+    def test_missing_data_raises_without_downloading(self):
+        with self.only_missing('wordnet', 'tagger'), mock.patch('nltk.download') as download:
+            self.assertEqual(nltk_resources.missing_resources(), ['wordnet', 'tagger'])
+            with self.assertRaisesMessage(LookupError, 'Missing NLTK data: wordnet, tagger'):
+                nltk_resources.ensure_resources()
+        download.assert_not_called()
+
+    def test_successful_check_is_done_once(self):
+        with self.only_missing() as find:
+            nltk_resources.ensure_resources()
+            nltk_resources.ensure_resources()
+        self.assertEqual(find.call_count, len(nltk_resources.RESOURCES))
+
+    def test_command_downloads_only_missing_packages(self):
+        with self.only_missing('stopwords'), mock.patch('nltk.download', return_value=True) as download:
+            call_command('download_nltk_data', '--dir', '/srv/nltk', stdout=io.StringIO())
+        download.assert_called_once_with('stopwords', download_dir='/srv/nltk', quiet=True)
+
+    def test_command_check_reports_missing_packages(self):
+        with self.only_missing('punkt'), mock.patch('nltk.download') as download:
+            with self.assertRaisesMessage(CommandError, 'Missing NLTK data: punkt'):
+                call_command('download_nltk_data', '--dir', '/srv/nltk', '--check')
+        download.assert_not_called()
+
+
+@override_settings(MCQ_JOB_RUN_IN_PROCESS=False)
+class MCQJobTests(ExamTestCase):
+
+    mcqs = [
+        {
+            'question': 'A ______ maps keys to values.', 'options': ['dict', 'list', 'tuple', 'set'],
+            'correct_answer': 'dict', 'answer_tag': 'NN', 'explanation': '',
+        },
+    ]
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.subject = Subject.objects.create(name='Python')
+
+    def setUp(self):
+        super().setUp()
+        distractors.clear_pools()
+        self.addCleanup(distractors.clear_pools)
+
+    def queue(self, **fields):
+        return MCQGenerationJob.objects.create(
+            created_by=self.instructor, subject=self.subject, text='A dict maps keys to values.',
+            num_questions=1, **fields
+        )
+
+    def generator(self, **generate_mcqs):
+        generator = mock.Mock()
+        generator.generate_mcqs.configure_mock(**generate_mcqs)
+        return mock.patch.object(jobs, 'get_generator', return_value=generator)
+
+    def test_jobs_are_claimed_once_oldest_first(self):
+        first, second = self.queue(), self.queue()
+        self.assertEqual(jobs.claim_next(), first.pk)
+        self.assertFalse(jobs.claim(first.pk))
+        self.assertEqual(jobs.claim_next(), second.pk)
+        self.assertIsNone(jobs.claim_next())
+        first.refresh_from_db()
+        self.assertEqual(first.status, 'running')
+        self.assertIsNotNone(first.heartbeat_at)
+
+    def test_finished_job_stores_its_batch(self):
+        job = self.queue()
+        with self.generator(return_value=self.mcqs):
+            jobs.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.progress), ('done', 100))
+        self.assertEqual(list(job.batch.items.values_list('question_text', flat=True)), [self.mcqs[0]['question']])
+        self.assertTrue(DistractorTerm.objects.filter(subject=self.subject, term='dict', pos_tag='NN').exists())
+        self.assertEqual(generation_cache.get(job.text, self.subject.id, 1), self.mcqs)
+
+    def test_failed_job_records_the_error(self):
+        job = self.queue()
+        with self.generator(side_effect=RuntimeError('tagger broke')), self.assertLogs('app.jobs', 'ERROR'):
+            jobs.run_job(job.pk)
+        job.refresh_from_db()
+        self.assertEqual((job.status, job.error), ('failed', 'tagger broke'))
+        self.assertIsNone(job.batch)
+        self.assertIsNotNone(job.finished_at)
+
+    def test_jobs_without_a_recent_heartbeat_are_requeued(self):
+        now = timezone.now()
+        stale = self.queue(status='running', started_at=now, heartbeat_at=now - timedelta(minutes=20))
+        alive = self.queue(status='running', started_at=now, heartbeat_at=now)
+        self.assertEqual(jobs.requeue_stale(), 1)
+        stale.refresh_from_db()
+        alive.refresh_from_db()
+        self.assertEqual((stale.status, stale.heartbeat_at), ('pending', None))
+        self.assertEqual(alive.status, 'running')
+
+    def test_status_polling_wakes_the_queue_until_the_job_finishes(self):
+        job = self.queue()
+        self.client.force_login(self.instructor)
+        url = reverse('mcq_job_status', args=[job.pk])
+        with mock.patch.object(jobs, 'wake') as wake:
+            pending = self.client.get(url).json()
+            MCQGenerationJob.objects.filter(pk=job.pk).update(status='failed', error='tagger broke')
+            failed = self.client.get(url).json()
+        wake.assert_called_once()
+        self.assertEqual((pending['status'], pending['finished']), ('pending', False))
+        self.assertEqual((failed['status'], failed['finished'], failed['error']), ('failed', True, 'tagger broke'))
+
+    def test_status_of_another_instructors_job_is_hidden(self):
+        other = User.objects.create(username='other', email='other@example.com', user_type='instructor')
+        self.client.force_login(other)
+        self.assertEqual(self.client.get(reverse('mcq_job_status', args=[self.queue().pk])).status_code, 404)
+
+
+def offline_generator():
+    """An MCQGenerator that needs no NLTK data; tests stub the tagging they rely on."""
+    # Explicit mocks: patching with DEFAULT would inspect, and so load, the lazy stopwords corpus
+    with mock.patch.multiple(
+        mcq_generator, ensure_resources=mock.Mock(), stopwords=mock.Mock(**{'words.return_value': []}),
+        WordNetLemmatizer=mock.Mock(), PerceptronTagger=mock.Mock(),
+    ):
+        return mcq_generator.MCQGenerator()
+
+
+class DistractorPoolTests(TestCase):
+
+    def test_plural_tags_fall_back_to_their_coarse_tag(self):
+        pool = mcq_generator.DistractorPool([('list', 'NN'), ('tuple', 'NN'), ('sets', 'NNS')])
+        self.assertEqual(sorted(pool.sample('NNS', 3)), ['list', 'sets', 'tuple'])
+        self.assertEqual(pool.sample('JJ', 3), [])
+
+    def test_excluded_and_repeated_terms_are_skipped(self):
+        pool = mcq_generator.DistractorPool([('Dict', 'NN'), ('dict', 'NN'), ('list', 'NN'), ('list', 'NN')])
+        self.assertEqual(len(pool), 2)
+        self.assertEqual(pool.sample('NN', 3, exclude={'dict'}), ['list'])
+
+    def test_sentence_without_enough_distractors_is_skipped(self):
+        generator = offline_generator()
+        sentence = 'A dict maps keys.'
+        keywords = [('dict', 'NN'), ('keys', 'NNS')]
+        rng = random.Random(1)
+        self.assertIsNone(generator._build_mcq(sentence, keywords, rng, [mcq_generator.DistractorPool(keywords)]))
+
+        corpus = mcq_generator.DistractorPool([('list', 'NN'), ('tuple', 'NN'), ('set', 'NN'), ('string', 'NN')])
+        mcq = generator._build_mcq(sentence, keywords, rng, [mcq_generator.DistractorPool(keywords), corpus])
+        self.assertEqual(len(set(mcq['options'])), 4)
+        self.assertIn(mcq['correct_answer'], mcq['options'])
+
+
+class DistractorIndexTests(ExamTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.python, cls.java = Subject.objects.bulk_create([Subject(name='Python'), Subject(name='Java')])
+        PythonQuestion.objects.filter(pk=cls.questions[0].pk).update(subject=cls.python)
+        PythonQuestion.objects.filter(pk=cls.questions[1].pk).update(subject=cls.java)
+
+    def setUp(self):
+        super().setUp()
+        distractors.clear_pools()
+        self.addCleanup(distractors.clear_pools)
+        generator = mock.Mock()
+        generator.extract_keywords_batch.side_effect = lambda options: [[(option, 'NN')] for option in options]
+        patcher = mock.patch.object(distractors, 'get_generator', return_value=generator)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def terms(self, subject):
+        return set(DistractorTerm.objects.filter(subject=subject).values_list('term', flat=True))
+
+    def test_rebuild_indexes_question_options_by_subject(self):
+        self.assertEqual(distractors.rebuild_index(self.python.id), 1)
+        self.assertEqual(self.terms(self.python), {'a0', 'b0', 'c0', 'd0'})
+        self.assertEqual(self.terms(self.java), set())
+
+        self.assertEqual(distractors.rebuild_index(), self.question_count)
+        self.assertEqual(distractors.rebuild_index(), self.question_count)
+        self.assertEqual(self.terms(self.java), {'a1', 'b1', 'c1', 'd1'})
+        self.assertEqual(len(self.terms(None)), 8)
+
+    def test_pool_holds_subject_and_general_terms_and_is_reused(self):
+        distractors.rebuild_index()
+        with self.assertNumQueries(1):
+            pool = distractors.get_pool(self.python.id)
+            self.assertIs(distractors.get_pool(self.python.id), pool)
+        self.assertEqual(len(pool), 12)
+        self.assertNotIn('a1', pool.sample('NN', 12))
+
+        distractors.record_terms(self.python.id, [('generator', 'NN')])
+        distractors.clear_pools()
+        self.assertEqual(len(distractors.get_pool(self.python.id)), 13)
+
+
+class DocumentStreamingTests(TestCase):
+
+    def test_text_paragraphs_span_read_chunks(self):
+        source = io.BytesIO('First paragraph\nwith two lines.\n\n\n  Second – café.\n \nThird'.encode())
+        self.assertEqual(
+            list(documents._iter_text_paragraphs(source, chunk_size=7)),
+            ['First paragraph\nwith two lines.', 'Second – café.', 'Third'],
+        )
+
+    def test_long_paragraphs_are_cut_at_whitespace(self):
+        source = io.BytesIO(b'word ' * 30)
+        with mock.patch.object(documents, 'MAX_PARAGRAPH_CHARS', 22):
+            paragraphs = list(documents.iter_paragraphs(source, 'notes.TXT'))
+        self.assertTrue(all(len(paragraph) <= 22 for paragraph in paragraphs))
+        self.assertEqual(' '.join(paragraphs).split(), ['word'] * 30)
+
+    def test_docx_paragraphs(self):
+        body = ''.join(f'<w:p><w:r><w:t>{text}</w:t></w:r><w:r><w:t>!</w:t></w:r></w:p>' for text in ('One', 'Two'))
+        archive = io.BytesIO()
+        with zipfile.ZipFile(archive, 'w') as docx:
+            docx.writestr('word/document.xml', (
+                '<w:document xmlns:w="http://schemas.openxmlformats.org/wordprocessingml/2006/main">'
+                f'<w:body>{body}<w:p/></w:body></w:document>'
+            ))
+        self.assertEqual(list(documents.iter_paragraphs(archive, 'pack.docx')), ['One!', 'Two!'])
+
+    def test_unreadable_documents_are_rejected(self):
+        with self.assertRaisesMessage(documents.DocumentError, "Unsupported file type '.odt'"):
+            documents.iter_paragraphs(io.BytesIO(), 'pack.odt')
+        with self.assertRaisesMessage(documents.DocumentError, 'Not a valid .docx file'):
+            list(documents.iter_paragraphs(io.BytesIO(b'plain text'), 'pack.docx'))
+
+    def test_upload_form_checks_type_and_size(self):
+        subject = Subject.objects.create(name='Python')
+        data = {'subject': subject.pk, 'difficulty': 'easy', 'num_questions': 5}
+        for name, size_limit, valid in (('pack.txt', 100, True), ('pack.odt', 100, False), ('pack.txt', 4, False)):
+            with self.subTest(name=name, size_limit=size_limit), self.settings(MCQ_UPLOAD_MAX_BYTES=size_limit):
+                form = TextToMCQForm(data, {'document': SimpleUploadedFile(name, b'Some text')})
+                self.assertEqual(form.is_valid(), valid)
+
+    def test_stream_stops_reading_once_enough_questions_exist(self):
+        generator = offline_generator()
+        generator.extract_keywords_batch = lambda sentences: [
+            [(word, 'NN') for word in sentence.split()] for sentence in sentences
+        ]
+        read = []
+
+        def paragraphs():
+            for number in itertools.count():
+                read.append(number)
+                yield f'alpha{number} beta{number} gamma{number} delta{number}'
+
+        with mock.patch.object(mcq_generator, 'sent_tokenize', lambda paragraph: [paragraph]):
+            mcqs = list(generator.generate_mcqs_stream(paragraphs(), 3, seed=1, batch_size=2))
+        self.assertEqual(len(mcqs), 3)
+        self.assertLessEqual(len(read), 4)
+
+
+class GeneratedBatchTestCase(ExamTestCase):
+    """Generated questions waiting for the instructor's review."""
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.subject = Subject.objects.create(name='Python')
+
+    def generated_mcqs(self, count):
+        # Unrelated words per question, so none of them are near-duplicates
+        return [
+            {
+                'question': ' '.join(f'term{number}x{word}' for word in range(8)) + ' ______?',
+                'options': [f'option{number}{letter}' for letter in 'abcd'],
+                'correct_answer': f'option{number}c', 'answer_tag': 'NN', 'explanation': f'Because {number}.',
+            }
+            for number in range(count)
+        ]
+
+    def finished_job(self, count=3):
+        job = MCQGenerationJob(
+            created_by=self.instructor, subject=self.subject, text='...', num_questions=count,
+            status='done', progress=100, finished_at=timezone.now(),
+        )
+        job.batch = jobs.store_batch(job, self.generated_mcqs(count))
+        job.save()
+        return job
+
+
+class GeneratedBatchTests(GeneratedBatchTestCase):
+
+    def test_batch_items_keep_their_order(self):
+        with self.settings(MCQ_BATCH_TTL=60):
+            batch = self.finished_job(3).batch
+        self.assertAlmostEqual(batch.expires_at, timezone.now() + timedelta(seconds=60), delta=timedelta(seconds=5))
+        self.assertEqual(
+            [item.correct_answer for item in batch.items.all()], ['option0c', 'option1c', 'option2c']
+        )
+
+    def test_session_only_references_the_batch(self):
+        job = self.finished_job(50)
+        self.client.force_login(self.instructor)
+        response = self.client.get(reverse('review_mcqs', args=[job.pk]))
+        self.assertEqual(len(response.context['mcqs']), 50)
+        self.assertEqual(self.client.session['generated_batch_id'], str(job.batch.id))
+        # The stored session stays small whatever the size of the batch
+        self.assertLess(len(Session.objects.get(pk=self.client.session.session_key).session_data), 500)
+
+    def test_cleanup_removes_expired_batches_and_old_jobs(self):
+        old, fresh = self.finished_job(), self.finished_job()
+        GeneratedBatch.objects.filter(pk=old.batch_id).update(expires_at=timezone.now())
+        MCQGenerationJob.objects.filter(pk=old.pk).update(finished_at=timezone.now() - timedelta(days=2))
+        out = io.StringIO()
+        call_command('cleanup_generated_batches', stdout=out)
+        self.assertIn('Deleted 1 expired batch(es) and 1 old job(s)', out.getvalue())
+        self.assertEqual(list(MCQGenerationJob.objects.values_list('pk', flat=True)), [fresh.pk])
+        self.assertEqual(GeneratedItem.objects.filter(batch=fresh.batch_id).count(), 3)
+        self.assertEqual(GeneratedItem.objects.count(), 3)
+
+    def test_saving_an_expired_batch_asks_to_generate_again(self):
+        job = self.finished_job()
+        self.client.force_login(self.instructor)
+        self.client.get(reverse('review_mcqs', args=[job.pk]))
+        GeneratedBatch.objects.filter(pk=job.batch_id).update(expires_at=timezone.now())
+        response = self.client.post(reverse('save_generated_mcqs'), {'accept_all': '1'})
+        self.assertRedirects(response, reverse('auto_generate_mcqs'), fetch_redirect_response=False)
+        self.assertNotIn('generated_batch_id', self.client.session)
+        self.assertEqual(PythonQuestion.objects.count(), self.question_count)
+
+
+class AcceptGeneratedItemsTests(GeneratedBatchTestCase):
+
+    def test_review_selection(self):
+        self.assertEqual(question_bank.parse_ranges('3-1, 5 ,, 7-99', 8), {0, 1, 2, 4, 6, 7})
+        self.assertEqual(question_bank.selected_positions({'ranges': '2', 'save_4': 'on'}, 5), {1, 4})
+        self.assertEqual(question_bank.selected_positions({'accept_all': '1', 'ranges': '1'}, 3), {0, 1, 2})
+        with self.assertRaisesMessage(ValueError, "'2-x' is not a question number or range"):
+            question_bank.parse_ranges('1, 2-x', 5)
+
+    def test_queries_do_not_grow_with_the_selection(self):
+        counts = []
+        for size in (2, 20):
+            batch = self.finished_job(size).batch
+            with CaptureQueriesContext(connection) as queries:
+                saved, errors = question_bank.accept_generated_items(batch, range(size), self.instructor)
+            self.assertEqual((len(saved), errors), (size, {}))
+            PythonQuestion.objects.filter(pk__in=[question.pk for question in saved]).delete()
+            counts.append(len(queries))
+        self.assertEqual(counts[0], counts[1])
+
+    def test_invalid_items_are_reported_and_the_rest_saved(self):
+        batch = self.finished_job(5).batch
+        items = {item.position: item for item in batch.items.all()}
+        items[0].options = ['x' * 201, 'b', 'c', 'option0c']
+        items[1].correct_answer = 'missing'
+        items[2].question_text = self.questions[0].question_text
+        items[2].options = [self.questions[0].option_a, self.questions[0].option_b,
+                            self.questions[0].option_c, self.questions[0].option_d]
+        items[2].correct_answer = self.questions[0].option_a
+        items[4].question_text, items[4].options = items[3].question_text, items[3].options
+        items[4].correct_answer = items[3].correct_answer
+        GeneratedItem.objects.bulk_update(items.values(), ['options', 'correct_answer', 'question_text'])
+
+        saved, errors = question_bank.accept_generated_items(batch, range(5), self.instructor)
+        self.assertEqual([question.option_c for question in saved], ['option3c'])
+        self.assertEqual(saved[0].correct_answer, 'C')
+        self.assertEqual(sorted(errors), [0, 1, 2, 4])
+        self.assertIn('option a: Ensure this value has at most 200 characters (it has 201).', errors[0])
+        self.assertEqual(errors[1], ['correct answer: The correct answer is not one of the options.'])
+        self.assertEqual(errors[2], ['near-duplicate of a question already in your question bank'])
+        self.assertEqual(errors[4], ['near-duplicate of another selected question'])
+
+    def test_save_view_accepts_ranges(self):
+        job = self.finished_job(6)
+        self.client.force_login(self.instructor)
+        self.client.get(reverse('review_mcqs', args=[job.pk]))
+        response = self.client.post(reverse('save_generated_mcqs'), {'ranges': '2-3', 'save_5': 'on'})
+        self.assertRedirects(response, reverse('view_questions'), fetch_redirect_response=False)
+        self.assertEqual(
+            sorted(PythonQuestion.objects.filter(subject=self.subject).values_list('option_a', flat=True)),
+            ['option1a', 'option2a', 'option5a'],
+        )
+
+        response = self.client.post(reverse('save_generated_mcqs'), {'ranges': '1-'})
+        self.assertRedirects(response, reverse('review_mcqs', args=[job.pk]), fetch_redirect_response=False)
+
+
+class GradingTests(ExamTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.attempt = TestAttempt.objects.create(student=self.student, test=self.test, total_questions=4)
+
+    def displayed(self, question, letter):
+        return shuffling.to_display(self.attempt.id, question.id, letter)
+
+    def sheet(self, wrong=()):
+        """Answers as the student saw them: correct except for the questions in ``wrong``."""
+        return {
+            str(question.id): self.displayed(question, 'A' if question.correct_answer != 'A' else 'B')
+            if question in wrong else self.displayed(question, question.correct_answer)
+            for question in self.questions
+        }
+
+    def test_submission_is_scored_against_the_key(self):
+        attempt = grading.grade_submission(self.attempt, self.sheet(wrong=[self.questions[2]]))
+        self.assertEqual((attempt.total_questions, attempt.correct_answers, attempt.score), (4, 3, 75))
+        self.assertIsNotNone(attempt.completed_at)
+        self.assertEqual(
+            dict(attempt.results.values_list('question_id', 'is_correct')),
+            {question.id: question != self.questions[2] for question in self.questions},
+        )
+
+    def test_autosaved_answers_are_regraded_against_the_current_key(self):
+        question = self.questions[0]
+        grading.autosave(self.attempt, {str(question.id): self.displayed(question, question.correct_answer)})
+        question.correct_answer = 'D' if question.correct_answer != 'D' else 'C'
+        question.save()
+        attempt = grading.grade_submission(self.attempt, {})
+        self.assertEqual((attempt.correct_answers, attempt.score), (0, 0))
+        self.assertFalse(attempt.results.get().is_correct)
+
+    def test_double_submit_is_graded_once(self):
+        self.client.force_login(self.student)
+        url = reverse('take_test', args=[self.test.id])
+        self.client.post(url, {f'question_{question_id}': letter for question_id, letter in self.sheet().items()})
+        response = self.client.post(url, {f'question_{self.questions[0].id}': 'X'})
+        self.assertRedirects(response, reverse('test_result', args=[self.attempt.id]), fetch_redirect_response=False)
+
+        self.attempt.refresh_from_db()
+        self.assertEqual(self.attempt.score, 100)
+        self.assertEqual(self.attempt.results.count(), self.question_count)
+        self.assertEqual(grading.grade_submission(self.attempt, {}).score, 100)
+        self.assertEqual(TestStats.objects.get(test=self.test).attempts_count, 1)
+        self.assertEqual(StudentCourseStats.objects.get(student=self.student).attempts_count, 1)
+
+    def test_autosave_after_submit_is_refused(self):
+        grading.grade_submission(self.attempt, {})
+        self.assertIsNone(grading.autosave(self.attempt, self.sheet()))
+        self.assertFalse(self.attempt.results.exists())
+
+
+class ExamPaperTests(ExamTestCase):
+
+    def added_order(self):
+        # add(*questions) inserts its link rows in no particular order; the link ids record it
+        links = Test.questions.through.objects.filter(test=self.test).order_by('id')
+        return [str(question_id) for question_id in links.values_list('pythonquestion_id', flat=True)]
+
+    def test_paper_is_in_insertion_order_and_cached(self):
+        PythonQuestion.objects.filter(pk=self.questions[1].pk).update(option_b='<b>bold</b>')
+        latest = PythonQuestion.objects.create(
+            question_text='Latest?', option_a='a', option_b='b', option_c='c', option_d='d',
+            correct_answer='A', created_by=self.instructor,
+        )
+        self.test.questions.add(latest)
+        paper = exam_paper.get_paper(self.test)
+        self.assertEqual([entry['id'] for entry in paper], self.added_order())
+        self.assertEqual(paper[-1]['id'], str(latest.id))
+        entry = next(entry for entry in paper if entry['id'] == str(self.questions[1].id))
+        self.assertEqual(entry['options']['B'], '&lt;b&gt;bold&lt;/b&gt;')
+        self.assertIn('Question 1?', entry['stem'])
+        test = Test.objects.get(pk=self.test.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(exam_paper.get_paper(test), paper)
+
+    def test_attempt_sees_its_own_order(self):
+        attempt = TestAttempt.objects.create(student=self.student, test=self.test, total_questions=4)
+        fragments = exam_paper.render_for_attempt(exam_paper.get_paper(self.test), attempt.id)
+        questions = {str(question.id): question for question in self.questions}
+        paper_order = self.added_order()
+        for fragment, index in zip(fragments, shuffling.question_order(attempt.id, self.question_count)):
+            question = questions[paper_order[index]]
+            self.assertTrue(fragment.startswith(f'<p>{question.question_text}</p>'))
+            displayed = [
+                f'{letter}) {getattr(question, f"option_{canonical.lower()}")}'
+                for letter, canonical in zip('ABCD', shuffling.option_order(attempt.id, question.id))
+            ]
+            positions = [fragment.index(label) for label in displayed]
+            self.assertEqual(positions, sorted(positions))
+            self.assertEqual(fragment.count(f'name="question_{question.id}"'), 4)
+
+    def test_take_test_shows_the_shuffled_paper(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('take_test', args=[self.test.id]))
+        attempt = response.context['attempt']
+        for fragment in exam_paper.render_for_attempt(exam_paper.get_paper(self.test), attempt.id):
+            self.assertContains(response, fragment, html=True)
+
+
+class ShufflingTests(ExamTestCase):
+
+    def test_orders_are_stable_permutations(self):
+        attempt_ids = [uuid.uuid4() for _ in range(20)]
+        question_id = self.questions[0].id
+        for attempt_id in attempt_ids:
+            self.assertEqual(sorted(shuffling.question_order(attempt_id, 10)), list(range(10)))
+            self.assertEqual(shuffling.question_order(attempt_id, 10), shuffling.question_order(attempt_id, 10))
+            self.assertEqual(sorted(shuffling.option_order(attempt_id, question_id)), list('ABCD'))
+        self.assertGreater(len({shuffling.option_order(attempt_id, question_id) for attempt_id in attempt_ids}), 1)
+
+    def test_display_and_canonical_letters_are_inverse(self):
+        attempt_id, question_id = uuid.uuid4(), self.questions[0].id
+        for letter in 'ABCD':
+            displayed = shuffling.to_display(attempt_id, question_id, letter)
+            self.assertEqual(shuffling.to_canonical(attempt_id, question_id, displayed), letter)
+        for bad in ('', 'E', 'a', 'AB'):
+            self.assertIsNone(shuffling.to_canonical(attempt_id, question_id, bad))
+
+    def test_result_page_uses_the_letters_the_student_saw(self):
+        attempt = TestAttempt.objects.create(student=self.student, test=self.test, total_questions=4)
+        question = self.questions[0]
+        wrong = 'B' if question.correct_answer != 'B' else 'C'
+        grading.grade_submission(attempt, {str(question.id): shuffling.to_display(attempt.id, question.id, wrong)})
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('test_result', args=[attempt.id]))
+        result = response.context['results'][0]
+        self.assertEqual(result.selected_display, (
+            shuffling.to_display(attempt.id, question.id, wrong), getattr(question, f'option_{wrong.lower()}')
+        ))
+        correct = question.correct_answer
+        self.assertContains(response, (
+            f'{shuffling.to_display(attempt.id, question.id, correct)} '
+            f'({getattr(question, f"option_{correct.lower()}")})'
+        ))
+
+
+class AttemptsTestCase(ExamTestCase):
+    """Helpers to complete attempts with a given number of right answers."""
+
+    def complete(self, student, correct, test=None, days_ago=0):
+        test = test or self.test
+        attempt = TestAttempt.objects.create(student=student, test=test, total_questions=self.question_count)
+        answers = {
+            str(question.id): shuffling.to_display(
+                attempt.id, question.id, question.correct_answer if number < correct else
+                'A' if question.correct_answer != 'A' else 'B'
+            )
+            for number, question in enumerate(self.questions)
+        }
+        attempt = grading.grade_submission(attempt, answers)
+        if days_ago:
+            TestAttempt.objects.filter(pk=attempt.pk).update(completed_at=timezone.now() - timedelta(days=days_ago))
+        return attempt
+
+
+class PerformanceReportTests(AttemptsTestCase):
+
+    @classmethod
+    def setUpTestData(cls):
+        super().setUpTestData()
+        cls.other_student = User.objects.create(username='zoe', email='zoe@example.com')
+        cls.other_course = Course.objects.create(
+            name='Java', code='JV101', description='', instructor=cls.instructor,
+            start_date=date.today(), end_date=date.today() + timedelta(days=30)
+        )
+        cls.other_test = Test.objects.create(
+            title='Java quiz', course=cls.other_course, is_published=True, created_by=cls.instructor,
+            available_from=timezone.now() - timedelta(days=1), available_to=timezone.now() + timedelta(days=1)
+        )
+        cls.other_test.questions.add(*cls.questions)
+        Enrollment.objects.create(student=cls.student, course=cls.course)
+
+    def setUp(self):
+        super().setUp()
+        self.complete(self.student, 4)
+        self.complete(self.student, 2, test=self.other_test, days_ago=10)
+        self.complete(self.other_student, 1, test=self.other_test)
+
+    def report(self, **filters):
+        return {
+            student.username: (student.tests_taken, student.avg_score)
+            for student in reports.student_performance(**filters)
+        }
+
+    def test_totals_per_student(self):
+        with self.assertNumQueries(1):
+            self.assertEqual(self.report(), {'stud': (2, 75), 'zoe': (1, 25)})
+        # The summary tables and the attempts agree
+        self.assertEqual(self.report(date_from=date.today() - timedelta(days=30)), self.report())
+
+    def test_course_filter_lists_enrolled_students_only(self):
+        self.assertEqual(self.report(course=self.course), {'stud': (1, 100)})
+        self.assertEqual(self.report(course=self.other_course), {})
+
+    def test_date_range(self):
+        self.assertEqual(self.report(date_from=date.today()), {'stud': (1, 100), 'zoe': (1, 25)})
+        self.assertEqual(
+            self.report(date_to=date.today() - timedelta(days=5)), {'stud': (1, 50), 'zoe': (0, None)}
+        )
+
+    def test_csv_export(self):
+        self.client.force_login(self.instructor)
+        response = self.client.get(reverse('view_student_performance'), {'format': 'csv'})
+        self.assertEqual(response['Content-Disposition'], 'attachment; filename="student_performance.csv"')
+        self.assertEqual(b''.join(response.streaming_content).decode().splitlines(), [
+            ','.join(reports.PERFORMANCE_CSV_HEADER),
+            'stud,,,stud@example.com,2,75.0',
+            'zoe,,,zoe@example.com,1,25.0',
+        ])
+
+    def test_invalid_date_range_is_ignored(self):
+        self.client.force_login(self.instructor)
+        response = self.client.get(reverse('view_student_performance'), {
+            'date_from': date.today(), 'date_to': date.today() - timedelta(days=1),
+        })
+        self.assertFalse(response.context['form'].is_valid())
+        self.assertEqual(len(response.context['performance_data']), 2)
+
+
+class AttemptStatsTests(AttemptsTestCase):
+
+    def setUp(self):
+        super().setUp()
+        self.other_student = User.objects.create(username='zoe', email='zoe@example.com')
+        self.second_test = Test.objects.create(
+            title='Second quiz', course=self.course, is_published=True, created_by=self.instructor,
+            available_from=self.test.available_from, available_to=self.test.available_to,
+        )
+        self.second_test.questions.add(*self.questions)
+        self.complete(self.student, 4)
+        self.complete(self.student, 1, test=self.second_test)
+        self.complete(self.other_student, 3)
+
+    def snapshot(self):
+        return (
+            sorted(StudentCourseStats.objects.values_list(
+                'student_id', 'course_id', 'attempts_count', 'passed_count', 'score_sum'
+            )),
+            sorted(TestStats.objects.values_list('test_id', 'attempts_count', 'passed_count', 'score_sum', 'histogram')),
+        )
+
+    def test_graded_attempts_are_counted(self):
+        test_stats = TestStats.objects.get(test=self.test)
+        self.assertEqual((test_stats.attempts_count, test_stats.passed_count, test_stats.score_sum), (2, 2, 175))
+        self.assertEqual(test_stats.histogram, [0, 0, 0, 0, 0, 0, 0, 1, 0, 1])
+        self.assertEqual(TestStats.objects.get(test=self.second_test).histogram, [0, 0, 1, 0, 0, 0, 0, 0, 0, 0])
+        self.assertEqual(stats.student_summary(self.student), {
+            'completed_tests': 2, 'passed_count': 1, 'failed_count': 1, 'average_score': 62.5,
+        })
+
+    def test_rebuild_matches_the_running_totals(self):
+        recorded = self.snapshot()
+        out = io.StringIO()
+        call_command('rebuild_stats', stdout=out)
+        self.assertIn('Rebuilt 2 student/course row(s) and 2 test row(s)', out.getvalue())
+        self.assertEqual(self.snapshot(), recorded)
+
+    def test_rebuild_follows_deleted_attempts_and_passing_scores(self):
+        TestAttempt.objects.filter(student=self.other_student).delete()
+        Test.objects.filter(pk=self.second_test.pk).update(passing_score=20)
+        stats.rebuild()
+        self.assertEqual(TestStats.objects.get(test=self.test).attempts_count, 1)
+        self.assertEqual(stats.student_summary(self.student)['passed_count'], 2)
+        self.assertEqual(stats.student_summary(self.other_student)['completed_tests'], 0)
+
+    def test_performance_history_reads_the_summary(self):
+        self.client.force_login(self.student)
+        response = self.client.get(reverse('performance_history'))
+        self.assertEqual((response.context['passed_count'], response.context['failed_count']), (1, 1))
+
+
+class ItemAnalysisTests(ExamTestCase):
+
+    # Canonical answers of each completed attempt to questions 0-3 (keyed A, B, C, D)
+    sheets = [
+        'ABCD',
+        'ABCA',
+        'ABA ',
+        'BCAA',
+        'A   ',
+        '    ',
+    ]
+
+    def setUp(self):
+        super().setUp()
+        now = timezone.now()
+        for number, sheet in enumerate(self.sheets + ['ABCD']):
+            student = User.objects.create(username=f'student{number}', email=f'student{number}@example.com')
+            attempt = TestAttempt.objects.create(
+                student=student, test=self.test, total_questions=self.question_count,
+                # The last attempt is still in progress and must be left out
+                completed_at=now if number < len(self.sheets) else None,
+            )
+            TestResult.objects.bulk_create([
+                TestResult(attempt=attempt, question=question, selected_option=letter,
+                           is_correct=letter == question.correct_answer)
+                for question, letter in zip(self.questions, sheet) if letter != ' '
+            ])
+
+    def reference(self, index):
+        """p-value and rest-score correlation of question ``index``, computed naively."""
+        right = [[int(sheet[column] == 'ABCD'[column]) for column in range(4)] for sheet in self.sheets]
+        item = [row[index] for row in right]
+        rest = [sum(row) - row[index] for row in right]
+        try:
+            discrimination = statistics.correlation(item, rest)
+        except statistics.StatisticsError:
+            discrimination = None
+        return sum(item) / len(item), discrimination
+
+    def test_statistics_per_question(self):
+        analysis = item_analysis.analyze_test(self.test)
+        self.assertEqual((analysis.attempt_count, analysis.question_count), (6, 4))
+        items = {item['question'].pk: item for item in analysis.items()}
+        for index, question in enumerate(self.questions):
+            with self.subTest(question=index):
+                item = items[question.pk]
+                p_value, discrimination = self.reference(index)
+                self.assertAlmostEqual(item['p_value'], p_value)
+                if discrimination is None:
+                    self.assertIsNone(item['discrimination'])
+                else:
+                    self.assertAlmostEqual(item['discrimination'], discrimination)
+                answered = [sheet[index] for sheet in self.sheets]
+                self.assertAlmostEqual(item['omitted'], answered.count(' ') / 6)
+                self.assertEqual(
+                    [(option['letter'], option['frequency']) for option in item['options']],
+                    [(letter, answered.count(letter) / 6) for letter in 'ABCD'],
+                )
+                self.assertEqual([option['is_correct'] for option in item['options']].index(True), index)
+
+    def test_kr20(self):
+        analysis = item_analysis.analyze_test(self.test)
+        totals = [sum(sheet[column] == 'ABCD'[column] for column in range(4)) for sheet in self.sheets]
+        p_values = [self.reference(index)[0] for index in range(4)]
+        expected = 4 / 3 * (1 - sum(p * (1 - p) for p in p_values) / statistics.pvariance(totals))
+        self.assertAlmostEqual(analysis.kr20, expected)
+
+    def test_test_without_attempts(self):
+        TestAttempt.objects.all().delete()
+        analysis = item_analysis.analyze_test(self.test)
+        self.assertEqual(analysis.attempt_count, 0)
+        self.assertIsNone(analysis.kr20)
+        self.assertTrue(all(item['p_value'] is None for item in analysis.items()))
+
+    def test_page_is_limited_to_the_instructors_tests(self):
+        self.client.force_login(self.instructor)
+        response = self.client.get(reverse('test_item_analysis'), {'test_id': self.test.id})
+        self.assertEqual(len(response.context['items']), self.question_count)
+        other = User.objects.create(username='other', email='other@example.com', user_type='instructor')
+        self.client.force_login(other)
+        self.assertEqual(
+            self.client.get(reverse('test_item_analysis'), {'test_id': self.test.id}).status_code, 404
+        )
@@ -1,331 +1,456 @@
-from django.shortcuts import render, redirect, get_object_or_404
-from django.contrib.auth import authenticate, login, logout
-from django.utils import timezone
-from django.contrib.auth.decorators import login_required, user_passes_test
-from .models import User, Course, Enrollment, PythonQuestion, TestAttempt, TestResult, Subject, Topic,Test
-from .mcq_generator import MCQGenerator
-from django.contrib import messages
-from django.db.models import Count, Avg, Q
-import random
-from .forms import (
-    UserRegistrationForm, 
-    PythonQuestionForm, 
-    CourseCreationForm,
-    TestCreationForm,
-    TextToMCQForm
-)
-
-# ----------------------- AUTHENTICATION VIEWS -----------------------
-from .forms import UserRegistrationForm
-
-def register(request):
-    if request.method == 'POST':
-        form = UserRegistrationForm(request.POST)
-        if form.is_valid():
-            user = form.save()
-            login(request, user)
-            messages.success(request, "Registration successful! You are now logged in.")
-            return redirect('dashboard')
-        else:
-            for field, errors in form.errors.items():
-                for error in errors:
-                    messages.error(request, f"{field}: {error}")
-    else:
-        form = UserRegistrationForm()
-    
-    return render(request, 'auth/register.html', {'form': form})
-
-def user_login(request):
-    if request.method == 'POST':
-        username = request.POST.get('username')
-        password = request.POST.get('password')
-        user = authenticate(request, username=username, password=password)
-
-        if user is not None:
-            login(request, user)
-            messages.success(request, "Logged in successfully!")
-            return redirect('dashboard')
-        else:
-            messages.error(request, "Invalid username or password.")
-    
-    return render(request, 'auth/login.html')
-
-
-def user_logout(request):
-    logout(request)
-    messages.success(request, "Logged out successfully!")
-    return redirect('login')
-
-# ----------------------- DASHBOARD VIEWS -----------------------
-
-@login_required
-def dashboard(request):
-    if request.user.user_type == 'instructor':
-          return render(request, 'teacher/dashboard.html')  # Or your instructor dashboard view
-
-    # Get enrolled courses
-    enrolled_courses = Enrollment.objects.filter(student=request.user, is_active=True).values_list('course', flat=True)
-
-    # Get current time
-    now = timezone.now()
-
-    # Get tests for enrolled courses
-    active_tests = Test.objects.filter(
-        course__in=enrolled_courses,
-        is_published=True,
-        available_from__lte=now,
-        available_to__gte=now
-    ).exclude(
-        attempts__student=request.user,
-        attempts__completed_at__isnull=False
-    ).distinct()
-
-    # Completed test attempts
-    completed_attempts = TestAttempt.objects.filter(student=request.user, completed_at__isnull=False)
-
-    # Average score
-    avg_score = completed_attempts.aggregate(avg=Avg('score'))['avg'] or 0
-
-    return render(request, 'student/dashboard.html', {
-        'enrolled_courses': Enrollment.objects.filter(student=request.user),
-        'completed_tests': completed_attempts.count(),
-        'average_score': round(avg_score, 2),
-        'active_tests': active_tests,
-    })
-
-# ----------------------- COURSE MANAGEMENT -----------------------
-
-@login_required
-@user_passes_test(lambda u: u.user_type == 'instructor')
-def create_course(request):
-    if request.method == 'POST':
-        form = CourseCreationForm(request.POST)
-        if form.is_valid():
-            course = form.save(commit=False)
-            course.instructor = request.user
-            course.save()
-            form.save_m2m()  # This saves the many-to-many subjects data
-            messages.success(request, "Course created successfully!")
-            return redirect('dashboard')
-    else:
-        form = CourseCreationForm()
-    
-    return render(request, 'teacher/create_course.html', {'form': form})
-
-
-@login_required
-def enroll_course(request):
-    if request.method == 'POST':
-        course_id = request.POST.get('course_id')
-        course = get_object_or_404(Course, id=course_id)
-        Enrollment.objects.get_or_create(student=request.user, course=course)
-        messages.success(request, f"Enrolled in {course.name} successfully!")
-        return redirect('dashboard')
-    
-    available_courses = Course.objects.exclude(
-        enrollments__student=request.user
-    )
-    return render(request, 'student/enroll_course.html', {
-        'courses': available_courses
-    })
-
-# ----------------------- QUESTION BANK -----------------------
-
-@login_required
-@user_passes_test(lambda u: u.user_type == 'instructor')
-def create_question(request):
-    if request.method == 'POST':
-        form = PythonQuestionForm(request.POST)
-        if form.is_valid():
-            question = form.save(commit=False)
-            question.created_by = request.user
-            question.save()
-            messages.success(request, "Question added successfully!")
-            return redirect('view_questions')
-    else:
-        form = PythonQuestionForm()
-    return render(request, 'teacher/create_question.html', {'form': form})
-
-@login_required
-@user_passes_test(lambda u: u.user_type == 'instructor')
-def view_questions(request):
-    questions = PythonQuestion.objects.filter(created_by=request.user)
-    return render(request, 'teacher/view_questions.html', {
-        'questions': questions
-    })
-
-# ----------------------- TEST MANAGEMENT -----------------------
-
-@login_required
-@user_passes_test(lambda u: u.user_type == 'instructor')
-def create_test(request):
-    if request.method == 'POST':
-        form = TestCreationForm(request.user, request.POST)
-        if form.is_valid():
-            try:
-                test = form.save(commit=False)
-                test.created_by = request.user
-                test.save()
-                form.save_m2m()  # Save many-to-many for questions
-                messages.success(request, "Test created successfully!")
-                return redirect('dashboard')
-            except Exception as e:
-                messages.error(request, f"Error creating test: {str(e)}")
-        else:
-            messages.error(request, "Please correct the errors below.")
-    else:
-        form = TestCreationForm(request.user)
-    
-    return render(request, 'teacher/create_test.html', {'form': form})
-
-@login_required
-def take_test(request, test_id):
-    test = get_object_or_404(Test, id=test_id)
-    attempt = TestAttempt.objects.filter(
-        student=request.user, 
-        test=test
-    ).first()
-
-    if not attempt:
-        attempt = TestAttempt.objects.create(
-            student=request.user,
-            test=test,
-            total_questions=test.questions.count()
-        )
-    elif attempt.completed_at:
-        messages.warning(request, "You have already completed this test")
-        return redirect('test_result', attempt_id=attempt.id)
-
-    if request.method == 'POST':
-        score = 0
-        for question in test.questions.all():
-            selected = request.POST.get(f'question_{question.id}')
-            if selected:
-                is_correct = selected == question.correct_answer
-                if is_correct:
-                    score += 1
-                
-                TestResult.objects.create(
-                    attempt=attempt,
-                    question=question,
-                    selected_option=selected,
-                    is_correct=is_correct
-                )
-
-        attempt.score = (score / test.questions.count()) * 100
-        attempt.completed_at = timezone.now()
-        attempt.save()
-        messages.success(request, f"Test completed! Score: {attempt.score:.2f}%")
-        return redirect('test_result', attempt_id=attempt.id)
-
-    questions = test.questions.all()
-    return render(request, 'student/take_test.html', {
-        'test': test,
-        'questions': questions,
-        'attempt': attempt
-    })
-
-# ----------------------- RESULTS & ANALYTICS -----------------------
-
-@login_required
-def test_result(request, attempt_id):
-    attempt = get_object_or_404(TestAttempt, id=attempt_id, student=request.user)
-    results = TestResult.objects.filter(attempt=attempt)
-    return render(request, 'student/test_result.html', {
-        'attempt': attempt,
-        'results': results
-    })
-
-@login_required
-def performance_history(request):
-    attempts = TestAttempt.objects.filter(student=request.user)
-    return render(request, 'student/performance_history.html', {
-        'attempts': attempts
-    })
-
-@login_required
-@user_passes_test(lambda u: u.user_type == 'instructor')
-def view_student_performance(request):
-    course_id = request.GET.get('course_id')
-    students = User.objects.filter(user_type='student')
-    
-    if course_id:
-        students = students.filter(
-            enrollments__course_id=course_id
-        ).distinct()
-    
-    performance_data = []
-    for student in students:
-        attempts = TestAttempt.objects.filter(student=student)
-        avg_score = attempts.aggregate(avg=Avg('score'))['avg'] or 0
-        performance_data.append({
-            'student': student,
-            'attempts': attempts.count(),
-            'avg_score': avg_score
-        })
-    
-    courses = Course.objects.all()
-    return render(request, 'teacher/student_performance.html', {
-        'performance_data': performance_data,
-        'courses': courses
-    })
-
-# ----------------------- AUTOMATED MCQ GENERATION -----------------------
-
-@login_required
-@user_passes_test(lambda u: u.user_type == 'instructor')
-def auto_generate_mcqs(request):
-    generator = MCQGenerator()
-    
-    if request.method == 'POST':
-        form = TextToMCQForm(request.POST)
-        if form.is_valid():
-            text = form.cleaned_data['text']
-            subject = form.cleaned_data['subject']
-            difficulty = form.cleaned_data['difficulty']
-            
-            generated_mcqs = generator.generate_mcqs(text)
-            request.session['generated_mcqs'] = generated_mcqs
-            request.session['mcq_context'] = {
-                'subject_id': subject.id,
-                'difficulty': difficulty
-            }
-            
-            return render(request, 'teacher/review_mcqs.html', {
-                'mcqs': generated_mcqs,
-                'subject': subject,
-                'difficulty': difficulty
-            })
-    else:
-        form = TextToMCQForm()
-    
-    return render(request, 'teacher/generate_mcqs.html', {'form': form})
-
-@login_required
-@user_passes_test(lambda u: u.user_type == 'instructor')
-def save_generated_mcqs(request):
-    if request.method == 'POST' and 'generated_mcqs' in request.session:
-        mcqs = request.session['generated_mcqs']
-        context = request.session['mcq_context']
-        subject = Subject.objects.get(id=context['subject_id'])
-        saved_count = 0
-        
-        for mcq in mcqs:
-            if request.POST.get(f'save_{mcqs.index(mcq)}', False):
-              PythonQuestion.objects.create(
-                question_text=mcq['question'],
-                option_a=mcq['options'][0],
-                option_b=mcq['options'][1],
-                option_c=mcq['options'][2],
-                option_d=mcq['options'][3],
-                correct_answer=mcq['correct_answer'],
-                subject=subject,
-                difficulty=context['difficulty'],
-                created_by=request.user
-                )
-              saved_count += 1
-        
-        messages.success(request, f"Saved {saved_count} questions to question bank!")
-        return redirect('view_questions')
-    
+from django.shortcuts import render, redirect, get_object_or_404
+from django.contrib.auth import authenticate, login, logout
+from django.utils import timezone
+from django.contrib.auth.decorators import login_required, user_passes_test
+from .models import Course, Enrollment, PythonQuestion, TestAttempt, TestResult, Test, MCQGenerationJob, GeneratedBatch
+from . import course_catalog, exam_paper, generation_cache, grading, item_analysis, jobs, near_duplicates, question_bank, question_io, question_search, reports, rosters, shuffling, stats, student_dashboard
+from django.contrib import messages
+from django.http import JsonResponse
+from django.core.paginator import Paginator
+import json
+from .forms import (
+    UserRegistrationForm, 
+    PythonQuestionForm, 
+    CourseCreationForm,
+    TestCreationForm,
+    TextToMCQForm,
+    PerformanceFilterForm,
+    QuestionFilterForm,
+    QuestionImportForm,
+    RosterSyncForm
+)
+
+# ----------------------- AUTHENTICATION VIEWS -----------------------
+from .forms import UserRegistrationForm
+
+def register(request):
+    if request.method == 'POST':
+        form = UserRegistrationForm(request.POST)
+        if form.is_valid():
+            user = form.save()
+            login(request, user)
+            messages.success(request, "Registration successful! You are now logged in.")
+            return redirect('dashboard')
+        else:
+            for field, errors in form.errors.items():
+                for error in errors:
+                    messages.error(request, f"{field}: {error}")
+    else:
+        form = UserRegistrationForm()
+    
+    return render(request, 'auth/register.html', {'form': form})
+
+def user_login(request):
+    if request.method == 'POST':
+        username = request.POST.get('username')
+        password = request.POST.get('password')
+        user = authenticate(request, username=username, password=password)
+
+        if user is not None:
+            login(request, user)
+            messages.success(request, "Logged in successfully!")
+            return redirect('dashboard')
+        else:
+            messages.error(request, "Invalid username or password.")
+    
+    return render(request, 'auth/login.html')
+
+
+def user_logout(request):
+    logout(request)
+    messages.success(request, "Logged out successfully!")
+    return redirect('login')
+
+# ----------------------- DASHBOARD VIEWS -----------------------
+
+@login_required
+def dashboard(request):
+    if request.user.user_type == 'instructor':
+          return render(request, 'teacher/dashboard.html')  # Or your instructor dashboard view
+
+    return render(request, 'student/dashboard.html', {
+        'dashboard_html': student_dashboard.render_student_dashboard(request.user)
+    })
+
+# ----------------------- COURSE MANAGEMENT -----------------------
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def create_course(request):
+    if request.method == 'POST':
+        form = CourseCreationForm(request.POST)
+        if form.is_valid():
+            course = form.save(commit=False)
+            course.instructor = request.user
+            course.save()
+            form.save_m2m()  # This saves the many-to-many subjects data
+            messages.success(request, "Course created successfully!")
+            return redirect('dashboard')
+    else:
+        form = CourseCreationForm()
+    
+    return render(request, 'teacher/create_course.html', {'form': form})
+
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def sync_course_roster(request):
+    report = None
+    if request.method == 'POST':
+        form = RosterSyncForm(request.user, request.POST, request.FILES)
+        if form.is_valid():
+            data = form.cleaned_data
+            report = rosters.sync_roster(
+                data['course'], data['roster'].file, data['format'],
+                deactivate_missing=not data['keep_missing'], dry_run=data['dry_run'],
+            )
+            if report.unreadable:
+                messages.error(request, "The roster could not be read to the end, so nothing was changed.")
+            elif not data['dry_run']:
+                messages.success(request, f"Roster of {data['course'].name} synced.")
+    else:
+        form = RosterSyncForm(request.user)
+    return render(request, 'teacher/sync_roster.html', {'form': form, 'report': report})
+
+@login_required
+def enroll_course(request):
+    if request.method == 'POST':
+        course_id = request.POST.get('course_id')
+        course = get_object_or_404(Course, id=course_id)
+        Enrollment.objects.get_or_create(student=request.user, course=course)
+        messages.success(request, f"Enrolled in {course.name} successfully!")
+        return redirect('dashboard')
+    
+    after = request.GET.get('after')
+    courses, next_cursor = course_catalog.page_for_student(request.user, after)
+    return render(request, 'student/enroll_course.html', {
+        'courses': courses,
+        'next_cursor': next_cursor,
+        'is_first_page': not after
+    })
+
+# ----------------------- QUESTION BANK -----------------------
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def create_question(request):
+    if request.method == 'POST':
+        form = PythonQuestionForm(request.POST)
+        if form.is_valid():
+            question = form.save(commit=False)
+            question.created_by = request.user
+            matches = near_duplicates.find_duplicates(
+                [near_duplicates.question_signature(question)], request.user
+            )[0]
+            if matches and not request.POST.get('allow_duplicate'):
+                similar = PythonQuestion.objects.in_bulk([question_id for question_id, _ in matches[:3]])
+                return render(request, 'teacher/create_question.html', {
+                    'form': form,
+                    'similar_questions': [similar[question_id] for question_id, _ in matches[:3] if question_id in similar]
+                })
+            question.save()
+            messages.success(request, "Question added successfully!")
+            return redirect('view_questions')
+    else:
+        form = PythonQuestionForm()
+    return render(request, 'teacher/create_question.html', {'form': form})
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def view_questions(request):
+    form = QuestionFilterForm(request.GET or None)
+    filters = form.cleaned_data if form.is_valid() else {}
+    questions = PythonQuestion.objects.filter(created_by=request.user)
+    for field in ('subject', 'topic', 'difficulty'):
+        if filters.get(field):
+            questions = questions.filter(**{field: filters[field]})
+
+    query = filters.get('q', '').strip()
+    if query:
+        questions = question_search.search(questions, query)
+    questions, next_cursor = question_search.page(questions, request.GET.get('cursor'), ranked=bool(query))
+
+    params = request.GET.copy()
+    params.pop('cursor', None)
+    return render(request, 'teacher/view_questions.html', {
+        'form': form,
+        'questions': questions,
+        'query': query,
+        'filter_string': params.urlencode(),
+        'next_cursor': next_cursor,
+        'is_first_page': not request.GET.get('cursor')
+    })
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def import_questions(request):
+    report = None
+    if request.method == 'POST':
+        form = QuestionImportForm(request.POST, request.FILES)
+        if form.is_valid():
+            upload = form.cleaned_data['file']
+            # Large uploads are spooled to a temporary file by Django and read from it in chunks
+            report = question_io.import_questions(upload.file, form.cleaned_data['format'], request.user)
+            if report.created:
+                messages.success(request, f"Imported {report.created} question(s).")
+            if report.error_count:
+                messages.warning(request, f"{report.error_count} row(s) could not be imported.")
+    else:
+        form = QuestionImportForm()
+    return render(request, 'teacher/import_questions.html', {'form': form, 'report': report})
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def export_questions(request):
+    fmt = request.GET.get('format', 'csv')
+    if fmt not in question_io.FORMATS:
+        fmt = 'csv'
+    return question_io.export_response(PythonQuestion.objects.filter(created_by=request.user), fmt)
+
+# ----------------------- TEST MANAGEMENT -----------------------
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def create_test(request):
+    if request.method == 'POST':
+        form = TestCreationForm(request.user, request.POST)
+        if form.is_valid():
+            try:
+                test = form.save(commit=False)
+                test.created_by = request.user
+                test.save()
+                form.save_m2m()  # Save many-to-many for questions
+                messages.success(request, "Test created successfully!")
+                return redirect('dashboard')
+            except Exception as e:
+                messages.error(request, f"Error creating test: {str(e)}")
+        else:
+            messages.error(request, "Please correct the errors below.")
+    else:
+        form = TestCreationForm(request.user)
+    
+    return render(request, 'teacher/create_test.html', {'form': form})
+
+@login_required
+def take_test(request, test_id):
+    test = get_object_or_404(Test, id=test_id)
+    attempt, created = TestAttempt.objects.get_or_create(
+        student=request.user,
+        test=test,
+        defaults={'total_questions': grading.get_answer_key(test).count}
+    )
+
+    if not created and attempt.completed_at:
+        messages.warning(request, "You have already completed this test")
+        return redirect('test_result', attempt_id=attempt.id)
+
+    if request.method == 'POST':
+        attempt = grading.grade_submission(attempt, grading.answers_from_post(request.POST))
+        messages.success(request, f"Test completed! Score: {attempt.score:.2f}%")
+        return redirect('test_result', attempt_id=attempt.id)
+
+    return render(request, 'student/take_test.html', {
+        'test': test,
+        'paper': exam_paper.render_for_attempt(exam_paper.get_paper(test), attempt.id),
+        'attempt': attempt,
+        'saved_answers': grading.saved_answers(attempt)
+    })
+
+@login_required
+def autosave_answers(request, attempt_id):
+    if request.method != 'POST':
+        return JsonResponse({'error': 'POST required'}, status=405)
+
+    attempt = get_object_or_404(TestAttempt, id=attempt_id, student=request.user)
+    if attempt.completed_at:
+        return JsonResponse({'error': 'This test has already been submitted'}, status=409)
+
+    try:
+        answers = json.loads(request.body)['answers']
+        if not isinstance(answers, dict):
+            raise ValueError
+        if not all(letter is None or isinstance(letter, str) for letter in answers.values()):
+            raise ValueError
+    except (ValueError, KeyError, TypeError):
+        return JsonResponse({'error': 'Expected {"answers": {question_id: letter}}'}, status=400)
+
+    # Checked again under the attempt's row lock, in case the test was submitted meanwhile
+    saved = grading.autosave(attempt, answers)
+    if saved is None:
+        return JsonResponse({'error': 'This test has already been submitted'}, status=409)
+    return JsonResponse({'saved': saved})
+
+# ----------------------- RESULTS & ANALYTICS -----------------------
+
+def _displayed_option(attempt, question, letter):
+    """``(letter on screen, option text)`` for a stored option letter, or None if unanswered."""
+    if not letter or letter not in shuffling.LETTERS:
+        return None
+    return (
+        shuffling.to_display(attempt.id, question.id, letter),
+        getattr(question, f'option_{letter.lower()}'),
+    )
+
+@login_required
+def test_result(request, attempt_id):
+    attempt = get_object_or_404(TestAttempt, id=attempt_id, student=request.user)
+    results = list(TestResult.objects.filter(attempt=attempt).select_related('question'))
+    for result in results:
+        # Stored letters are canonical; show the letters and text this attempt displayed
+        question = result.question
+        result.selected_display = _displayed_option(attempt, question, result.selected_option)
+        result.correct_display = _displayed_option(attempt, question, question.correct_answer)
+    return render(request, 'student/test_result.html', {
+        'attempt': attempt,
+        'results': results
+    })
+
+@login_required
+def performance_history(request):
+    attempts = TestAttempt.objects.filter(student=request.user).select_related('test__course')
+    summary = stats.student_summary(request.user)
+    return render(request, 'student/performance_history.html', {
+        'attempts': attempts,
+        'passed_count': summary['passed_count'],
+        'failed_count': summary['failed_count']
+    })
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def view_student_performance(request):
+    form = PerformanceFilterForm(request.GET or None)
+    filters = form.cleaned_data if form.is_valid() else {}
+    students = reports.student_performance(
+        course=filters.get('course_id'),
+        date_from=filters.get('date_from'),
+        date_to=filters.get('date_to')
+    )
+
+    if request.GET.get('format') == 'csv':
+        return reports.performance_csv(students)
+
+    page = Paginator(students, 50).get_page(request.GET.get('page'))
+    query = request.GET.copy()
+    query.pop('page', None)
+    return render(request, 'teacher/student_performance.html', {
+        'form': form,
+        'page_obj': page,
+        'performance_data': page.object_list,
+        'query_string': query.urlencode()
+    })
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def test_item_analysis(request):
+    tests = Test.objects.filter(created_by=request.user).order_by('-created_at')
+    test = None
+    analysis = None
+    if request.GET.get('test_id'):
+        test = get_object_or_404(tests, id=request.GET['test_id'])
+        analysis = item_analysis.analyze_test(test)
+
+    return render(request, 'teacher/item_analysis.html', {
+        'tests': tests,
+        'test': test,
+        'analysis': analysis,
+        'items': list(analysis.items()) if analysis else []
+    })
+
+# ----------------------- AUTOMATED MCQ GENERATION -----------------------
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def auto_generate_mcqs(request):
+    if request.method == 'POST':
+        form = TextToMCQForm(request.POST, request.FILES)
+        if form.is_valid():
+            text = form.cleaned_data['text']
+            subject = form.cleaned_data['subject']
+            num_questions = form.cleaned_data['num_questions']
+            job = MCQGenerationJob(
+                created_by=request.user,
+                text=text,
+                source_file=form.cleaned_data['document'],
+                subject=subject,
+                difficulty=form.cleaned_data['difficulty'],
+                num_questions=num_questions
+            )
+
+            # Re-submitted text is served from the generation cache without queueing
+            cached_mcqs = None if job.source_file else generation_cache.get(text, subject.id, num_questions)
+            if cached_mcqs is not None:
+                job.status = 'done'
+                job.progress = 100
+                job.finished_at = timezone.now()
+                job.batch = jobs.store_batch(job, cached_mcqs)
+                job.save()
+            else:
+                job.save()
+                jobs.submit(job)
+            return redirect('review_mcqs', job_id=job.id)
+    else:
+        form = TextToMCQForm()
+    
+    return render(request, 'teacher/generate_mcqs.html', {'form': form})
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def review_mcqs(request, job_id):
+    job = get_object_or_404(MCQGenerationJob.objects.select_related('subject', 'batch'), id=job_id, created_by=request.user)
+
+    items = []
+    if job.status == 'done' and job.batch:
+        items = job.batch.items.all()
+        request.session['generated_batch_id'] = str(job.batch.id)
+
+    return render(request, 'teacher/review_mcqs.html', {
+        'job': job,
+        'mcqs': items,
+        'subject': job.subject,
+        'difficulty': job.difficulty
+    })
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def mcq_job_status(request, job_id):
+    job = get_object_or_404(MCQGenerationJob.objects.defer('text'), id=job_id, created_by=request.user)
+    if not job.is_finished():
+        # Picks the job up again if the process that queued it has restarted since
+        jobs.wake()
+    return JsonResponse({
+        'status': job.status,
+        'progress': job.progress,
+        'finished': job.is_finished(),
+        'question_count': job.batch.items.count() if job.batch_id else 0,
+        'error': job.error
+    })
+
+@login_required
+@user_passes_test(lambda u: u.user_type == 'instructor')
+def save_generated_mcqs(request):
+    batch_id = request.session.get('generated_batch_id')
+    if request.method == 'POST' and batch_id:
+        batch = GeneratedBatch.objects.filter(
+            id=batch_id, created_by=request.user, expires_at__gt=timezone.now()
+        ).select_related('subject').first()
+        if batch is None:
+            del request.session['generated_batch_id']
+            messages.error(request, "These generated questions have expired. Please generate them again.")
+            return redirect('auto_generate_mcqs')
+
+        try:
+            positions = question_bank.selected_positions(request.POST, batch.items.count())
+        except ValueError as e:
+            messages.error(request, f"Invalid question range: {e}")
+            if hasattr(batch, 'job'):
+                return redirect('review_mcqs', job_id=batch.job.id)
+            return redirect('auto_generate_mcqs')
+
+        saved, errors = question_bank.accept_generated_items(batch, positions, request.user)
+        for position, item_errors in sorted(errors.items()):
+            messages.warning(request, f"Question {position + 1} was not saved: {'; '.join(item_errors)}")
+
+        messages.success(request, f"Saved {len(saved)} questions to question bank!")
+        return redirect('view_questions')
+    
     return redirect('auto_generate_mcqs')
\ No newline at end of file
@@ -1,126 +1,213 @@
-
-
-from pathlib import Path
-
-# Build paths inside the project like this: BASE_DIR / 'subdir'.
-BASE_DIR = Path(__file__).resolve().parent.parent
-
-
-# Quick-start development settings - unsuitable for production
-# See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
-
-# SECURITY WARNING: keep the secret key used in production secret!
-SECRET_KEY = 'django-insecure-a!f)#7!ufzkmt5*6hybfez1_z1%4nuoxv9=&pa(9bfs77c#t)d'
-
-# SECURITY WARNING: don't run with debug turned on in production!
-DEBUG = True
-
-ALLOWED_HOSTS = []
-
-
-# Application definition
-
-# Make sure these are in your INSTALLED_APPS in the correct order
-INSTALLED_APPS = [
-    'django.contrib.admin',
-    'django.contrib.auth',
-    'django.contrib.contenttypes',
-    'django.contrib.sessions',
-    'django.contrib.messages',
-    'django.contrib.staticfiles',
-    'app',  # your custom app must come after the built-in apps
-]
-
-MIDDLEWARE = [
-    'django.middleware.security.SecurityMiddleware',
-    'django.contrib.sessions.middleware.SessionMiddleware',
-    'django.middleware.common.CommonMiddleware',
-    'django.middleware.csrf.CsrfViewMiddleware',
-    'django.contrib.auth.middleware.AuthenticationMiddleware',
-    'django.contrib.messages.middleware.MessageMiddleware',
-    'django.middleware.clickjacking.XFrameOptionsMiddleware',
-]
-
-ROOT_URLCONF = 'project.urls'
-
-TEMPLATES = [
-    {
-        'BACKEND': 'django.template.backends.django.DjangoTemplates',
-        'DIRS': [],
-        'APP_DIRS': True,
-        'OPTIONS': {
-            'context_processors': [
-                'django.template.context_processors.debug',
-                'django.template.context_processors.request',
-                'django.contrib.auth.context_processors.auth',
-                'django.contrib.messages.context_processors.messages',
-            ],
-        },
-    },
-]
-
-WSGI_APPLICATION = 'project.wsgi.application'
-
-
-# Database
-# https://docs.djangoproject.com/en/4.2/ref/settings/#databases
-
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
-    }
-}
-
-
-# Password validation
-# https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
-
-AUTH_PASSWORD_VALIDATORS = [
-    {
-        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
-    },
-    {
-        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
-    },
-]
-
-
-# Internationalization
-# https://docs.djangoproject.com/en/4.2/topics/i18n/
-
-LANGUAGE_CODE = 'en-us'
-
-TIME_ZONE = 'UTC'
-
-USE_I18N = True
-
-USE_TZ = True
-
-import os
-# Static files (CSS, JavaScript, Images)
-# https://docs.djangoproject.com/en/4.2/howto/static-files/
-
-STATIC_URL = 'static/'
-
-MEDIA_URL= '/media/'
-MEDIA_ROOT=os.path.join(BASE_DIR,"media/")
-# Default primary key field type
-# https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
-
-#DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
-AUTH_USER_MODEL = 'app.User'
-  # Replace 'app' with your actual app name
-
-LOGIN_URL = '/login/'
-LOGIN_REDIRECT_URL = '/'
-LOGOUT_REDIRECT_URL = '/login/'
-# LOGIN_REDIRECT_URL = 'dashboard'  # Or your desired redirect after login
-# LOGIN_URL = 'login' 
+
+
+from pathlib import Path
+
+# Build paths inside the project like this: BASE_DIR / 'subdir'.
+BASE_DIR = Path(__file__).resolve().parent.parent
+
+
+# Quick-start development settings - unsuitable for production
+# See https://docs.djangoproject.com/en/4.2/howto/deployment/checklist/
+
+# SECURITY WARNING: keep the secret key used in production secret!
+SECRET_KEY = 'django-insecure-a!f)#7!ufzkmt5*6hybfez1_z1%4nuoxv9=&pa(9bfs77c#t)d'
+
+# SECURITY WARNING: don't run with debug turned on in production!
+DEBUG = True
+
+ALLOWED_HOSTS = []
+
+
+# Application definition
+
+# Make sure these are in your INSTALLED_APPS in the correct order
+INSTALLED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.auth',
+    'django.contrib.contenttypes',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'app',  # your custom app must come after the built-in apps
+]
+
+MIDDLEWARE = [
+    'django.middleware.security.SecurityMiddleware',
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'django.middleware.common.CommonMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
+    'django.middleware.clickjacking.XFrameOptionsMiddleware',
+]
+
+ROOT_URLCONF = 'project.urls'
+
+TEMPLATES = [
+    {
+        'BACKEND': 'django.template.backends.django.DjangoTemplates',
+        'DIRS': [],
+        'APP_DIRS': True,
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.debug',
+                'django.template.context_processors.request',
+                'django.contrib.auth.context_processors.auth',
+                'django.contrib.messages.context_processors.messages',
+            ],
+        },
+    },
+]
+
+WSGI_APPLICATION = 'project.wsgi.application'
+
+
+# Database
+# https://docs.djangoproject.com/en/4.2/ref/settings/#databases
+
+DATABASES = {
+    'default': {
+        'ENGINE': 'django.db.backends.sqlite3',
+        'NAME': BASE_DIR / 'db.sqlite3',
+    }
+}
+
+
+# Cache
+# https://docs.djangoproject.com/en/4.2/topics/cache/
+# Local memory caches are per process; point these at a shared backend (Memcached, Redis,
+# database) when running several workers.
+
+CACHES = {
+    'default': {
+        'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+    },
+    # Generated MCQs, keyed by a hash of the normalized text and shared by all worker
+    # processes. Past MAX_ENTRIES the least recently used third (CULL_FREQUENCY) is evicted;
+    # entries also expire after TIMEOUT seconds.
+    'mcq': {
+        'BACKEND': 'app.cache_backends.LRUFileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'mcq',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 500,
+        },
+    },
+    # Compiled answer keys and rendered exam papers. These must be shared by every worker
+    # process, or the invalidation in signals.py only reaches the process that changed the
+    # test; use Memcached or Redis instead once workers run on more than one host.
+    'tests': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'tests',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 5000,
+        },
+    },
+    # Student dashboards, course catalog pages and their version tokens. Shared by every worker
+    # process for the same reason: a token replaced by one worker must orphan the pages cached
+    # by all of them. A lost token only costs a re-render, so tokens expire with TIMEOUT too.
+    'pages': {
+        'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+        'LOCATION': BASE_DIR / 'cache' / 'pages',
+        'TIMEOUT': 60 * 60 * 24,
+        'OPTIONS': {
+            'MAX_ENTRIES': 10000,
+        },
+    },
+}
+
+
+# Cache (from CACHES) holding answer keys and exam papers
+TEST_CACHE_ALIAS = 'tests'
+# Cache (from CACHES) holding rendered pages and the tokens that version them
+PAGE_CACHE_ALIAS = 'pages'
+# Seconds a compiled test answer key stays cached. Changes to the test replace it at once;
+# this bounds how long a key can survive changes made without signals (e.g. a restored DB)
+ANSWER_KEY_CACHE_TIMEOUT = 60 * 60 * 24
+# Same for the pre-rendered question markup of an exam paper
+EXAM_PAPER_CACHE_TIMEOUT = 60 * 60 * 24
+# Upper bound on how long a student's cached dashboard is served; enrollments and
+# completed attempts replace it immediately, this only catches tests opening or closing
+DASHBOARD_CACHE_TIMEOUT = 300
+# Seconds a course catalog page is cached; course changes replace it at once, enrollment
+# counts shown on it can lag by up to this long
+COURSE_CATALOG_CACHE_TIMEOUT = 60
+
+
+# Password validation
+# https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
+
+AUTH_PASSWORD_VALIDATORS = [
+    {
+        'NAME': 'django.contrib.auth.password_validation.UserAttributeSimilarityValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.MinimumLengthValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.CommonPasswordValidator',
+    },
+    {
+        'NAME': 'django.contrib.auth.password_validation.NumericPasswordValidator',
+    },
+]
+
+
+# Internationalization
+# https://docs.djangoproject.com/en/4.2/topics/i18n/
+
+LANGUAGE_CODE = 'en-us'
+
+TIME_ZONE = 'UTC'
+
+USE_I18N = True
+
+USE_TZ = True
+
+import os
+# Static files (CSS, JavaScript, Images)
+# https://docs.djangoproject.com/en/4.2/howto/static-files/
+
+STATIC_URL = 'static/'
+
+MEDIA_URL= '/media/'
+MEDIA_ROOT=os.path.join(BASE_DIR,"media/")
+# Default primary key field type
+# https://docs.djangoproject.com/en/4.2/ref/settings/#default-auto-field
+
+#DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
+AUTH_USER_MODEL = 'app.User'
+  # Replace 'app' with your actual app name
+
+# MCQ generation
+# NLTK data is looked up here first; populate it with `manage.py download_nltk_data`
+NLTK_DATA_DIR = BASE_DIR / 'nltk_data'
+# Build the shared NLP engine when each worker starts rather than on the first request
+MCQ_PRELOAD_GENERATOR = True
+# Generation runs as queued jobs. Web workers process them on a small thread pool unless
+# MCQ_JOB_RUN_IN_PROCESS is off, in which case run `manage.py run_mcq_jobs` separately.
+MCQ_JOB_RUN_IN_PROCESS = True
+MCQ_JOB_WORKERS = 2
+MCQ_JOB_STALE_AFTER = 600  # seconds without a heartbeat before a running job is considered abandoned
+# Texts at least this long are tagged across a process pool
+MCQ_PARALLEL_MIN_CHARS = 200_000
+MCQ_PARALLEL_WORKERS = os.cpu_count()
+# Seconds a worker reuses a loaded distractor pool before re-reading the index
+MCQ_DISTRACTOR_CACHE_TTL = 300
+# Seconds generated questions are kept for review before `manage.py cleanup_generated_batches` drops them
+MCQ_BATCH_TTL = 24 * 60 * 60
+# Largest source document accepted by the generate form, in bytes
+MCQ_UPLOAD_MAX_BYTES = 100 * 1024 * 1024
+# Estimated Jaccard similarity (0-1) of text and options above which a question counts as a
+# near-duplicate of one already in the author's bank (see app/near_duplicates.py)
+MCQ_DUPLICATE_THRESHOLD = 0.8
+# Cache (from CACHES) holding previously generated questions
+MCQ_CACHE_ALIAS = 'mcq'
+
+LOGIN_URL = '/login/'
+LOGIN_REDIRECT_URL = '/'
+LOGOUT_REDIRECT_URL = '/login/'
+# LOGIN_REDIRECT_URL = 'dashboard'  # Or your desired redirect after login
+# LOGIN_URL = 'login' 